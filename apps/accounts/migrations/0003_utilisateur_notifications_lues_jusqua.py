@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_role_administrateur_validateur_role_date_refus_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='utilisateur',
+            name='notifications_lues_jusqua',
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Notifications lues jusqu'au"),
+        ),
+    ]
@@ -91,6 +91,13 @@ class Utilisateur(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
     
+    # Filigrane de lecture : les notifications créées avant sont lues (« tout marquer comme lu »)
+    notifications_lues_jusqua = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Notifications lues jusqu'au"
+    )
+    
     objects = CustomUserManager()
     
     USERNAME_FIELD = 'email'
@@ -23,6 +23,7 @@ from apps.documents.models import Document
 from .models import Utilisateur, Role
 from .forms import InscriptionForm, ConnexionForm, ProfilForm, ChangementMotDePasseForm
 from apps.notifications.models import Notification
+from apps.notifications import compteurs as compteurs_notifications
 from .models import Utilisateur, Role, TypeRole, StatutRole, StatutCompte
 from apps.projects.models import StatutProjet  # Pour les constantes de statut
 from django.db.models import Sum
@@ -193,7 +194,7 @@ def profil(request):
             'documents_count': all_documents.count(),
             'documents_attente': documents_attente,
             # CORRECTION : 'lu' → 'lue'
-            'unread_notifications_count': NotifModel.objects.filter(lue=False).count(),
+            'unread_notifications_count': NotifModel.objects.filter(compteurs_notifications.NON_LUES).count(),
         })
         
     elif user.est_promoteur():
@@ -219,7 +220,7 @@ def profil(request):
             'user_documents_count': user_documents.count(),
             'projets': projets_utilisateur[:5],  # 5 derniers projets
             # CORRECTION : 'lu' → 'lue'
-            'unread_notifications_count': NotifModel.objects.filter(utilisateur=user, lue=False).count(),
+            'unread_notifications_count': compteurs_notifications.lire(user.pk),
         })
         
     elif user.est_investisseur():
@@ -259,7 +260,7 @@ def profil(request):
             'user_documents': user_documents,
             'user_documents_count': user_documents.count(),
             'investissements': investissements_utilisateur[:5],  # 5 derniers investissements
-            'unread_notifications_count': NotifModel.objects.filter(utilisateur=user, lue=False).count(),
+            'unread_notifications_count': compteurs_notifications.lire(user.pk),
         })
             
     else:
@@ -279,7 +280,7 @@ def profil(request):
             'user_documents': user_documents,
             'user_documents_count': user_documents.count(),
             # CORRECTION : 'lu' → 'lue'
-            'unread_notifications_count': NotifModel.objects.filter(utilisateur=user, lue=False).count(),
+            'unread_notifications_count': compteurs_notifications.lire(user.pk),
         })
     
     return render(request, 'accounts/profile.html', context)
@@ -390,9 +391,9 @@ def notifications(request):
     # user.notifications.filter(lue=False).update(lue=True)
     
     context = {
-        'notifications': notifications_list,
-        'total_count': notifications_list.count(),
-        'unread_count': notifications_list.filter(lue=False).count(),
+        'notifications': Notification.appliquer_filigrane(list(notifications_list), user),
+        'total_count': compteurs_notifications.lire(user.pk, 'toutes'),
+        'unread_count': compteurs_notifications.lire(user.pk),
         'form': form,
     }
     
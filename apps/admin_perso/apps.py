@@ -4,3 +4,7 @@ class AdminPersoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.admin_perso'  # ⚡ Doit correspondre au chemin exact du dossier
     verbose_name = "Administration Personnalisée"
+
+    def ready(self):
+        from . import compteurs
+        compteurs.connecter()
@@ -0,0 +1,149 @@
+"""
+Compteurs du sidebar admin (travail en attente), tenus dans le cache partagé
+Plateforme crowdBuilding - Burkina Faso
+
+Chaque compteur suit le nombre de lignes d'un modèle dans un statut donné :
+- les sauvegardes / suppressions et les transitions (apps.core.transitions)
+  l'ajustent par delta, après le commit ;
+- une clé absente ou expirée (COMPTEURS_ADMIN_TTL) est recomptée à la lecture,
+  ce qui corrige toute dérive (UPDATE hors ORM, cache vidé...) ;
+- `manage.py recompter_compteurs_admin` force le recomptage (cron).
+"""
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from apps.core.transitions import transition_appliquee
+
+PREFIXE_CLE = 'compteurs_admin:'
+
+# nom du compteur -> (modèle, champ, valeur suivie)
+COMPTEURS = {
+    'utilisateurs_en_attente': ('accounts.Role', 'statut', 'EN_ATTENTE_VALIDATION'),
+    'projets_en_attente': ('projects.Projet', 'statut', 'EN_ATTENTE_VALIDATION'),
+    'investissements_en_attente': ('investments.Investissement', 'statut', 'PAIEMENT_RECU'),
+    'comptes_rendus_en_attente': ('projects.CompteRendu', 'statut', 'EN_ATTENTE_VALIDATION'),
+    'documents_en_attente': ('documents.Document', 'statut', 'EN_ATTENTE'),
+}
+
+# Attribut d'instance : valeur du champ au chargement (ou à la dernière sauvegarde)
+ATTRIBUT_ORIGINE = '_origine_compteurs_admin'
+
+_ABSENT = object()
+
+
+def _cle(nom):
+    return PREFIXE_CLE + nom
+
+
+def recompter():
+    """Recompte tous les compteurs en base et les écrit dans le cache"""
+    valeurs = {}
+    for nom, (label, champ, valeur) in COMPTEURS.items():
+        valeurs[nom] = apps.get_model(label).objects.filter(**{champ: valeur}).count()
+    cache.set_many({_cle(nom): n for nom, n in valeurs.items()}, settings.COMPTEURS_ADMIN_TTL)
+    return valeurs
+
+
+def lire():
+    """Valeurs courantes : une lecture du cache, un recomptage si une clé manque"""
+    trouves = cache.get_many([_cle(nom) for nom in COMPTEURS])
+    if len(trouves) < len(COMPTEURS):
+        return recompter()
+    return {nom: trouves[_cle(nom)] for nom in COMPTEURS}
+
+
+def ajuster(nom, delta):
+    """Applique un delta au commit de la transaction courante"""
+    if delta:
+        transaction.on_commit(lambda: _incrementer(nom, delta))
+
+
+def invalider(nom):
+    """Valeur inconnue : la prochaine lecture recompte"""
+    transaction.on_commit(lambda: cache.delete(_cle(nom)))
+
+
+def _incrementer(nom, delta):
+    try:
+        cache.incr(_cle(nom), delta)
+    except ValueError:
+        # Clé absente : elle sera recomptée à la prochaine lecture
+        pass
+
+
+@lru_cache(maxsize=None)
+def _compteurs_du_modele(modele):
+    label = modele._meta.label
+    return [(nom, champ, valeur) for nom, (l, champ, valeur) in COMPTEURS.items() if l == label]
+
+
+def _origines(instance):
+    origines = instance.__dict__.get(ATTRIBUT_ORIGINE)
+    if origines is None:
+        origines = instance.__dict__[ATTRIBUT_ORIGINE] = {}
+    return origines
+
+
+def _memoriser(sender, instance, **kwargs):
+    # Champ différé (.only/.defer) : non mémorisé, pour ne pas déclencher de requête
+    origines = _origines(instance)
+    for _, champ, _ in _compteurs_du_modele(sender):
+        origines[champ] = instance.__dict__.get(champ, _ABSENT)
+
+
+def _apres_sauvegarde(sender, instance, created, **kwargs):
+    origines = _origines(instance)
+    for nom, champ, valeur in _compteurs_du_modele(sender):
+        actuel = instance.__dict__.get(champ, _ABSENT)
+        ancien = None if created else origines.get(champ, _ABSENT)
+        if ancien is _ABSENT or actuel is _ABSENT:
+            invalider(nom)
+        else:
+            ajuster(nom, (actuel == valeur) - (ancien == valeur))
+        origines[champ] = actuel
+
+
+def _apres_suppression(sender, instance, **kwargs):
+    origines = _origines(instance)
+    for nom, champ, valeur in _compteurs_du_modele(sender):
+        ancien = origines.get(champ, _ABSENT)
+        if ancien is _ABSENT:
+            invalider(nom)
+        else:
+            ajuster(nom, -(ancien == valeur))
+
+
+def _apres_transition(sender, transition, nombre, anciens=None, instance=None, **kwargs):
+    for nom, champ, valeur in _compteurs_du_modele(sender):
+        if champ != transition.champ:
+            continue
+        if anciens is not None:
+            sortis = sum(1 for ancien in anciens if ancien == valeur)
+        elif valeur not in transition.sources:
+            sortis = 0
+        elif len(transition.sources) == 1:
+            sortis = nombre
+        else:
+            # Statuts d'origine inconnus
+            invalider(nom)
+            continue
+        entres = nombre if transition.cible == valeur else 0
+        ajuster(nom, entres - sortis)
+        if instance is not None:
+            _origines(instance)[champ] = getattr(instance, champ)
+
+
+def connecter():
+    """Branche les signaux (AdminPersoConfig.ready)"""
+    for label in {label for label, _, _ in COMPTEURS.values()}:
+        modele = apps.get_model(label)
+        uid = f'compteurs_admin:{label}'
+        post_init.connect(_memoriser, sender=modele, dispatch_uid=uid)
+        post_save.connect(_apres_sauvegarde, sender=modele, dispatch_uid=uid)
+        post_delete.connect(_apres_suppression, sender=modele, dispatch_uid=uid)
+        transition_appliquee.connect(_apres_transition, sender=modele, dispatch_uid=uid)
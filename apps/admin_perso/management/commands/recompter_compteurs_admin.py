@@ -0,0 +1,16 @@
+"""
+Recompte les compteurs du sidebar admin et remplace les valeurs en cache
+Usage : python manage.py recompter_compteurs_admin (cron, ou après une modification en masse hors ORM)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.admin_perso import compteurs
+
+
+class Command(BaseCommand):
+    help = "Recompte en base les éléments en attente affichés dans le sidebar admin"
+
+    def handle(self, *args, **options):
+        for nom, valeur in compteurs.recompter().items():
+            self.stdout.write(f"{nom} : {valeur}")
+        self.stdout.write(self.style.SUCCESS("Compteurs admin recomptés"))
@@ -1,3 +1,68 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from apps.accounts.models import Utilisateur
+from apps.admin_perso import compteurs
+from apps.admin_perso.context_processors import global_stats
+from apps.investments.models import Investissement
+from apps.projects.models import Projet, StatutProjet
+
+
+class CompteursAdminTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = Utilisateur.objects.create_superuser('admin@crowdbuilding.bf', 'x', nom='Admin', prenom='A')
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+
+    def creer_projet(self, statut):
+        return Projet.objects.create(
+            titre='Résidence', description='d', montant_total=Decimal('1000000'),
+            nombre_total_parts=100, prix_unitaire=Decimal('10000'), duree=12,
+            date_debut=date(2026, 1, 1), date_fin=date(2027, 1, 1), localisation='Ouagadougou',
+            promoteur=self.promoteur, statut=statut
+        )
+
+    def test_sidebar_sans_requete(self):
+        compteurs.recompter()
+        request = RequestFactory().get('/admin-perso/')
+        request.user = self.admin
+
+        with self.assertNumQueries(0):
+            contexte = global_stats(request)
+
+        self.assertEqual(set(contexte['global_stats']), set(compteurs.COMPTEURS))
+
+    def test_delta_sur_sauvegarde(self):
+        compteurs.recompter()
+        with self.captureOnCommitCallbacks(execute=True):
+            projet = self.creer_projet(StatutProjet.EN_ATTENTE_VALIDATION)
+        self.assertEqual(compteurs.lire()['projets_en_attente'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            projet.statut = StatutProjet.VALIDE
+            projet.save()
+        self.assertEqual(compteurs.lire()['projets_en_attente'], 0)
+        self.assertEqual(compteurs.lire(), compteurs.recompter())
+
+    def test_delta_sur_transition(self):
+        projet = self.creer_projet(StatutProjet.EN_CAMPAGNE)
+        investissement = Investissement.objects.create(
+            projet=projet, investisseur=self.promoteur, nombre_parts=2,
+            montant=Decimal('20000'), origine_fonds='SALAIRE'
+        )
+        compteurs.recompter()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Investissement.TRANSITIONS['recevoir_paiement'].appliquer(investissement)
+        self.assertEqual(compteurs.lire()['investissements_en_attente'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Investissement.TRANSITIONS['confirmer'].appliquer_a(
+                Investissement.objects.filter(pk=investissement.pk)
+            )
+        self.assertEqual(compteurs.lire()['investissements_en_attente'], 0)
+        self.assertEqual(compteurs.lire(), compteurs.recompter())
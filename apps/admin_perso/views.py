@@ -13,18 +13,15 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models.functions import TruncMonth
-from collections import defaultdict
 
 
 # Import des modèles
 from apps.accounts.models import Utilisateur, Role, TypeRole, StatutRole
 from apps.accounts.views import calculer_statistiques_utilisateurs
 from apps.projects.models import Projet, CompteRendu, StatutProjet
-from apps.investments.models import Investissement, StatutInvestissement, StatutTransaction, Transaction, TypeTransaction
+from apps.investments.models import Investissement, StatutInvestissement, SoldeFinancement, CumulMensuel
 from apps.documents.models import Document
 from apps.notifications.models import Notification, TypeNotification
-from django.db.models import Avg  # Pour les moyennes
 
 from django.contrib.auth import logout
 from django.shortcuts import redirect
@@ -306,15 +303,12 @@ def voir_details_utilisateur(request, user_id):
             }
                 
         elif role_actif.type == TypeRole.INVESTISSEUR:
-            investissements_utilisateur = utilisateur.investissements.filter(statut='CONFIRME')
-            montant_total = investissements_utilisateur.aggregate(
-                total=Sum('montant')
-            )['total'] or 0
+            solde = SoldeFinancement.pour_investisseur(utilisateur)
             
             stats_investissements = {
-                'total': investissements_utilisateur.count(),
-                'montant_total': montant_total,
-                'projets_investis': investissements_utilisateur.values('projet').distinct().count(),
+                'total': solde.investissements_confirmes,
+                'montant_total': solde.montant_confirme,
+                'projets_investis': solde.nombre_projets,
             }
     
     # Historique
@@ -820,6 +814,9 @@ def admin_valider_compte_rendu(request, cr_id):
         'motif_rejet'
     ])
 
+    # 📢 Investisseurs du projet : diffusion programmée, envoyée hors de la requête
+    Notification.creer_notification_compte_rendu(compte_rendu)
+
     return JsonResponse({
         'success': True,
         'message': 'Compte rendu validé avec succès.',
@@ -1009,22 +1006,16 @@ def admin_gestion_investissements(request):
         )
 
         
-        # Statistiques du mois
-        maintenant = timezone.now()
-        mois_debut = timezone.datetime(maintenant.year, maintenant.month, 1)
-        mois_fin = mois_debut + timezone.timedelta(days=32)
-        mois_fin = mois_fin.replace(day=1) - timezone.timedelta(days=1)
-        
-        investissements_mois = Investissement.objects.filter(
-            date_investissement__date__gte=mois_debut.date(),
-            date_investissement__date__lte=mois_fin.date(),
-            statut__in=[
-                StatutInvestissement.PAIEMENT_RECU,
-                StatutInvestissement.CONFIRME
-            ]
-        ).aggregate(
-            mois_sum=Sum('montant')
-        )['mois_sum'] or Decimal('0')
+        # Statistiques du mois (cumuls mensuels : investissements confirmés)
+        mois_debut = CumulMensuel.mois_de(timezone.now())
+        mois_precedent_debut = (mois_debut - timedelta(days=1)).replace(day=1)
+        cumuls_mois = dict(
+            CumulMensuel.serie().filter(
+                mois__in=[mois_precedent_debut, mois_debut]
+            ).values_list('mois', 'montant_investi')
+        )
+        investissements_mois = cumuls_mois.get(mois_debut, Decimal('0'))
+        investissements_mois_precedent = cumuls_mois.get(mois_precedent_debut, Decimal('0'))
 
         
         # Moyennes
@@ -1059,53 +1050,16 @@ def admin_gestion_investissements(request):
         # 📊 DONNÉES GRAPHE RÉELLES
         # =============================
 
-        # On ne prend QUE les investissements confirmés
-        invest_qs = Investissement.objects.filter(
-            statut=StatutInvestissement.CONFIRME
-        )
-
-        # Remboursements réels
-        refund_qs = Transaction.objects.filter(
-            type=TypeTransaction.REMBOURSEMENT,
-            statut=StatutTransaction.VALIDEE
-        )
-
-        # Filtre par projet si sélectionné
-        if project_filter:
-            invest_qs = invest_qs.filter(projet_id=project_filter)
-            refund_qs = refund_qs.filter(investissement__projet_id=project_filter)
-
-        # Agrégation mensuelle
-        invest_data = (
-            invest_qs
-            .annotate(mois=TruncMonth('date_investissement'))
-            .values('mois')
-            .annotate(total=Sum('montant'))
-            .order_by('mois')
-        )
-
-        refund_data = (
-            refund_qs
-            .annotate(mois=TruncMonth('date_transaction'))
-            .values('mois')
-            .annotate(total=Sum('montant'))
-            .order_by('mois')
-        )
-
-        # Fusion mois
-        monthly = defaultdict(lambda: {'invest': 0, 'refund': 0})
-
-        for row in invest_data:
-            key = row['mois'].strftime('%b %Y')
-            monthly[key]['invest'] = float(row['total'])
-
-        for row in refund_data:
-            key = row['mois'].strftime('%b %Y')
-            monthly[key]['refund'] = float(row['total'])
-
-        chart_labels = list(monthly.keys())
-        chart_invest = [monthly[m]['invest'] for m in chart_labels]
-        chart_refund = [monthly[m]['refund'] for m in chart_labels]
+        # Investissements confirmés et remboursements validés, une ligne de cumul par mois
+        chart_labels = []
+        chart_invest = []
+        chart_refund = []
+        for mois, montant_investi, montant_rembourse in CumulMensuel.serie(project_filter or None).values_list(
+            'mois', 'montant_investi', 'montant_rembourse'
+        ):
+            chart_labels.append(mois.strftime('%b %Y'))
+            chart_invest.append(float(montant_investi))
+            chart_refund.append(float(montant_rembourse))
 
         
         # Projets pour filtre
@@ -1114,21 +1068,6 @@ def admin_gestion_investissements(request):
         ).order_by('-date_creation')
         
         # Évolution
-        mois_precedent_debut = (mois_debut - timezone.timedelta(days=32)).replace(day=1)
-        mois_precedent_fin = mois_debut - timezone.timedelta(days=1)
-        
-        investissements_mois_precedent = Investissement.objects.filter(
-            date_investissement__date__gte=mois_precedent_debut.date(),
-            date_investissement__date__lte=mois_precedent_fin.date(),
-            statut__in=[
-                StatutInvestissement.PAIEMENT_RECU,
-                StatutInvestissement.CONFIRME
-            ]
-        ).aggregate(
-            total=Sum('montant')
-        )['total'] or Decimal('0')
-
-        
         evolution_mois = 0
         if investissements_mois_precedent > 0:
             evolution_mois = ((investissements_mois - investissements_mois_precedent) / investissements_mois_precedent * 100)
@@ -1157,8 +1096,8 @@ def admin_gestion_investissements(request):
             'current_search': search_query,
             'total_count': total_count,
             'confirmed_count': stats_filtered['confirmed_count'] or 0,
-            'attente_paiement_count': stats_filtered['attente_paiement_count'] or 0,
-            'paiement_recu_count': stats_filtered['paiement_recu_count'] or 0,
+            'attente_paiement_count': stats_filtered['pending_payment_count'] or 0,
+            'paiement_recu_count': stats_filtered['payment_received_count'] or 0,
             'confirmed_count': stats_filtered['confirmed_count'] or 0,
             'refunded_count': stats_filtered['refunded_count'] or 0,
             'rejected_count': stats_filtered['rejected_count'] or 0,
@@ -1740,10 +1679,11 @@ def admin_liste_investisseurs(request, project_id):
     ).select_related('investisseur').order_by('-date_investissement')
     
     # Statistiques
+    solde = SoldeFinancement.pour_projet(projet)
     stats = {
-        'total_investisseurs': investissements.values('investisseur').distinct().count(),
-        'total_montant': investissements.aggregate(total=Sum('montant'))['total'] or 0,
-        'moyenne_investissement': investissements.aggregate(moyenne=Avg('montant'))['moyenne'] or 0,
+        'total_investisseurs': solde.nombre_investisseurs,
+        'total_montant': solde.montant_confirme,
+        'moyenne_investissement': solde.montant_moyen_confirme,
     }
     
     # Groupement par investisseur
@@ -1777,7 +1717,7 @@ def admin_liste_investisseurs(request, project_id):
         'projet': projet,
         'investisseurs': investisseurs_liste,
         'stats': stats,
-        'total_investissements': investissements.count(),
+        'total_investissements': solde.investissements_confirmes,
     }
     
     return render(request, 'admin/projets/investisseurs.html', context)  
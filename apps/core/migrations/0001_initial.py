@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefixe', models.CharField(max_length=10, verbose_name='Préfixe')),
+                ('annee', models.PositiveIntegerField(verbose_name='Année')),
+                ('dernier_numero', models.PositiveBigIntegerField(default=0, verbose_name='Dernier numéro réservé')),
+            ],
+            options={
+                'verbose_name': 'Séquence de références',
+                'verbose_name_plural': 'Séquences de références',
+                'unique_together': {('prefixe', 'annee')},
+            },
+        ),
+    ]
@@ -1,2 +1,21 @@
-# Le module core n'a pas besoin de modèles spécifiques
-# Il contient les fonctions partagées et utilitaires
+# Le module core contient les fonctions partagées et utilitaires
+# ainsi que les quelques modèles techniques communs aux autres applications
+from django.db import models
+
+
+class SequenceReference(models.Model):
+    """
+    Compteur de références par préfixe et par année (PROJ-, INV-, TXN-...)
+    Le dernier numéro réservé est avancé par blocs (voir apps.core.sequences)
+    """
+    prefixe = models.CharField(max_length=10, verbose_name="Préfixe")
+    annee = models.PositiveIntegerField(verbose_name="Année")
+    dernier_numero = models.PositiveBigIntegerField(default=0, verbose_name="Dernier numéro réservé")
+
+    class Meta:
+        verbose_name = "Séquence de références"
+        verbose_name_plural = "Séquences de références"
+        unique_together = ['prefixe', 'annee']
+
+    def __str__(self):
+        return f"{self.prefixe}-{self.annee} : {self.dernier_numero}"
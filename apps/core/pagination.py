@@ -0,0 +1,47 @@
+"""
+Pagination par curseur sur (date DESC, id DESC)
+Plateforme crowdBuilding - Burkina Faso
+
+`WHERE (date, id) < curseur ORDER BY date DESC, id DESC LIMIT n + 1` part
+directement de la position du curseur dans l'index composé : le coût d'une
+page ne dépend ni de sa position ni du volume total, là où OFFSET relit
+toutes les lignes qui précèdent. Le curseur est opaque pour le client
+("<microsecondes depuis l'époque>_<id>").
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+EPOQUE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECONDE = timedelta(microseconds=1)
+
+
+def encoder_curseur(date, pk):
+    return f'{(date - EPOQUE) // MICROSECONDE}_{pk}'
+
+
+def decoder_curseur(curseur):
+    """(date, pk), ou None si le curseur est absent ou invalide (première page)"""
+    try:
+        microsecondes, pk = curseur.split('_')
+        return EPOQUE + int(microsecondes) * MICROSECONDE, int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def paginer_par_curseur(queryset, curseur=None, taille=20, champ='date_creation'):
+    """
+    Une page du queryset, du plus récent au plus ancien
+    Retourne (éléments, curseur de la page suivante ou None)
+    """
+    position = decoder_curseur(curseur)
+    if position:
+        date, pk = position
+        queryset = queryset.filter(Q(**{f'{champ}__lt': date}) | Q(**{champ: date, 'pk__lt': pk}))
+
+    elements = list(queryset.order_by(f'-{champ}', '-pk')[:taille + 1])
+    if len(elements) <= taille:
+        return elements, None
+
+    elements = elements[:taille]
+    return elements, encoder_curseur(getattr(elements[-1], champ), elements[-1].pk)
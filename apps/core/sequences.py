@@ -0,0 +1,173 @@
+"""
+Allocation des références métier (PROJ-, INV-, TXN-...)
+Plateforme crowdBuilding - Burkina Faso
+
+Chaque processus réserve un bloc de numéros (schéma hi/lo) dans la table
+SequenceReference puis les distribue en mémoire. La réservation passe par une
+connexion dédiée validée immédiatement : elle ne dépend jamais de la
+transaction métier en cours et le verrou sur la ligne du compteur ne dure que
+le temps d'un UPDATE et d'un SELECT.
+"""
+import os
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.utils import timezone
+
+TAILLE_BLOC_DEFAUT = 20
+
+# État propre au processus : (prefixe, annee) -> [prochain numéro, dernier numéro du bloc]
+_blocs = {}
+_verrou = threading.Lock()
+_pid = os.getpid()
+_local = threading.local()
+
+
+def _connexion_dediee():
+    """Connexion propre au thread, indépendante des transactions de l'ORM"""
+    connexion = getattr(_local, 'connexion', None)
+    if connexion is None or _local.pid != os.getpid():
+        connexion = connections.create_connection(DEFAULT_DB_ALIAS)
+        _local.connexion = connexion
+        _local.pid = os.getpid()
+    connexion.close_if_unusable_or_obsolete()
+    return connexion
+
+
+def _reservation_dans_la_transaction():
+    """
+    SQLite verrouille toute la base en écriture : une connexion dédiée attendrait
+    la transaction en cours. La réservation se fait alors dans celle de l'appelant,
+    un numéro à la fois (pas de bloc en mémoire qui survivrait à un rollback)
+    """
+    return connections[DEFAULT_DB_ALIAS].vendor == 'sqlite'
+
+
+def _dernier_numero_existant(modele, prefixe, annee):
+    """Plus grand numéro déjà attribué avant la mise en place de la séquence"""
+    dernier = 0
+    references = modele.objects.filter(
+        reference__startswith=f'{prefixe}-{annee}-'
+    ).values_list('reference', flat=True)
+    for reference in references.iterator():
+        try:
+            dernier = max(dernier, int(reference.rsplit('-', 1)[-1]))
+        except ValueError:
+            continue
+    return dernier
+
+
+def _reserver_bloc(prefixe, annee, taille, modele):
+    """
+    Avance le compteur de `taille` numéros et retourne (premier, dernier)
+    """
+    if _reservation_dans_la_transaction():
+        with transaction.atomic():
+            return _executer_reservation(connections[DEFAULT_DB_ALIAS], prefixe, annee, taille, modele)
+
+    connexion = _connexion_dediee()
+    for _ in range(2):
+        connexion.set_autocommit(False)
+        try:
+            bloc = _executer_reservation(connexion, prefixe, annee, taille, modele)
+            connexion.commit()
+            return bloc
+        except IntegrityError:
+            # Un autre processus a créé la ligne entre-temps : on recommence
+            connexion.rollback()
+        except Exception:
+            connexion.rollback()
+            raise
+        finally:
+            connexion.set_autocommit(True)
+
+    raise RuntimeError(f"Impossible de réserver un bloc pour la séquence {prefixe}-{annee}")
+
+
+def _executer_reservation(connexion, prefixe, annee, taille, modele):
+    from .models import SequenceReference
+
+    qn = connexion.ops.quote_name
+    table = qn(SequenceReference._meta.db_table)
+    colonne = qn('dernier_numero')
+    filtre = f"{qn('prefixe')} = %s AND {qn('annee')} = %s"
+
+    with connexion.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {colonne} = {colonne} + %s WHERE {filtre}",
+            [taille, prefixe, annee]
+        )
+        if cursor.rowcount == 0:
+            # Première réservation de l'année : partir des références existantes
+            depart = _dernier_numero_existant(modele, prefixe, annee)
+            cursor.execute(
+                f"INSERT INTO {table} ({qn('prefixe')}, {qn('annee')}, {colonne}) "
+                f"VALUES (%s, %s, %s)",
+                [prefixe, annee, depart + taille]
+            )
+        cursor.execute(f"SELECT {colonne} FROM {table} WHERE {filtre}", [prefixe, annee])
+        dernier = cursor.fetchone()[0]
+
+    return dernier - taille + 1, dernier
+
+
+class SequenceReferences:
+    """
+    Générateur de références `PREFIXE-AAAA-NNNN` sans contention
+
+    Les numéros sont uniques mais pas forcément contigus : un bloc réservé par
+    un processus qui s'arrête est perdu.
+    """
+
+    def __init__(self, prefixe, modele, taille_bloc=None):
+        self.prefixe = prefixe
+        self.modele = modele  # 'app_label.NomModele', résolu à la première réservation
+        self.taille_bloc = taille_bloc
+
+    def __repr__(self):
+        return f"<SequenceReferences {self.prefixe}>"
+
+    def formater(self, annee, numero):
+        return f'{self.prefixe}-{annee}-{numero:04d}'
+
+    def allocate(self, n=1):
+        """
+        Réserve `n` références d'un coup (utile avant un bulk_create)
+        """
+        global _pid
+
+        if n < 1:
+            return []
+
+        annee = timezone.now().year
+        cle = (self.prefixe, annee)
+        taille_bloc = self.taille_bloc or getattr(settings, 'SEQUENCE_TAILLE_BLOC', TAILLE_BLOC_DEFAUT)
+        numeros = []
+
+        with _verrou:
+            # Après un fork (gunicorn --preload), ne pas partager les blocs du parent
+            if os.getpid() != _pid:
+                _blocs.clear()
+                _pid = os.getpid()
+
+            if _reservation_dans_la_transaction():
+                _blocs.pop(cle, None)
+                taille_bloc = 1
+
+            bloc = _blocs.get(cle)
+            while len(numeros) < n:
+                if bloc is None or bloc[0] > bloc[1]:
+                    taille = max(taille_bloc, n - len(numeros))
+                    bloc = list(_reserver_bloc(self.prefixe, annee, taille, apps.get_model(self.modele)))
+                    _blocs[cle] = bloc
+                pris = min(n - len(numeros), bloc[1] - bloc[0] + 1)
+                numeros.extend(range(bloc[0], bloc[0] + pris))
+                bloc[0] += pris
+
+        return [self.formater(annee, numero) for numero in numeros]
+
+    def prochaine(self):
+        """Retourne la prochaine référence disponible"""
+        return self.allocate(1)[0]
@@ -0,0 +1,158 @@
+import threading
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from apps.accounts.models import Utilisateur
+from apps.core import sequences
+from apps.core.models import SequenceReference
+from apps.core.sequences import SequenceReferences
+from apps.investments.models import SEQUENCE_INVESTISSEMENTS, SEQUENCE_TRANSACTIONS
+from apps.projects.models import SEQUENCE_PROJETS, Projet
+
+
+class SequenceReferencesConcurrenteTests(TransactionTestCase):
+
+    FILS = 8
+    ALLOCATIONS = 40
+
+    def setUp(self):
+        sequences._blocs.clear()
+
+    def allouer(self, sequence, resultats, erreurs):
+        try:
+            for rang in range(self.ALLOCATIONS):
+                resultats.extend(sequence.allocate(1 + rang % 3))
+        except Exception as erreur:
+            erreurs.append(erreur)
+        finally:
+            connections.close_all()
+
+    def test_references_uniques(self):
+        sequences_testees = (SEQUENCE_PROJETS, SEQUENCE_INVESTISSEMENTS, SEQUENCE_TRANSACTIONS)
+        resultats = {sequence.prefixe: [] for sequence in sequences_testees}
+        erreurs = []
+        fils = [
+            threading.Thread(target=self.allouer, args=(sequence, resultats[sequence.prefixe], erreurs))
+            for sequence in sequences_testees
+            for _ in range(self.FILS)
+        ]
+        for f in fils:
+            f.start()
+        for f in fils:
+            f.join()
+
+        self.assertEqual(erreurs, [])
+        attendues = self.FILS * sum(1 + rang % 3 for rang in range(self.ALLOCATIONS))
+        annee = timezone.now().year
+        for prefixe, references in resultats.items():
+            self.assertEqual(len(references), attendues)
+            self.assertEqual(len(set(references)), attendues, prefixe)
+            self.assertTrue(all(reference.startswith(f'{prefixe}-{annee}-') for reference in references))
+            dernier = SequenceReference.objects.get(prefixe=prefixe, annee=annee).dernier_numero
+            self.assertLessEqual(max(int(reference.rsplit('-', 1)[-1]) for reference in references), dernier)
+
+    def test_reprise_apres_fork(self):
+        avant = set(SEQUENCE_TRANSACTIONS.allocate(5))
+        # Processus enfant : les blocs du parent ne doivent pas être réutilisés
+        sequences._pid = -1
+        apres = set(SEQUENCE_TRANSACTIONS.allocate(5))
+        self.assertFalse(avant & apres)
+
+
+class SequenceBlocsConnexionDedieeTests(TransactionTestCase):
+    """Chemin de production (MySQL) : blocs hi/lo réservés sur une connexion dédiée"""
+
+    TAILLE_BLOC = 5
+    FILS = 6
+    ALLOCATIONS = 30
+
+    def setUp(self):
+        sequences._blocs.clear()
+        dediee = mock.patch.object(sequences, '_reservation_dans_la_transaction', return_value=False)
+        dediee.start()
+        self.addCleanup(dediee.stop)
+        self.addCleanup(self.fermer_connexion_dediee)
+        self.sequence = SequenceReferences('TST', 'projects.Projet', taille_bloc=self.TAILLE_BLOC)
+        self.annee = timezone.now().year
+
+    def fermer_connexion_dediee(self):
+        connexion = getattr(sequences._local, 'connexion', None)
+        if connexion is not None:
+            connexion.close()
+            del sequences._local.connexion
+
+    def numeros(self, references):
+        return [int(reference.rsplit('-', 1)[-1]) for reference in references]
+
+    def compteur(self):
+        return SequenceReference.objects.get(prefixe='TST', annee=self.annee).dernier_numero
+
+    def test_blocs_survivent_au_rollback(self):
+        attribues = self.numeros(self.sequence.allocate(3))
+        self.assertEqual(attribues, [1, 2, 3])
+        self.assertEqual(self.compteur(), self.TAILLE_BLOC)
+        self.assertIsNot(sequences._local.connexion, connection)
+
+        # Transaction métier annulée : le bloc suivant, validé sur la connexion dédiée, reste réservé
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            attribues += self.numeros(self.sequence.allocate(4))
+            1 / 0
+        self.assertEqual(self.compteur(), 2 * self.TAILLE_BLOC)
+
+        attribues += self.numeros(self.sequence.allocate(3))
+        # Ni trou ni doublon entre les blocs
+        self.assertEqual(attribues, list(range(1, 2 * self.TAILLE_BLOC + 1)))
+
+        # Processus redémarré : les numéros restants du bloc en mémoire sont perdus, jamais réattribués
+        sequences._blocs.clear()
+        self.assertEqual(self.numeros(self.sequence.allocate(1)), [2 * self.TAILLE_BLOC + 1])
+
+    def allouer(self, resultats, erreurs):
+        try:
+            for rang in range(self.ALLOCATIONS):
+                resultats.extend(self.numeros(self.sequence.allocate(1 + rang % 3)))
+        except Exception as erreur:
+            erreurs.append(erreur)
+        finally:
+            self.fermer_connexion_dediee()
+            connections.close_all()
+
+    def test_blocs_concurrents(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("SQLite en mémoire : un écrivain concurrent échoue au lieu d'attendre le verrou")
+        resultats, erreurs = [], []
+        fils = [threading.Thread(target=self.allouer, args=(resultats, erreurs)) for _ in range(self.FILS)]
+        for f in fils:
+            f.start()
+        for f in fils:
+            f.join()
+
+        self.assertEqual(erreurs, [])
+        attendues = self.FILS * sum(1 + rang % 3 for rang in range(self.ALLOCATIONS))
+        self.assertEqual(len(set(resultats)), attendues)
+        # Les numéros non distribués ne sont que les restes de blocs, au plus un par fil
+        self.assertLessEqual(self.compteur() - attendues, self.FILS * (self.TAILLE_BLOC - 1))
+
+
+class SequenceDepartTests(TestCase):
+
+    def setUp(self):
+        sequences._blocs.clear()
+
+    def test_depart_apres_references_existantes(self):
+        promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        annee = timezone.now().year
+        Projet.objects.create(
+            reference=f'PROJ-{annee}-0042', titre='Résidence', description='d',
+            montant_total=Decimal('1000000'), nombre_total_parts=100, prix_unitaire=Decimal('10000'),
+            duree=12, date_debut=date(2026, 1, 1), date_fin=date(2027, 1, 1),
+            localisation='Ouagadougou', promoteur=promoteur
+        )
+        SequenceReference.objects.filter(prefixe='PROJ').delete()
+
+        self.assertEqual(SEQUENCE_PROJETS.prochaine(), f'PROJ-{annee}-0043')
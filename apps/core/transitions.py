@@ -0,0 +1,105 @@
+"""
+Transitions de statut par compare-and-swap
+Plateforme crowdBuilding - Burkina Faso
+
+Chaque transition est un UPDATE conditionnel sur le statut attendu :
+`UPDATE ... SET statut = <cible> WHERE id = ? AND statut = <statut lu>`.
+Le nombre de lignes modifiées dit si la transition a eu lieu ; les effets de
+bord (réservations, soldes, notifications) n'en dépendent qu'à cette condition.
+Deux requêtes concurrentes ne peuvent donc plus appliquer la même transition.
+
+Le signal `transition_appliquee` est envoyé après chaque transition effective
+(ces UPDATE ne passent pas par post_save) : sender=modèle, transition, nombre
+de lignes, statuts d'origine (`anciens`) quand ils sont connus, instance.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+transition_appliquee = Signal()
+
+
+class TransitionInvalide(ValueError):
+    """Le statut actuel ne permet pas la transition demandée"""
+
+
+class Transition:
+    """
+    Passage d'un ou plusieurs statuts sources vers un statut cible
+
+    Usage sur un modèle :
+        TRANSITIONS = {
+            'valider': Transition([Statut.EN_ATTENTE], Statut.VALIDEE),
+        }
+    """
+
+    def __init__(self, sources, cible, champ='statut'):
+        self.sources = tuple(sources)
+        self.cible = cible
+        self.champ = champ
+
+    def __repr__(self):
+        return f"<Transition {'/'.join(self.sources)} -> {self.cible}>"
+
+    def autorise(self, statut):
+        return statut in self.sources
+
+    def appliquer(self, instance, **champs):
+        """
+        Compare-and-swap sur une instance chargée, avec le statut lu en mémoire
+        Lève TransitionInvalide sans requête si ce statut ne le permet pas
+        Retourne True si la ligne a changé (l'instance est alors mise à jour),
+        False si un autre traitement l'a modifiée entre-temps
+        """
+        actuel = getattr(instance, self.champ)
+        if not self.autorise(actuel):
+            raise TransitionInvalide(
+                f"Transition impossible depuis le statut {actuel} vers {self.cible}"
+            )
+
+        modifiees = type(instance)._default_manager.filter(
+            pk=instance.pk,
+            **{self.champ: actuel}
+        ).update(**{self.champ: self.cible}, **champs)
+
+        if modifiees:
+            setattr(instance, self.champ, self.cible)
+            for nom, valeur in champs.items():
+                setattr(instance, nom, valeur)
+            transition_appliquee.send(
+                sender=type(instance), transition=self, nombre=1, anciens=[actuel], instance=instance
+            )
+        return bool(modifiees)
+
+    def appliquer_a(self, queryset, **champs):
+        """
+        Un seul UPDATE conditionnel sur un queryset, sans lecture préalable
+        Retourne le nombre de lignes modifiées
+        """
+        modifiees = queryset.filter(**{f'{self.champ}__in': self.sources}).update(
+            **{self.champ: self.cible}, **champs
+        )
+        if modifiees:
+            transition_appliquee.send(sender=queryset.model, transition=self, nombre=modifiees)
+        return modifiees
+
+    def appliquer_en_masse(self, queryset, lire=(), **champs):
+        """
+        Variante groupée : verrouille les lignes éligibles puis les modifie en un UPDATE
+        Retourne les lignes modifiées : (pk, statut d'origine, *lire)
+        """
+        with transaction.atomic():
+            lignes = list(
+                queryset.filter(**{f'{self.champ}__in': self.sources})
+                .order_by('pk')
+                .select_for_update()
+                .values_list('pk', self.champ, *lire)
+            )
+            if lignes:
+                queryset.model._default_manager.filter(
+                    pk__in=[ligne[0] for ligne in lignes]
+                ).update(**{self.champ: self.cible}, **champs)
+                transition_appliquee.send(
+                    sender=queryset.model, transition=self, nombre=len(lignes),
+                    anciens=[ligne[1] for ligne in lignes]
+                )
+        return lignes
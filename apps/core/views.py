@@ -7,8 +7,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
+from apps.projects import cartes
 from apps.projects.models import Projet
-from apps.investments.models import Investissement
+from apps.investments.models import Investissement, SoldeFinancement
 from apps.notifications.models import Notification
 from apps.accounts.models import Utilisateur
 
@@ -18,6 +19,7 @@ def home(request):
     Page d'accueil de la plateforme
     """
     # Statistiques générales
+    solde = SoldeFinancement.globale()
     stats = {
         'total_projets': Projet.objects.filter(
             statut__in=['VALIDE', 'EN_COURS_FINANCEMENT', 'FINANCE', 'EN_REALISATION', 'TERMINE']
@@ -25,12 +27,8 @@ def home(request):
         'projets_actifs': Projet.objects.filter(
             statut__in=['VALIDE', 'EN_COURS_FINANCEMENT']
         ).count(),
-        'montant_total_collecte': Investissement.objects.filter(
-            statut='CONFIRME'
-        ).aggregate(total=Sum('montant'))['total'] or 0,
-        'total_investisseurs': Investissement.objects.filter(
-            statut='CONFIRME'
-        ).values('investisseur').distinct().count(),
+        'montant_total_collecte': solde.montant_confirme,
+        'total_investisseurs': solde.nombre_investisseurs,
     }
     
     # Projets en vedette (les plus récents validés)
@@ -47,8 +45,9 @@ def home(request):
     
     context = {
         'stats': stats,
-        'projets_vedette': projets_vedette,
-        'projets_populaires': projets_populaires,
+        # 🃏 Cartes pré-rendues, rendues seulement si le projet a changé
+        'projets_vedette': cartes.rendre(projets_vedette, 'core/carte_projet_vedette.html'),
+        'projets_populaires': cartes.rendre(projets_populaires, 'core/carte_projet_populaire.html'),
     }
     
     return render(request, 'core/home.html', context)
@@ -91,10 +90,11 @@ def get_dashboard_admin_data():
     """
     Données pour le dashboard administrateur
     """
-    from django.db.models import Q, Sum, Count
+    from django.db.models import Q, Count
     from apps.documents.models import Document
 
     # Stats générales
+    solde = SoldeFinancement.globale()
     total_projets = Projet.objects.count()
     projets_finances = Projet.objects.filter(statut='FINANCE').count()
 
@@ -107,12 +107,8 @@ def get_dashboard_admin_data():
         'projets_en_attente': Projet.objects.filter(
             statut='EN_ATTENTE_VALIDATION'
         ).count(),
-        'total_investissements': Investissement.objects.filter(
-            statut='CONFIRME'
-        ).count(),
-        'montant_total_collecte': Investissement.objects.filter(
-            statut='CONFIRME'
-        ).aggregate(total=Sum('montant'))['total'] or 0,
+        'total_investissements': solde.investissements_confirmes,
+        'montant_total_collecte': solde.montant_confirme,
         'taux_reussite': round((projets_finances / max(total_projets, 1)) * 100, 1),
     }
 
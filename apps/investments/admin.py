@@ -8,6 +8,9 @@ from django.contrib import messages
 from .models import (
     Investissement,
     Transaction,
+    ReservationParts,
+    SoldeFinancement,
+    CumulMensuel,
     StatutInvestissement,
     StatutTransaction
 )
@@ -46,8 +49,10 @@ class InvestissementAdmin(admin.ModelAdmin):
 
     ordering = ('-date_investissement',)
 
+    # Le statut ne change que par les actions (confirmer / rejeter)
     readonly_fields = (
         'reference',
+        'statut',
         'date_investissement'
     )
 
@@ -90,16 +95,7 @@ class InvestissementAdmin(admin.ModelAdmin):
 
     @admin.action(description="Confirmer les investissements (paiement reçu)")
     def confirmer_investissements(self, request, queryset):
-        count = 0
-
-        for investissement in queryset.filter(
-            statut__in=[
-                StatutInvestissement.PAIEMENT_RECU,
-                StatutInvestissement.EN_ATTENTE_PAIEMENT
-            ]
-        ):
-            investissement.confirmer_par_admin()
-            count += 1
+        count = Investissement.confirmer_en_masse(queryset)
 
         self.message_user(
             request,
@@ -109,13 +105,7 @@ class InvestissementAdmin(admin.ModelAdmin):
 
     @admin.action(description="Rejeter les investissements sélectionnés")
     def rejeter_investissements(self, request, queryset):
-        count = 0
-
-        for investissement in queryset.exclude(
-            statut=StatutInvestissement.CONFIRME
-        ):
-            investissement.rejeter()
-            count += 1
+        count = Investissement.rejeter_en_masse(queryset, "Rejet depuis l'administration")
 
         self.message_user(
             request,
@@ -189,13 +179,12 @@ class TransactionAdmin(admin.ModelAdmin):
 
     @admin.action(description="Valider les paiements sélectionnés")
     def valider_paiements(self, request, queryset):
-        count = 0
-
-        for transaction in queryset.filter(
-            statut=StatutTransaction.EN_ATTENTE
-        ):
-            transaction.valider_paiement()
-            count += 1
+        count = Transaction.valider_en_masse(list(
+            queryset.filter(
+                statut=StatutTransaction.EN_ATTENTE,
+                investissement__statut=StatutInvestissement.EN_ATTENTE_PAIEMENT
+            ).values_list('id', flat=True)
+        ))
 
         self.message_user(
             request,
@@ -205,16 +194,119 @@ class TransactionAdmin(admin.ModelAdmin):
 
     @admin.action(description="Annuler les transactions sélectionnées")
     def annuler_transactions(self, request, queryset):
-        count = 0
-
-        for transaction in queryset.exclude(
-            statut=StatutTransaction.ANNULEE
-        ):
-            transaction.annuler()
-            count += 1
+        count = Transaction.annuler_en_masse(queryset)
 
         self.message_user(
             request,
             f"{count} transaction(s) annulée(s).",
             level=messages.WARNING
         )
+
+
+# ==================================================
+# ADMIN RÉSERVATION DE PARTS
+# ==================================================
+
+@admin.register(ReservationParts)
+class ReservationPartsAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'projet',
+        'investisseur',
+        'nombre_parts',
+        'statut',
+        'date_creation',
+        'date_expiration'
+    )
+
+    list_filter = (
+        'statut',
+        'date_creation'
+    )
+
+    search_fields = (
+        'projet__titre',
+        'investisseur__nom',
+        'investisseur__prenom'
+    )
+
+    raw_id_fields = (
+        'projet',
+        'investisseur',
+        'investissement',
+        'transaction_paiement'
+    )
+
+    readonly_fields = (
+        'statut',
+        'date_creation'
+    )
+
+
+# ==================================================
+# ADMIN SOLDES
+# ==================================================
+
+@admin.register(SoldeFinancement)
+class SoldeFinancementAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'cle',
+        'projet',
+        'investisseur',
+        'montant_confirme',
+        'montant_en_attente',
+        'montant_rembourse',
+        'nombre_investisseurs',
+        'nombre_projets'
+    )
+
+    search_fields = (
+        'cle',
+        'projet__titre',
+        'investisseur__email'
+    )
+
+    raw_id_fields = (
+        'projet',
+        'investisseur'
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CumulMensuel)
+class CumulMensuelAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'cle',
+        'projet',
+        'mois',
+        'montant_investi',
+        'investissements',
+        'montant_rembourse',
+        'remboursements'
+    )
+
+    list_filter = (
+        'mois',
+    )
+
+    search_fields = (
+        'cle',
+        'projet__titre'
+    )
+
+    raw_id_fields = (
+        'projet',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,25 @@
+"""
+Libère les réservations de parts dont le délai de paiement est dépassé
+Usage : python manage.py liberer_reservations (à planifier toutes les minutes)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.investments.models import ReservationParts
+
+
+class Command(BaseCommand):
+    help = "Libère les réservations de parts expirées (non payées)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projet', type=int, default=None, help="Limiter à un projet")
+        parser.add_argument('--lot', type=int, default=500, help="Réservations traitées par transaction")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            liberees = ReservationParts.liberer_expirees(projet_id=options['projet'], limite=options['lot'])
+            total += liberees
+            if liberees < options['lot']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"{total} réservation(s) expirée(s) libérée(s)"))
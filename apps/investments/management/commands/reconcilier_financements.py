@@ -0,0 +1,229 @@
+"""
+Vérifie (et corrige) les totaux dénormalisés des projets
+Usage : python manage.py reconcilier_financements [--rapport ecarts.csv] [--repair] [--processus 4]
+
+Les investissements, réservations et transactions sont parcourus par pages
+(pagination par clé + iterator) : la mémoire ne dépend que du nombre de projets.
+"""
+import csv
+import multiprocessing
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Mod
+
+from apps.investments.models import (
+    Investissement,
+    ReservationParts,
+    RESERVATIONS_EN_COURS,
+    StatutInvestissement,
+    StatutTransaction,
+    Transaction,
+    TypeTransaction,
+)
+from apps.projects import catalogue
+from apps.projects.models import Projet
+
+# Compteurs de Projet recalculés à partir des tables sources
+CHAMPS_RECONCILIES = ('montant_collecte', 'parts_vendues', 'parts_reservees')
+
+COLONNES_RAPPORT = ['projet_id', 'reference', 'champ', 'valeur_stockee', 'valeur_calculee', 'ecart', 'corrige']
+
+
+def _parcourir(queryset, champs, lot):
+    """Itère sur un queryset par pages `pk > dernier` sans jamais tout charger"""
+    dernier = 0
+    while True:
+        page = queryset.filter(pk__gt=dernier).order_by('pk').values_list('pk', *champs)[:lot]
+        lus = 0
+        for ligne in page.iterator(chunk_size=lot):
+            dernier = ligne[0]
+            lus += 1
+            yield ligne[1:]
+        if lus < lot:
+            return
+
+
+def _filtrer_shard(queryset, champ_projet, shard, shards):
+    if shards <= 1:
+        return queryset
+    return queryset.alias(_shard=Mod(champ_projet, shards)).filter(_shard=shard)
+
+
+def _totaux_vides():
+    return {
+        'montant_collecte': Decimal('0'),
+        'parts_vendues': 0,
+        'parts_reservees': 0,
+        'montant_paye': Decimal('0'),
+    }
+
+
+def calculer_totaux(shard=0, shards=1, lot=5000):
+    """Totaux réels par projet, en une passe sur chaque table source"""
+    totaux = defaultdict(_totaux_vides)
+
+    investissements = _filtrer_shard(
+        Investissement.objects.filter(statut=StatutInvestissement.CONFIRME),
+        'projet_id', shard, shards
+    )
+    for projet_id, montant, nombre_parts in _parcourir(investissements, ('projet_id', 'montant', 'nombre_parts'), lot):
+        totaux[projet_id]['montant_collecte'] += montant
+        totaux[projet_id]['parts_vendues'] += nombre_parts
+
+    reservations = _filtrer_shard(
+        ReservationParts.objects.filter(statut__in=RESERVATIONS_EN_COURS),
+        'projet_id', shard, shards
+    )
+    for projet_id, nombre_parts in _parcourir(reservations, ('projet_id', 'nombre_parts'), lot):
+        totaux[projet_id]['parts_reservees'] += nombre_parts
+
+    transactions = _filtrer_shard(
+        Transaction.objects.filter(statut=StatutTransaction.VALIDEE),
+        'investissement__projet_id', shard, shards
+    )
+    for projet_id, montant, type_transaction in _parcourir(
+        transactions, ('investissement__projet_id', 'montant', 'type'), lot
+    ):
+        if type_transaction == TypeTransaction.REMBOURSEMENT:
+            totaux[projet_id]['montant_paye'] -= montant
+        else:
+            totaux[projet_id]['montant_paye'] += montant
+
+    return totaux
+
+
+def comparer(totaux, shard=0, shards=1, lot=5000):
+    """Lignes d'écart entre les compteurs stockés et les totaux calculés"""
+    ecarts = []
+    projets = _filtrer_shard(Projet.objects.all(), 'id', shard, shards)
+    for projet_id, reference, *stockes in _parcourir(projets, ('id', 'reference') + CHAMPS_RECONCILIES, lot):
+        calcules = totaux.get(projet_id) or _totaux_vides()
+        for champ, valeur_stockee in zip(CHAMPS_RECONCILIES, stockes):
+            if valeur_stockee != calcules[champ]:
+                ecarts.append({
+                    'projet_id': projet_id,
+                    'reference': reference,
+                    'champ': champ,
+                    'valeur_stockee': valeur_stockee,
+                    'valeur_calculee': calcules[champ],
+                    'ecart': calcules[champ] - valeur_stockee,
+                    'corrige': False,
+                })
+        # Collecte confirmée sans paiement validé correspondant : signalé, jamais corrigé
+        if calcules['montant_collecte'] > calcules['montant_paye']:
+            ecarts.append({
+                'projet_id': projet_id,
+                'reference': reference,
+                'champ': 'paiements_valides',
+                'valeur_stockee': calcules['montant_paye'],
+                'valeur_calculee': calcules['montant_collecte'],
+                'ecart': calcules['montant_collecte'] - calcules['montant_paye'],
+                'corrige': False,
+            })
+    return ecarts
+
+
+def reparer(ecarts, taille_lot=50):
+    """
+    Recalcule et réécrit les compteurs des projets en écart, par petites transactions
+    Le projet est verrouillé pendant le recalcul : une confirmation concurrente
+    attend et s'applique ensuite sur la valeur corrigée
+    """
+    projets = sorted({e['projet_id'] for e in ecarts if e['champ'] in CHAMPS_RECONCILIES})
+    corriges = set()
+
+    for debut in range(0, len(projets), taille_lot):
+        with transaction.atomic():
+            for projet_id in projets[debut:debut + taille_lot]:
+                if not Projet.objects.select_for_update().filter(pk=projet_id).exists():
+                    continue
+                confirmes = Investissement.objects.filter(
+                    projet_id=projet_id,
+                    statut=StatutInvestissement.CONFIRME
+                ).aggregate(montant=Sum('montant'), parts=Sum('nombre_parts'))
+                reservees = ReservationParts.objects.filter(
+                    projet_id=projet_id,
+                    statut__in=RESERVATIONS_EN_COURS
+                ).aggregate(parts=Sum('nombre_parts'))
+                Projet.objects.filter(pk=projet_id).update(
+                    montant_collecte=confirmes['montant'] or 0,
+                    parts_vendues=confirmes['parts'] or 0,
+                    parts_reservees=reservees['parts'] or 0,
+                    version_carte=F('version_carte') + 1,
+                )
+                corriges.add(projet_id)
+            if corriges:
+                # Compteurs réécrits par queryset, hors Projet.save : facettes du catalogue à recalculer
+                catalogue.invalider()
+
+    for ecart in ecarts:
+        if ecart['projet_id'] in corriges and ecart['champ'] in CHAMPS_RECONCILIES:
+            ecart['corrige'] = True
+    return ecarts
+
+
+def traiter_shard(shard, shards, lot):
+    """Point d'entrée d'un processus : une tranche de projets (projet_id % shards == shard)"""
+    connections.close_all()
+    return comparer(calculer_totaux(shard, shards, lot), shard, shards, lot)
+
+
+class Command(BaseCommand):
+    help = "Compare montant_collecte / parts_vendues / parts_reservees aux tables sources et corrige les écarts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rapport', help="Fichier CSV des écarts (sortie standard par défaut)")
+        parser.add_argument('--repair', action='store_true', help="Corriger les compteurs en écart")
+        parser.add_argument('--lot', type=int, default=5000, help="Lignes lues par page")
+        parser.add_argument('--processus', type=int, default=1, help="Nombre de processus (shards par projet_id)")
+        parser.add_argument('--shards', type=int, default=1, help="Nombre total de shards (exécution répartie)")
+        parser.add_argument('--shard', type=int, default=0, help="Shard traité par cette exécution")
+
+    def handle(self, *args, **options):
+        lot = options['lot']
+        processus = options['processus']
+
+        if processus > 1:
+            if options['shards'] > 1:
+                raise CommandError("--processus et --shards ne peuvent pas être combinés")
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(processus) as pool:
+                resultats = pool.starmap(
+                    traiter_shard,
+                    [(shard, processus, lot) for shard in range(processus)]
+                )
+            ecarts = [ecart for resultat in resultats for ecart in resultat]
+        else:
+            if not 0 <= options['shard'] < options['shards']:
+                raise CommandError("--shard doit être compris entre 0 et --shards - 1")
+            ecarts = traiter_shard(options['shard'], options['shards'], lot)
+
+        # Les écarts sont peu nombreux : la correction se fait dans le processus principal
+        if options['repair']:
+            reparer(ecarts)
+
+        ecarts.sort(key=lambda e: (e['projet_id'], e['champ']))
+        self._ecrire_rapport(ecarts, options['rapport'])
+
+        projets = {e['projet_id'] for e in ecarts}
+        corriges = {e['projet_id'] for e in ecarts if e['corrige']}
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(ecarts)} écart(s) sur {len(projets)} projet(s), {len(corriges)} projet(s) corrigé(s)"
+        ))
+
+    def _ecrire_rapport(self, ecarts, chemin):
+        if chemin:
+            with open(chemin, 'w', newline='', encoding='utf-8') as fichier:
+                self._ecrire_csv(fichier, ecarts)
+        elif ecarts:
+            self._ecrire_csv(self.stdout, ecarts)
+
+    @staticmethod
+    def _ecrire_csv(fichier, ecarts):
+        writer = csv.DictWriter(fichier, fieldnames=COLONNES_RAPPORT)
+        writer.writeheader()
+        writer.writerows(ecarts)
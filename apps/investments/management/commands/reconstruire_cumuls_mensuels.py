@@ -0,0 +1,18 @@
+"""
+Régénère la table CumulMensuel à partir des investissements confirmés et des remboursements validés
+Usage : python manage.py reconstruire_cumuls_mensuels (après migration, ou si les cumuls divergent)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.investments.models import CumulMensuel
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les cumuls mensuels investis / remboursés, par projet et pour la plateforme"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=1000, help="Lignes insérées par requête")
+
+    def handle(self, *args, **options):
+        ecrites = CumulMensuel.reconstruire(taille_lot=options['lot'])
+        self.stdout.write(self.style.SUCCESS(f"{ecrites} cumul(s) mensuel(s) reconstruit(s)"))
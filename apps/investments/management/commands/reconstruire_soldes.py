@@ -0,0 +1,18 @@
+"""
+Régénère la table SoldeFinancement à partir des investissements
+Usage : python manage.py reconstruire_soldes (après migration, ou si les soldes divergent)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.investments.models import SoldeFinancement
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les soldes par projet, par investisseur et par couple investisseur/projet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=1000, help="Lignes insérées par requête")
+
+    def handle(self, *args, **options):
+        ecrites = SoldeFinancement.reconstruire(taille_lot=options['lot'])
+        self.stdout.write(self.style.SUCCESS(f"{ecrites} solde(s) reconstruit(s)"))
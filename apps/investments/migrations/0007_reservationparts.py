@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:15
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projet_parts_reservees'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('investments', '0006_alter_investissement_statut'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationParts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_parts', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('statut', models.CharField(choices=[('ACTIVE', 'Active'), ('PAYEE', 'Payée'), ('CONVERTIE', 'Convertie en parts vendues'), ('LIBEREE', 'Libérée'), ('EXPIREE', 'Expirée')], default='ACTIVE', max_length=20)),
+                ('date_creation', models.DateTimeField(default=django.utils.timezone.now)),
+                ('date_expiration', models.DateTimeField()),
+                ('investissement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='investments.investissement')),
+                ('investisseur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations_parts', to=settings.AUTH_USER_MODEL)),
+                ('projet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations_parts', to='projects.projet')),
+                ('transaction_paiement', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservation', to='investments.transaction')),
+            ],
+            options={
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['statut', 'date_expiration'], name='investments_statut_85dead_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0030_projet_parts_reservees'),
+        ('investments', '0007_reservationparts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoldeFinancement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=40, unique=True, verbose_name='Clé')),
+                ('montant_confirme', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('parts_confirmees', models.IntegerField(default=0)),
+                ('investissements_confirmes', models.IntegerField(default=0)),
+                ('montant_en_attente', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('parts_en_attente', models.IntegerField(default=0)),
+                ('investissements_en_attente', models.IntegerField(default=0)),
+                ('montant_rembourse', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('parts_remboursees', models.IntegerField(default=0)),
+                ('investissements_rembourses', models.IntegerField(default=0)),
+                ('nombre_investisseurs', models.IntegerField(default=0)),
+                ('nombre_projets', models.IntegerField(default=0)),
+                ('investisseur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='soldes', to=settings.AUTH_USER_MODEL)),
+                ('projet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='soldes', to='projects.projet')),
+            ],
+            options={
+                'verbose_name': 'Solde de financement',
+                'verbose_name_plural': 'Soldes de financement',
+            },
+        ),
+    ]
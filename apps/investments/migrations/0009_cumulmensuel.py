@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projet_parts_reservees'),
+        ('investments', '0008_soldefinancement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CumulMensuel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=30, unique=True, verbose_name='Clé')),
+                ('mois', models.DateField(verbose_name='Mois')),
+                ('montant_investi', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('investissements', models.IntegerField(default=0)),
+                ('montant_rembourse', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('remboursements', models.IntegerField(default=0)),
+                ('projet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cumuls_mensuels', to='projects.projet')),
+            ],
+            options={
+                'verbose_name': 'Cumul mensuel',
+                'verbose_name_plural': 'Cumuls mensuels',
+                'ordering': ['mois'],
+                'indexes': [models.Index(fields=['projet', 'mois'], name='investments_projet__30363a_idx')],
+            },
+        ),
+    ]
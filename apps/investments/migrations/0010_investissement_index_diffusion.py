@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0009_cumulmensuel'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investissement',
+            index=models.Index(fields=['projet', 'statut', 'investisseur'], name='investments_projet__f21889_idx'),
+        ),
+    ]
@@ -3,14 +3,23 @@ Modèles pour la gestion des investissements et transactions
 Plateforme crowdBuilding - Burkina Faso
 """
 
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, models
+from django.db.models.functions import TruncMonth
 from django.forms import ValidationError
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from apps.accounts.models import Utilisateur
 from apps.projects.models import Projet
+from apps.core.sequences import SequenceReferences
+from apps.core.transitions import Transition
 from django.db import transaction as db_transaction
-from django.db import transaction
+
+SEQUENCE_INVESTISSEMENTS = SequenceReferences('INV', 'investments.Investissement')
+SEQUENCE_TRANSACTIONS = SequenceReferences('TXN', 'investments.Transaction')
 
 
 
@@ -40,6 +49,18 @@ class StatutTransaction(models.TextChoices):
     ANNULEE = 'ANNULEE', 'Annulée'
 
 
+class StatutReservation(models.TextChoices):
+    ACTIVE = 'ACTIVE', 'Active'
+    PAYEE = 'PAYEE', 'Payée'
+    CONVERTIE = 'CONVERTIE', 'Convertie en parts vendues'
+    LIBEREE = 'LIBEREE', 'Libérée'
+    EXPIREE = 'EXPIREE', 'Expirée'
+
+
+# Réservations qui bloquent encore des parts sur le projet
+RESERVATIONS_EN_COURS = [StatutReservation.ACTIVE, StatutReservation.PAYEE]
+
+
 # =========================
 # INVESTISSEMENT
 # =========================
@@ -95,28 +116,127 @@ class Investissement(models.Model):
     contrat_accepte = models.BooleanField(default=False)
     date_contrat = models.DateTimeField(null=True, blank=True)
 
+    # Transitions de statut autorisées (compare-and-swap, voir apps.core.transitions)
+    TRANSITIONS = {
+        'recevoir_paiement': Transition([StatutInvestissement.EN_ATTENTE_PAIEMENT], StatutInvestissement.PAIEMENT_RECU),
+        'confirmer': Transition([StatutInvestissement.PAIEMENT_RECU], StatutInvestissement.CONFIRME),
+        'rembourser': Transition([StatutInvestissement.PAIEMENT_RECU], StatutInvestissement.REMBOURSE),
+        'rejeter': Transition([StatutInvestissement.EN_ATTENTE_PAIEMENT], StatutInvestissement.REJETE),
+        'annuler': Transition([StatutInvestissement.EN_ATTENTE_PAIEMENT], StatutInvestissement.ANNULE),
+    }
+
     class Meta:
         ordering = ['-date_investissement']
+        indexes = [
+            # Investisseurs d'un projet par statut, dans l'ordre des id (diffusions)
+            models.Index(fields=['projet', 'statut', 'investisseur']),
+        ]
 
     def __str__(self):
         return f"{self.reference} - {self.investisseur} - {self.projet}"
 
   
+    def _etat_en_base(self):
+        """
+        (état pour les soldes, date d'investissement) de la ligne en base,
+        verrouillée jusqu'à la fin de la transaction ; (None, None) si absente
+        """
+        ligne = Investissement.objects.select_for_update().filter(pk=self.pk).values_list(
+            'projet_id', 'investisseur_id', 'statut', 'montant', 'nombre_parts', 'date_investissement'
+        ).first()
+        return (ligne[:5], ligne[5]) if ligne else (None, None)
+
     def save(self, *args, **kwargs):
         if not self.reference:
-            with transaction.atomic():
-                year = timezone.now().year
-                last = Investissement.objects.select_for_update().filter(
-                    reference__startswith=f'INV-{year}-'
-                ).order_by('-reference').first()
-                number = int(last.reference.split('-')[-1]) + 1 if last else 1
-                self.reference = f'INV-{year}-{number:04d}'
+            self.reference = SEQUENCE_INVESTISSEMENTS.prochaine()
+
+        with db_transaction.atomic():
+            # Les soldes partent de la ligne en base, pas de l'instance chargée :
+            # un paiement confirmé ou annulé entre-temps n'est compté qu'une fois
+            ancien, ancienne_date = (None, None)
+            if self.pk and not self._state.adding:
+                ancien, ancienne_date = self._etat_en_base()
+            if ancien is not None:
+                # Le statut ne change que par une Transition : une instance chargée
+                # avant une confirmation ne la défait pas
+                self.statut = ancien[2]
+            super().save(*args, **kwargs)
+            nouveau = SoldeFinancement.etat(self)
+            self._reporter_sur_projet(ancien, nouveau)
+            SoldeFinancement.appliquer([(ancien, nouveau)])
+            CumulMensuel.suivre_investissement(ancien, nouveau, self.date_investissement, ancienne_date)
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            ancien, ancienne_date = self._etat_en_base()
+            self._reporter_sur_projet(ancien, None)
+            SoldeFinancement.appliquer([(ancien, None)])
+            CumulMensuel.suivre_investissement(ancien, None, ancienne_date)
+            return super().delete(*args, **kwargs)
+
+
 
-        self.full_clean()
-        super().save(*args, **kwargs)
 
+    @staticmethod
+    def _reporter_sur_projet(ancien, nouveau):
+        """
+        Investissement confirmé modifié ou supprimé hors transition : les compteurs
+        du projet (montant_collecte, parts_vendues) suivent, comme les soldes
+        """
+        confirme = StatutInvestissement.CONFIRME
+        deltas = defaultdict(lambda: [Decimal('0'), 0])
+        for etat, signe in ((ancien, -1), (nouveau, 1)):
+            if etat is not None and etat[2] == confirme:
+                deltas[etat[0]][0] += signe * etat[3]
+                deltas[etat[0]][1] += signe * etat[4]
+        for projet_id in sorted(deltas):
+            montant, parts = deltas[projet_id]
+            if (montant or parts) and not Projet.ajouter_financement(projet_id, montant, parts):
+                raise ValueError("Plus assez de parts disponibles sur ce projet")
+
+    # =========================
+    # TRANSITIONS
+    # =========================
 
+    def _transitionner(self, nom, **champs):
+        """
+        Applique une transition du tableau à cette instance et met à jour les soldes
+        Retourne False si le statut a changé entre-temps (aucun effet)
+        """
+        ancien = SoldeFinancement.etat(self)
+        with db_transaction.atomic():
+            if not self.TRANSITIONS[nom].appliquer(self, **champs):
+                return False
+            nouveau = SoldeFinancement.etat(self)
+            SoldeFinancement.appliquer([(ancien, nouveau)])
+            CumulMensuel.suivre_investissement(ancien, nouveau, self.date_investissement)
+        return True
 
+    @classmethod
+    def _transitionner_en_masse(cls, queryset, nom, **champs):
+        """
+        Variante groupée : retourne les lignes modifiées (id, statut d'origine, projet_id,
+        investisseur_id, montant, nombre_parts, date_investissement)
+        """
+        transition = cls.TRANSITIONS[nom]
+        with db_transaction.atomic():
+            lignes = transition.appliquer_en_masse(
+                queryset,
+                lire=('projet_id', 'investisseur_id', 'montant', 'nombre_parts', 'date_investissement'),
+                **champs
+            )
+            changements = [
+                (
+                    (projet_id, investisseur_id, statut, montant, nombre_parts),
+                    (projet_id, investisseur_id, transition.cible, montant, nombre_parts),
+                    date,
+                )
+                for _, statut, projet_id, investisseur_id, montant, nombre_parts, date in lignes
+            ]
+            if changements:
+                SoldeFinancement.appliquer([(ancien, nouveau) for ancien, nouveau, _ in changements])
+                CumulMensuel.suivre_investissements(changements)
+        return lignes
 
     # =========================
     # ACTIONS METIER (ADMIN)
@@ -126,17 +246,77 @@ class Investissement(models.Model):
         if self.statut != StatutInvestissement.PAIEMENT_RECU.value:
             raise ValueError("Paiement non reçu")
 
+        if not Investissement.confirmer_en_masse(Investissement.objects.filter(pk=self.pk)):
+            self.refresh_from_db(fields=['statut'])
+            if self.statut == StatutInvestissement.PAIEMENT_RECU.value:
+                raise ValueError("Plus assez de parts disponibles sur ce projet")
+            raise ValueError("Investissement déjà traité")
+
         self.statut = StatutInvestissement.CONFIRME.value
-        self.save()
+        if Investissement.projet.is_cached(self):
+            self.projet.refresh_from_db(fields=['montant_collecte', 'parts_vendues', 'parts_reservees', 'statut'])
 
-        # Mise à jour projet
-        projet = self.projet
-        projet.montant_collecte += self.montant
-        projet.parts_vendues += self.nombre_parts
-        projet.save()
+    @classmethod
+    def confirmer_en_masse(cls, queryset):
+        """
+        Confirme tous les investissements PAIEMENT_RECU du queryset
+        Un UPDATE conditionnel par projet, puis un UPDATE de statut pour l'ensemble
+        Retourne le nombre d'investissements confirmés
+        """
+        totaux = defaultdict(lambda: [Decimal('0'), 0])
+        ids_par_projet = defaultdict(list)
+        parts_reservees = defaultdict(int)
+        confirmes = []
+
+        with db_transaction.atomic():
+            # Verrou sur les seuls investissements concernés, dans l'ordre des clés
+            lignes = list(
+                queryset.filter(statut=StatutInvestissement.PAIEMENT_RECU)
+                .order_by('pk')
+                .select_for_update()
+                .values_list('id', 'projet_id', 'montant', 'nombre_parts', 'investisseur_id', 'date_investissement')
+            )
+            if not lignes:
+                return 0
+
+            for investissement_id, projet_id, montant, nombre_parts, _, _ in lignes:
+                totaux[projet_id][0] += montant
+                totaux[projet_id][1] += nombre_parts
+                ids_par_projet[projet_id].append(investissement_id)
+
+            # Parts déjà bloquées par des réservations : elles deviennent des parts vendues
+            reservations = ReservationParts.objects.filter(
+                investissement_id__in=[ligne[0] for ligne in lignes],
+                statut__in=RESERVATIONS_EN_COURS
+            ).order_by('pk').select_for_update().values_list('projet_id', 'nombre_parts')
+            for projet_id, nombre_parts in reservations:
+                parts_reservees[projet_id] += nombre_parts
+
+            for projet_id, (montant, nombre_parts) in totaux.items():
+                if Projet.ajouter_financement(projet_id, montant, nombre_parts, parts_reservees[projet_id]):
+                    confirmes.extend(ids_par_projet[projet_id])
+
+            if confirmes:
+                cls.TRANSITIONS['confirmer'].appliquer_a(cls.objects.filter(id__in=confirmes))
+                ReservationParts.objects.filter(
+                    investissement_id__in=confirmes,
+                    statut__in=RESERVATIONS_EN_COURS
+                ).update(statut=StatutReservation.CONVERTIE)
 
-        # Finalisation automatique si 100%
-        projet.finaliser_financement()
+                ids_confirmes = set(confirmes)
+                lignes = [ligne for ligne in lignes if ligne[0] in ids_confirmes]
+                SoldeFinancement.appliquer([
+                    (
+                        (projet_id, investisseur_id, StatutInvestissement.PAIEMENT_RECU, montant, nombre_parts),
+                        (projet_id, investisseur_id, StatutInvestissement.CONFIRME, montant, nombre_parts),
+                    )
+                    for _, projet_id, montant, nombre_parts, investisseur_id, _ in lignes
+                ])
+                CumulMensuel.ajouter_investissements([
+                    (projet_id, date, montant) for _, projet_id, montant, _, _, date in lignes
+                ])
+
+        return len(confirmes)
         
 
 
@@ -144,16 +324,16 @@ class Investissement(models.Model):
         """
         Rejet administratif avec remboursement si paiement déjà reçu
         """
-        if self.statut not in [
-            StatutInvestissement.PAIEMENT_RECU.value,
-            StatutInvestissement.EN_ATTENTE_PAIEMENT.value
-        ]:
+        # Paiement déjà reçu → remboursement ; jamais payé → simple rejet
+        nom = 'rembourser' if self.statut == StatutInvestissement.PAIEMENT_RECU.value else 'rejeter'
+        if not self.TRANSITIONS[nom].autorise(self.statut):
             raise ValueError("Impossible de rejeter cet investissement dans son état actuel.")
 
         with db_transaction.atomic():
+            if not self._transitionner(nom):
+                raise ValueError("Investissement modifié entre-temps, veuillez réessayer.")
 
-            # Paiement déjà reçu → remboursement
-            if self.statut == StatutInvestissement.PAIEMENT_RECU.value:
+            if nom == 'rembourser':
                 Transaction.objects.create(
                     investissement=self,
                     montant=self.montant,
@@ -161,18 +341,48 @@ class Investissement(models.Model):
                     statut=StatutTransaction.VALIDEE,
                     description=f"Remboursement automatique suite rejet : {raison}"
                 )
-                self.statut = StatutInvestissement.REMBOURSE.value
+            ReservationParts.liberer_pour(investissement=self)
+
+    @classmethod
+    def rejeter_en_masse(cls, queryset, raison=""):
+        """
+        Variante groupée de rejeter_avec_remboursement
+        Retourne le nombre d'investissements rejetés ou remboursés
+        """
+        with db_transaction.atomic():
+            rembourses = cls._transitionner_en_masse(queryset, 'rembourser')
+            if rembourses:
+                maintenant = timezone.now()
+                references = SEQUENCE_TRANSACTIONS.allocate(len(rembourses))
+                Transaction.objects.bulk_create([
+                    Transaction(
+                        reference=reference,
+                        investissement_id=ligne[0],
+                        montant=ligne[4],
+                        date_transaction=maintenant,
+                        type=TypeTransaction.REMBOURSEMENT,
+                        statut=StatutTransaction.VALIDEE,
+                        description=f"Remboursement automatique suite rejet : {raison}"
+                    )
+                    for reference, ligne in zip(references, rembourses)
+                ])
+                CumulMensuel.ajouter_remboursements([(ligne[2], maintenant, ligne[4]) for ligne in rembourses])
 
-            # Jamais payé → simple rejet
-            else:
-                self.statut = StatutInvestissement.REJETE.value
+            rejetes = cls._transitionner_en_masse(queryset, 'rejeter')
 
-            self.save()
+            ids = [ligne[0] for ligne in rembourses + rejetes]
+            if ids:
+                ReservationParts.liberer_en_masse(ReservationParts.objects.filter(investissement_id__in=ids))
 
+        return len(ids)
 
     def annuler(self):
-        self.statut = StatutInvestissement.ANNULE.value
-        self.save()
+        if not self.TRANSITIONS['annuler'].autorise(self.statut):
+            raise ValueError("Impossible d'annuler cet investissement dans son état actuel.")
+
+        with db_transaction.atomic():
+            if self._transitionner('annuler'):
+                ReservationParts.liberer_pour(investissement=self)
     
     def clean(self):
         if self.nombre_parts < self.projet.nombre_min_parts:
@@ -226,6 +436,12 @@ class Transaction(models.Model):
 
     description = models.TextField(blank=True)
 
+    TRANSITIONS = {
+        'valider': Transition([StatutTransaction.EN_ATTENTE], StatutTransaction.VALIDEE),
+        'echouer': Transition([StatutTransaction.EN_ATTENTE], StatutTransaction.ECHOUEE),
+        'annuler': Transition([StatutTransaction.EN_ATTENTE], StatutTransaction.ANNULEE),
+    }
+
     class Meta:
         ordering = ['-date_transaction']
 
@@ -234,26 +450,823 @@ class Transaction(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.reference:
-            year = timezone.now().year
-            last = Transaction.objects.filter(
-                reference__startswith=f'TXN-{year}-'
-            ).order_by('-reference').first()
-            number = int(last.reference.split('-')[-1]) + 1 if last else 1
-            self.reference = f'TXN-{year}-{number:04d}'
-        super().save(*args, **kwargs)
+            self.reference = SEQUENCE_TRANSACTIONS.prochaine()
+        if self.type != TypeTransaction.REMBOURSEMENT:
+            super().save(*args, **kwargs)
+            return
+
+        # Remboursement : les cumuls mensuels suivent les remboursements validés
+        with db_transaction.atomic():
+            ancien = None
+            if not self._state.adding:
+                ancien = Transaction.objects.filter(pk=self.pk).values_list(
+                    'statut', 'date_transaction', 'montant'
+                ).first()
+            super().save(*args, **kwargs)
+            nouveau = (self.statut, self.date_transaction, self.montant)
+            if ancien != nouveau:
+                projet_id = self.investissement.projet_id
+                if ancien and ancien[0] == StatutTransaction.VALIDEE:
+                    CumulMensuel.ajouter_remboursements([(projet_id, ancien[1], ancien[2])], signe=-1)
+                if self.statut == StatutTransaction.VALIDEE:
+                    CumulMensuel.ajouter_remboursements([(projet_id, self.date_transaction, self.montant)])
 
     def valider_paiement(self):
         """
         Paiement validé (admin ou webhook)
+        Deux UPDATE conditionnels : l'investissement doit attendre ce paiement
+        et la transaction être encore en attente
         """
         if self.statut == StatutTransaction.VALIDEE:
             return
-
-        if self.investissement.statut != StatutInvestissement.EN_ATTENTE_PAIEMENT.value:
+        if not self.TRANSITIONS['valider'].autorise(self.statut):
             raise ValueError("Impossible de valider ce paiement")
 
-        self.statut = StatutTransaction.VALIDEE.value
-        self.save()
+        with db_transaction.atomic():
+            # EN_ATTENTE_PAIEMENT et PAIEMENT_RECU sont comptés ensemble dans
+            # SoldeFinancement : ce passage ne change aucun solde
+            if not Investissement.TRANSITIONS['recevoir_paiement'].appliquer_a(
+                Investissement.objects.filter(pk=self.investissement_id)
+            ):
+                raise ValueError("Impossible de valider ce paiement")
+
+            if not self.TRANSITIONS['valider'].appliquer(self):
+                # Déjà traitée par un autre processus : on n'applique rien
+                db_transaction.set_rollback(True)
+                return
+
+            ReservationParts.marquer_payee(self)
+
+        if Transaction.investissement.is_cached(self):
+            self.investissement.statut = StatutInvestissement.PAIEMENT_RECU.value
+
+    def marquer_echec(self):
+        """
+        Paiement refusé par l'opérateur : les parts réservées sont rendues
+        """
+        with db_transaction.atomic():
+            if self.TRANSITIONS['echouer'].appliquer(self):
+                ReservationParts.liberer_pour(transaction_paiement=self)
+
+    def annuler(self):
+        """
+        Transaction abandonnée avant paiement : les parts réservées sont rendues
+        """
+        with db_transaction.atomic():
+            if self.TRANSITIONS['annuler'].appliquer(self):
+                ReservationParts.liberer_pour(transaction_paiement=self)
+
+    @classmethod
+    def valider_en_masse(cls, transaction_ids):
+        """
+        Variante groupée de valider_paiement : trois UPDATE pour tout le lot
+        Seules les transactions encore en attente dont l'investissement attend
+        ce paiement sont validées (comme valider_paiement, qui lève une erreur)
+        Retourne le nombre de transactions validées
+        """
+        with db_transaction.atomic():
+            lignes = cls.TRANSITIONS['valider'].appliquer_en_masse(
+                cls.objects.filter(
+                    id__in=transaction_ids,
+                    investissement__statut=StatutInvestissement.EN_ATTENTE_PAIEMENT
+                ),
+                lire=('investissement_id',)
+            )
+            if not lignes:
+                return 0
+
+            ids = [ligne[0] for ligne in lignes]
+            # EN_ATTENTE_PAIEMENT et PAIEMENT_RECU sont comptés ensemble dans
+            # SoldeFinancement : ce passage ne change aucun solde
+            Investissement.TRANSITIONS['recevoir_paiement'].appliquer_a(
+                Investissement.objects.filter(id__in={ligne[2] for ligne in lignes})
+            )
+            ReservationParts.marquer_payees_en_masse(ids)
+            CumulMensuel.ajouter_remboursements(
+                cls.objects.filter(id__in=ids, type=TypeTransaction.REMBOURSEMENT).values_list(
+                    'investissement__projet_id', 'date_transaction', 'montant'
+                )
+            )
+
+        return len(ids)
+
+    @classmethod
+    def marquer_echec_en_masse(cls, transaction_ids):
+        """
+        Variante groupée de marquer_echec
+        Retourne le nombre de transactions passées en échec
+        """
+        return cls._fermer_en_masse(cls.objects.filter(id__in=transaction_ids), 'echouer')
+
+    @classmethod
+    def annuler_en_masse(cls, queryset):
+        """
+        Variante groupée de annuler
+        Retourne le nombre de transactions annulées
+        """
+        return cls._fermer_en_masse(queryset, 'annuler')
+
+    @classmethod
+    def _fermer_en_masse(cls, queryset, nom):
+        with db_transaction.atomic():
+            ids = [ligne[0] for ligne in cls.TRANSITIONS[nom].appliquer_en_masse(queryset)]
+            if ids:
+                ReservationParts.liberer_en_masse(
+                    ReservationParts.objects.filter(transaction_paiement_id__in=ids)
+                )
+        return len(ids)
+
+
+# =========================
+# RÉSERVATION DE PARTS
+# =========================
+
+class ReservationParts(models.Model):
+    """
+    Parts bloquées sur un projet le temps que l'investisseur paie
+    Le compteur Projet.parts_reservees est tenu à jour par UPDATE conditionnel,
+    ce qui garantit qu'on ne vend jamais plus que nombre_total_parts
+    """
+
+    projet = models.ForeignKey(
+        Projet,
+        on_delete=models.CASCADE,
+        related_name='reservations_parts'
+    )
+
+    investisseur = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.CASCADE,
+        related_name='reservations_parts'
+    )
+
+    investissement = models.ForeignKey(
+        Investissement,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reservations'
+    )
+
+    transaction_paiement = models.OneToOneField(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservation'
+    )
+
+    nombre_parts = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+
+    statut = models.CharField(
+        max_length=20,
+        choices=StatutReservation.choices,
+        default=StatutReservation.ACTIVE
+    )
+
+    date_creation = models.DateTimeField(default=timezone.now)
+    date_expiration = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['statut', 'date_expiration']),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre_parts} part(s) - {self.projet} ({self.get_statut_display()})"
+
+    @classmethod
+    def reserver(cls, projet, investisseur, nombre_parts):
+        """
+        Bloque des parts pour la durée RESERVATION_PARTS_TTL_MINUTES
+        Retourne None si les parts ne sont plus disponibles
+        A appeler hors transaction pour ne pas garder le verrou sur le projet
+        """
+        if not Projet.reserver_parts(projet.pk, nombre_parts):
+            # Des réservations expirées bloquent peut-être encore des parts
+            if not cls.liberer_expirees(projet_id=projet.pk):
+                return None
+            if not Projet.reserver_parts(projet.pk, nombre_parts):
+                return None
+
+        ttl = getattr(settings, 'RESERVATION_PARTS_TTL_MINUTES', 30)
+        try:
+            return cls.objects.create(
+                projet=projet,
+                investisseur=investisseur,
+                nombre_parts=nombre_parts,
+                date_expiration=timezone.now() + timedelta(minutes=ttl)
+            )
+        except Exception:
+            Projet.liberer_parts(projet.pk, nombre_parts)
+            raise
+
+    def rattacher(self, investissement, transaction_paiement):
+        """Associe la réservation à l'investissement et à la transaction créés"""
+        ReservationParts.objects.filter(pk=self.pk).update(
+            investissement=investissement,
+            transaction_paiement=transaction_paiement
+        )
+        self.investissement = investissement
+        self.transaction_paiement = transaction_paiement
+
+    def liberer(self, statut=StatutReservation.LIBEREE):
+        """Rend les parts au projet (sans effet si déjà libérée ou convertie)"""
+        with db_transaction.atomic():
+            if ReservationParts.objects.filter(
+                pk=self.pk,
+                statut__in=RESERVATIONS_EN_COURS
+            ).update(statut=statut):
+                Projet.liberer_parts(self.projet_id, self.nombre_parts)
+        self.statut = statut
+
+    @classmethod
+    def liberer_pour(cls, **filtres):
+        """Libère les réservations en cours d'une transaction ou d'un investissement"""
+        for reservation in cls.objects.filter(statut__in=RESERVATIONS_EN_COURS, **filtres):
+            reservation.liberer()
+
+    @classmethod
+    def marquer_payee(cls, transaction_paiement):
+        """
+        Une réservation payée n'expire plus
+        Si elle avait déjà expiré, les parts sont reprises quand c'est encore possible
+        """
+        if cls.objects.filter(
+            transaction_paiement=transaction_paiement,
+            statut=StatutReservation.ACTIVE
+        ).update(statut=StatutReservation.PAYEE):
+            return True
+
+        reservation = cls.objects.filter(
+            transaction_paiement=transaction_paiement,
+            statut=StatutReservation.EXPIREE
+        ).first()
+        if reservation is None:
+            return False
+
+        with db_transaction.atomic():
+            if cls.objects.filter(
+                pk=reservation.pk,
+                statut=StatutReservation.EXPIREE
+            ).update(statut=StatutReservation.PAYEE) and Projet.reserver_parts(
+                reservation.projet_id, reservation.nombre_parts
+            ):
+                return True
+            db_transaction.set_rollback(True)
+        return False
+
+    @classmethod
+    def marquer_payees_en_masse(cls, transaction_ids):
+        """Variante de marquer_payee pour un lot de transactions validées"""
+        cls.objects.filter(
+            transaction_paiement_id__in=transaction_ids,
+            statut=StatutReservation.ACTIVE
+        ).update(statut=StatutReservation.PAYEE)
+
+        expirees = cls.objects.filter(
+            transaction_paiement_id__in=transaction_ids,
+            statut=StatutReservation.EXPIREE
+        ).values_list('transaction_paiement_id', flat=True)
+        for transaction_id in expirees:
+            cls.marquer_payee(transaction_id)
+
+    @classmethod
+    def liberer_en_masse(cls, reservations, statut=StatutReservation.LIBEREE, limite=None,
+                         ignorer_verrouillees=False):
+        """
+        Libère les réservations en cours d'un queryset
+        Un UPDATE de statut pour l'ensemble, puis un UPDATE par projet
+        Retourne le nombre de réservations libérées
+        """
+        liberees = defaultdict(int)
+
+        with db_transaction.atomic():
+            lignes = (
+                reservations.filter(statut__in=RESERVATIONS_EN_COURS)
+                .order_by('pk')
+                .select_for_update(skip_locked=ignorer_verrouillees)
+                .values_list('id', 'projet_id', 'nombre_parts')
+            )
+            if limite is not None:
+                lignes = lignes[:limite]
+            lignes = list(lignes)
+            if not lignes:
+                return 0
+
+            cls.objects.filter(
+                id__in=[ligne[0] for ligne in lignes]
+            ).update(statut=statut)
+
+            for _, projet, nombre_parts in lignes:
+                liberees[projet] += nombre_parts
+            for projet, nombre_parts in liberees.items():
+                Projet.liberer_parts(projet, nombre_parts)
+
+        return len(lignes)
+
+    @classmethod
+    def liberer_expirees(cls, projet_id=None, limite=500):
+        """
+        Libère les réservations non payées dont le délai est dépassé
+        Retourne le nombre de réservations libérées
+        """
+        reservations = cls.objects.filter(
+            statut=StatutReservation.ACTIVE,
+            date_expiration__lte=timezone.now()
+        )
+        if projet_id is not None:
+            reservations = reservations.filter(projet_id=projet_id)
+
+        return cls.liberer_en_masse(
+            reservations,
+            statut=StatutReservation.EXPIREE,
+            limite=limite,
+            ignorer_verrouillees=True
+        )
+
+# =========================
+# SOLDES (PROJECTION)
+# =========================
+
+# Statut d'investissement -> colonnes (montant, parts, nombre) du solde concernées
+COMPARTIMENTS_SOLDE = {
+    StatutInvestissement.CONFIRME: ('montant_confirme', 'parts_confirmees', 'investissements_confirmes'),
+    StatutInvestissement.EN_ATTENTE_PAIEMENT: ('montant_en_attente', 'parts_en_attente', 'investissements_en_attente'),
+    StatutInvestissement.PAIEMENT_RECU: ('montant_en_attente', 'parts_en_attente', 'investissements_en_attente'),
+    StatutInvestissement.REMBOURSE: ('montant_rembourse', 'parts_remboursees', 'investissements_rembourses'),
+}
+
+
+class SoldeFinancement(models.Model):
+    """
+    Totaux d'investissement tenus à jour à chaque changement de statut
+    Une ligne par projet, par investisseur, par couple investisseur/projet ;
+    les totaux globaux sont répartis sur SOLDE_GLOBAL_TRANCHES lignes (une
+    par reste de projet_id) que `globale` additionne : deux investissements
+    sur des projets différents ne se disputent pas une même ligne
+    """
+    cle = models.CharField(max_length=40, unique=True, verbose_name="Clé")
+    projet = models.ForeignKey(
+        Projet,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='soldes'
+    )
+    investisseur = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='soldes'
+    )
+
+    montant_confirme = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    parts_confirmees = models.IntegerField(default=0)
+    investissements_confirmes = models.IntegerField(default=0)
+
+    montant_en_attente = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    parts_en_attente = models.IntegerField(default=0)
+    investissements_en_attente = models.IntegerField(default=0)
+
+    montant_rembourse = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    parts_remboursees = models.IntegerField(default=0)
+    investissements_rembourses = models.IntegerField(default=0)
+
+    # Investisseurs distincts (projet, global) et projets distincts (investisseur, global)
+    # ayant au moins un investissement confirmé
+    nombre_investisseurs = models.IntegerField(default=0)
+    nombre_projets = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Solde de financement"
+        verbose_name_plural = "Soldes de financement"
+
+    def __str__(self):
+        return f"{self.cle} : {self.montant_confirme} FCFA confirmés"
+
+    @property
+    def montant_moyen_confirme(self):
+        if not self.investissements_confirmes:
+            return Decimal('0')
+        return self.montant_confirme / self.investissements_confirmes
+
+    # ----- Clés -----
+
+    CLE_GLOBALE = 'G'
+
+    CHAMPS_TOTAUX = (
+        'montant_confirme', 'parts_confirmees', 'investissements_confirmes',
+        'montant_en_attente', 'parts_en_attente', 'investissements_en_attente',
+        'montant_rembourse', 'parts_remboursees', 'investissements_rembourses',
+        'nombre_investisseurs', 'nombre_projets',
+    )
+
+    @staticmethod
+    def cle_pour(projet_id=None, investisseur_id=None):
+        if projet_id and investisseur_id:
+            return f'P{projet_id}I{investisseur_id}'
+        if projet_id:
+            return f'P{projet_id}'
+        if investisseur_id:
+            return f'I{investisseur_id}'
+        return SoldeFinancement.CLE_GLOBALE
+
+    @staticmethod
+    def cle_tranche(projet_id):
+        """Ligne globale où s'ajoutent les mouvements d'un projet"""
+        return f'{SoldeFinancement.CLE_GLOBALE}{projet_id % settings.SOLDE_GLOBAL_TRANCHES}'
+
+    @classmethod
+    def lire(cls, projet_id=None, investisseur_id=None):
+        """Solde d'une portée ; une ligne absente vaut zéro partout"""
+        cle = cls.cle_pour(projet_id, investisseur_id)
+        if cle == cls.CLE_GLOBALE:
+            totaux = cls.objects.filter(cle__startswith=cle).aggregate(
+                **{champ: models.Sum(champ) for champ in cls.CHAMPS_TOTAUX}
+            )
+            return cls(cle=cle, **{champ: valeur for champ, valeur in totaux.items() if valeur is not None})
+        solde = cls.objects.filter(cle=cle).first()
+        if solde is None:
+            solde = cls(cle=cle, projet_id=projet_id, investisseur_id=investisseur_id)
+        return solde
+
+    @classmethod
+    def pour_projet(cls, projet):
+        return cls.lire(projet_id=getattr(projet, 'pk', projet))
+
+    @classmethod
+    def pour_investisseur(cls, investisseur):
+        return cls.lire(investisseur_id=getattr(investisseur, 'pk', investisseur))
+
+    @classmethod
+    def globale(cls):
+        return cls.lire()
+
+    # ----- Mise à jour incrémentale -----
+
+    @staticmethod
+    def etat(investissement):
+        """Ce qui compte pour les soldes : (projet, investisseur, statut, montant, parts)"""
+        return (
+            investissement.projet_id,
+            investissement.investisseur_id,
+            investissement.statut,
+            investissement.montant,
+            investissement.nombre_parts,
+        )
+
+    @classmethod
+    def appliquer(cls, mouvements):
+        """
+        Répercute des changements d'investissements sur les soldes
+        `mouvements` : couples (ancien état, nouvel état), None pour une création
+        ou une suppression. À appeler dans la transaction du changement de statut.
+        Les lignes sont modifiées par niveau (couples, puis projets et
+        investisseurs, puis tranches globales) et dans l'ordre des clés : pas
+        d'interblocage. Les mouvements d'un projet ne touchent qu'une tranche.
+        """
+        couples = defaultdict(lambda: defaultdict(Decimal))
+        for ancien, nouveau in mouvements:
+            if ancien == nouveau:
+                continue
+            for etat, signe in ((ancien, -1), (nouveau, 1)):
+                if etat is None or etat[2] not in COMPARTIMENTS_SOLDE:
+                    continue
+                projet_id, investisseur_id, statut, montant, nombre_parts = etat
+                champ_montant, champ_parts, champ_nombre = COMPARTIMENTS_SOLDE[statut]
+                deltas = couples[(projet_id, investisseur_id)]
+                deltas[champ_montant] += signe * montant
+                deltas[champ_parts] += signe * nombre_parts
+                deltas[champ_nombre] += signe
+
+        if not couples:
+            return
+
+        projets = defaultdict(lambda: defaultdict(Decimal))
+        investisseurs = defaultdict(lambda: defaultdict(Decimal))
+        tranches = defaultdict(lambda: defaultdict(Decimal))
+        # Tranche où compter un investisseur qui apparaît ou disparaît : celle de l'un de ses projets
+        tranche_investisseur = {}
+        for (projet_id, investisseur_id), deltas in couples.items():
+            tranche = cls.cle_tranche(projet_id)
+            tranche_investisseur[investisseur_id] = min(tranche_investisseur.get(investisseur_id, tranche), tranche)
+            for champ, valeur in deltas.items():
+                projets[projet_id][champ] += valeur
+                investisseurs[investisseur_id][champ] += valeur
+                tranches[tranche][champ] += valeur
+
+        # 1. Couples : un investisseur compte pour le projet dès son premier investissement confirmé
+        changements = cls._incrementer_niveau(
+            {(p, i): deltas for (p, i), deltas in couples.items()}, 'investissements_confirmes'
+        )
+        for (projet_id, investisseur_id), signe in changements.items():
+            projets[projet_id]['nombre_investisseurs'] += signe
+            investisseurs[investisseur_id]['nombre_projets'] += signe
+
+        # 2. Projets et investisseurs, puis ce qu'ils changent aux compteurs globaux
+        for (projet_id, _), signe in cls._incrementer_niveau(
+            {(p, None): deltas for p, deltas in projets.items()}, 'nombre_investisseurs'
+        ).items():
+            tranches[cls.cle_tranche(projet_id)]['nombre_projets'] += signe
+        for (_, investisseur_id), signe in cls._incrementer_niveau(
+            {(None, i): deltas for i, deltas in investisseurs.items()}, 'nombre_projets'
+        ).items():
+            tranches[tranche_investisseur[investisseur_id]]['nombre_investisseurs'] += signe
+
+        # 3. Tranches globales
+        for cle in sorted(tranches):
+            deltas = {champ: valeur for champ, valeur in tranches[cle].items() if valeur}
+            if deltas:
+                cls._incrementer(cle, (None, None), deltas)
+
+    @classmethod
+    def _incrementer_niveau(cls, deltas_par_portee, champ_suivi):
+        """
+        Applique les deltas d'un niveau ; retourne {portée: +1/-1} pour les lignes
+        dont `champ_suivi` vient de passer de zéro à non nul (ou l'inverse)
+        """
+        suivies = {}
+        for portee in sorted(deltas_par_portee, key=lambda portee: cls.cle_pour(*portee)):
+            deltas = {champ: valeur for champ, valeur in deltas_par_portee[portee].items() if valeur}
+            if not deltas:
+                continue
+            cle = cls.cle_pour(*portee)
+            cls._incrementer(cle, portee, deltas)
+            if champ_suivi and deltas.get(champ_suivi):
+                suivies[cle] = (portee, deltas[champ_suivi])
+
+        changements = {}
+        if suivies:
+            for cle, valeur in cls.objects.filter(cle__in=suivies).values_list('cle', champ_suivi):
+                portee, delta = suivies[cle]
+                ancienne = valeur - delta
+                if ancienne == 0 and valeur != 0:
+                    changements[portee] = 1
+                elif ancienne != 0 and valeur == 0:
+                    changements[portee] = -1
+        return changements
+
+    @classmethod
+    def _incrementer(cls, cle, portee, deltas):
+        """UPDATE ... SET champ = champ + delta, la ligne est créée au premier passage"""
+        maj = {champ: models.F(champ) + valeur for champ, valeur in deltas.items()}
+        if cls.objects.filter(cle=cle).update(**maj):
+            return
+        projet_id, investisseur_id = portee
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(cle=cle, projet_id=projet_id, investisseur_id=investisseur_id, **deltas)
+        except IntegrityError:
+            # Créée entre-temps par une autre transaction
+            cls.objects.filter(cle=cle).update(**maj)
+
+    # ----- Reconstruction -----
+
+    @classmethod
+    def reconstruire(cls, taille_lot=1000):
+        """
+        Régénère toute la table à partir des investissements (GROUP BY en base)
+        Retourne le nombre de lignes écrites
+        """
+        projets = defaultdict(lambda: defaultdict(Decimal))
+        investisseurs = defaultdict(lambda: defaultdict(Decimal))
+        globaux = defaultdict(Decimal)
+        lot = []
+        ecrites = 0
+
+        def ajouter(portee, deltas):
+            nonlocal lot, ecrites
+            lot.append(cls(
+                cle=cls.cle_pour(*portee),
+                projet_id=portee[0],
+                investisseur_id=portee[1],
+                **{champ: valeur for champ, valeur in deltas.items() if valeur}
+            ))
+            if len(lot) >= taille_lot:
+                cls.objects.bulk_create(lot)
+                ecrites += len(lot)
+                lot = []
+
+        def terminer_couple(portee, deltas):
+            if deltas.get('investissements_confirmes'):
+                projets[portee[0]]['nombre_investisseurs'] += 1
+                investisseurs[portee[1]]['nombre_projets'] += 1
+            ajouter(portee, deltas)
+
+        lignes = (
+            Investissement.objects.filter(statut__in=list(COMPARTIMENTS_SOLDE))
+            .order_by('projet_id', 'investisseur_id')
+            .values_list('projet_id', 'investisseur_id', 'statut')
+            .annotate(
+                montant_total=models.Sum('montant'),
+                parts_total=models.Sum('nombre_parts'),
+                nombre=models.Count('id')
+            )
+        )
+
+        with db_transaction.atomic():
+            cls.objects.all().delete()
+
+            # Les lignes arrivent triées par couple : un couple est complet dès que le suivant commence
+            portee_courante, couple = None, None
+            for projet_id, investisseur_id, statut, montant, nombre_parts, nombre in lignes.iterator():
+                if (projet_id, investisseur_id) != portee_courante:
+                    if couple is not None:
+                        terminer_couple(portee_courante, couple)
+                    portee_courante, couple = (projet_id, investisseur_id), defaultdict(Decimal)
+
+                champ_montant, champ_parts, champ_nombre = COMPARTIMENTS_SOLDE[statut]
+                for cible in (couple, projets[projet_id], investisseurs[investisseur_id], globaux):
+                    cible[champ_montant] += montant
+                    cible[champ_parts] += nombre_parts
+                    cible[champ_nombre] += nombre
+            if couple is not None:
+                terminer_couple(portee_courante, couple)
+
+            for projet_id, deltas in projets.items():
+                globaux['nombre_projets'] += 1 if deltas.get('nombre_investisseurs') else 0
+                ajouter((projet_id, None), deltas)
+            for investisseur_id, deltas in investisseurs.items():
+                globaux['nombre_investisseurs'] += 1 if deltas.get('nombre_projets') else 0
+                ajouter((None, investisseur_id), deltas)
+            # Tout le global dans une tranche : `globale` additionne les tranches
+            lot.append(cls(cle=cls.cle_tranche(0), **{champ: valeur for champ, valeur in globaux.items() if valeur}))
+
+            cls.objects.bulk_create(lot)
+            ecrites += len(lot)
+
+        return ecrites
+
+
+# =========================
+# CUMULS MENSUELS (GRAPHIQUES)
+# =========================
+
+class CumulMensuel(models.Model):
+    """
+    Montants investis (confirmés) et remboursés par mois, par projet et pour
+    toute la plateforme (projet vide) ; alimente les graphiques de l'admin
+    Le mois est celui de la date d'investissement ou de la transaction de remboursement
+    """
+    cle = models.CharField(max_length=30, unique=True, verbose_name="Clé")
+    projet = models.ForeignKey(
+        Projet,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='cumuls_mensuels'
+    )
+    mois = models.DateField(verbose_name="Mois")
+
+    montant_investi = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    investissements = models.IntegerField(default=0)
+    montant_rembourse = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    remboursements = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Cumul mensuel"
+        verbose_name_plural = "Cumuls mensuels"
+        ordering = ['mois']
+        indexes = [
+            models.Index(fields=['projet', 'mois']),
+        ]
+
+    def __str__(self):
+        return f"{self.cle} : {self.montant_investi} FCFA investis"
+
+    @staticmethod
+    def mois_de(date):
+        """Premier jour du mois, dans le fuseau du site (comme TruncMonth)"""
+        if timezone.is_aware(date):
+            date = timezone.localtime(date)
+        return date.date().replace(day=1)
+
+    @staticmethod
+    def cle_pour(projet_id, mois):
+        return f'{mois:%Y-%m}-P{projet_id}' if projet_id else f'{mois:%Y-%m}'
+
+    @classmethod
+    def serie(cls, projet_id=None):
+        """Une ligne par mois, dans l'ordre : tout l'historique de la plateforme ou d'un projet"""
+        if projet_id:
+            return cls.objects.filter(projet_id=projet_id).order_by('mois')
+        return cls.objects.filter(projet__isnull=True).order_by('mois')
+
+    @classmethod
+    def suivre_investissement(cls, ancien, nouveau, date, ancienne_date=None):
+        """
+        Répercute un changement d'état (tuples de SoldeFinancement.etat) d'un investissement
+        `ancienne_date` : date d'investissement avant le changement, si elle a pu changer
+        """
+        cls.suivre_investissements([(ancien, nouveau, date, ancienne_date)])
+
+    @classmethod
+    def suivre_investissements(cls, changements):
+        """
+        Variante groupée : (ancien, nouveau, date[, ancienne_date]) par investissement
+        Les écarts sont cumulés par mois puis écrits en une passe
+        """
+        lignes = []
+        for ancien, nouveau, date, *ancienne_date in changements:
+            ancienne_date = (ancienne_date and ancienne_date[0]) or date
+            if ancien == nouveau and (ancien is None or cls.mois_de(ancienne_date) == cls.mois_de(date)):
+                continue
+            if ancien and ancien[2] == StatutInvestissement.CONFIRME:
+                lignes.append((ancien[0], ancienne_date, ancien[3], -1))
+            if nouveau and nouveau[2] == StatutInvestissement.CONFIRME:
+                lignes.append((nouveau[0], date, nouveau[3], 1))
+        cls._cumuler(lignes, 'montant_investi', 'investissements')
+
+    @classmethod
+    def ajouter_investissements(cls, lignes, signe=1):
+        """Investissements confirmés (signe=1) ou qui ne le sont plus (signe=-1) : (projet_id, date, montant)"""
+        cls._ajouter(lignes, 'montant_investi', 'investissements', signe)
+
+    @classmethod
+    def ajouter_remboursements(cls, lignes, signe=1):
+        """Remboursements validés : (projet_id, date_transaction, montant)"""
+        cls._ajouter(lignes, 'montant_rembourse', 'remboursements', signe)
+
+    @classmethod
+    def _ajouter(cls, lignes, champ_montant, champ_nombre, signe):
+        cls._cumuler(
+            [(projet_id, date, montant, signe) for projet_id, date, montant in lignes],
+            champ_montant, champ_nombre
+        )
+
+    @classmethod
+    def _cumuler(cls, lignes, champ_montant, champ_nombre):
+        """Lignes signées (projet_id, date, montant, signe), regroupées par projet et par mois"""
+        deltas = defaultdict(lambda: [Decimal('0'), 0])
+        for projet_id, date, montant, signe in lignes:
+            mois = cls.mois_de(date)
+            for portee in ((projet_id, mois), (None, mois)):
+                deltas[portee][0] += signe * Decimal(montant)
+                deltas[portee][1] += signe
+
+        # Lignes des projets puis lignes globales, dans l'ordre des clés
+        for projet_id, mois in sorted(deltas, key=lambda portee: (portee[0] is None, cls.cle_pour(*portee))):
+            montant, nombre = deltas[(projet_id, mois)]
+            cls._incrementer(projet_id, mois, {champ_montant: montant, champ_nombre: nombre})
+
+    @classmethod
+    def _incrementer(cls, projet_id, mois, deltas):
+        cle = cls.cle_pour(projet_id, mois)
+        maj = {champ: models.F(champ) + valeur for champ, valeur in deltas.items()}
+        if cls.objects.filter(cle=cle).update(**maj):
+            return
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(cle=cle, projet_id=projet_id, mois=mois, **deltas)
+        except IntegrityError:
+            # Créée entre-temps par une autre transaction
+            cls.objects.filter(cle=cle).update(**maj)
+
+    @classmethod
+    def reconstruire(cls, taille_lot=1000):
+        """
+        Régénère la table à partir des investissements confirmés et des
+        remboursements validés (agrégation par mois en base)
+        Retourne le nombre de lignes écrites
+        """
+        cumuls = defaultdict(lambda: {
+            'montant_investi': Decimal('0'), 'investissements': 0,
+            'montant_rembourse': Decimal('0'), 'remboursements': 0,
+        })
+        sources = (
+            (
+                Investissement.objects.filter(statut=StatutInvestissement.CONFIRME)
+                .annotate(mois_calcule=TruncMonth('date_investissement'))
+                .values_list('projet_id', 'mois_calcule'),
+                'montant_investi', 'investissements',
+            ),
+            (
+                Transaction.objects.filter(type=TypeTransaction.REMBOURSEMENT, statut=StatutTransaction.VALIDEE)
+                .annotate(mois_calcule=TruncMonth('date_transaction'))
+                .values_list('investissement__projet_id', 'mois_calcule'),
+                'montant_rembourse', 'remboursements',
+            ),
+        )
+
+        for lignes, champ_montant, champ_nombre in sources:
+            lignes = lignes.annotate(total=models.Sum('montant'), nombre=models.Count('id')).order_by()
+            for projet_id, mois, total, nombre in lignes.iterator():
+                mois = cls.mois_de(mois) if hasattr(mois, 'hour') else mois.replace(day=1)
+                for portee in ((projet_id, mois), (None, mois)):
+                    cumuls[portee][champ_montant] += total
+                    cumuls[portee][champ_nombre] += nombre
+
+        with db_transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                [
+                    cls(cle=cls.cle_pour(projet_id, mois), projet_id=projet_id, mois=mois, **valeurs)
+                    for (projet_id, mois), valeurs in cumuls.items()
+                ],
+                batch_size=taille_lot
+            )
 
-        self.investissement.statut = StatutInvestissement.PAIEMENT_RECU.value
-        self.investissement.save()
+        return len(cumuls)
@@ -0,0 +1,321 @@
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from apps.accounts.models import Utilisateur
+from apps.investments.management.commands.reconcilier_financements import COLONNES_RAPPORT
+from apps.investments.models import (
+    RESERVATIONS_EN_COURS, CumulMensuel, Investissement, ReservationParts, SoldeFinancement,
+    StatutInvestissement, StatutReservation,
+)
+from apps.investments.views import _enregistrer_investissement
+from apps.notifications.models import Notification
+from apps.projects import catalogue
+from apps.projects.models import Projet, StatutProjet
+
+
+def creer_projet(promoteur, nombre_total_parts=50):
+    return Projet.objects.create(
+        titre='Résidence', description='d', montant_total=Decimal('10000') * nombre_total_parts,
+        nombre_total_parts=nombre_total_parts, prix_unitaire=Decimal('10000'), duree=12,
+        date_debut=date(2026, 1, 1), date_fin=date(2027, 1, 1), localisation='Ouagadougou',
+        promoteur=promoteur, statut=StatutProjet.EN_CAMPAGNE
+    )
+
+
+class ReservationConcurrenteTests(TransactionTestCase):
+
+    FILS = 12
+    TENTATIVES = 10
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("SQLite en mémoire : un écrivain concurrent échoue au lieu d'attendre le verrou")
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        self.investisseurs = [
+            Utilisateur.objects.create_user(f'investisseur{rang}@crowdbuilding.bf', 'x', nom='I', prenom=str(rang))
+            for rang in range(self.FILS)
+        ]
+        self.projet = creer_projet(self.promoteur)
+
+    def reserver(self, investisseur, accordees, erreurs):
+        try:
+            for rang in range(self.TENTATIVES):
+                nombre_parts = 1 + rang % 3
+                if ReservationParts.reserver(self.projet, investisseur, nombre_parts):
+                    accordees.append(nombre_parts)
+        except Exception as erreur:
+            erreurs.append(erreur)
+        finally:
+            connections.close_all()
+
+    def test_pas_de_survente(self):
+        accordees, erreurs = [], []
+        fils = [
+            threading.Thread(target=self.reserver, args=(investisseur, accordees, erreurs))
+            for investisseur in self.investisseurs
+        ]
+        for f in fils:
+            f.start()
+        for f in fils:
+            f.join()
+
+        self.assertEqual(erreurs, [])
+        self.projet.refresh_from_db()
+        demandees = self.FILS * sum(1 + rang % 3 for rang in range(self.TENTATIVES))
+        self.assertGreater(demandees, self.projet.nombre_total_parts)
+        # Toutes les parts sont parties, et pas une de plus
+        self.assertEqual(sum(accordees), self.projet.parts_reservees)
+        self.assertLessEqual(self.projet.parts_vendues + self.projet.parts_reservees, self.projet.nombre_total_parts)
+        self.assertLess(self.projet.nombre_total_parts - self.projet.parts_reservees, 3)
+        self.assertEqual(
+            ReservationParts.objects.filter(projet=self.projet, statut__in=RESERVATIONS_EN_COURS)
+            .aggregate(total=Sum('nombre_parts'))['total'],
+            self.projet.parts_reservees
+        )
+
+
+class ReservationTests(TestCase):
+
+    def setUp(self):
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        self.investisseur = Utilisateur.objects.create_user('investisseur@crowdbuilding.bf', 'x', nom='I', prenom='I')
+        self.projet = creer_projet(self.promoteur, nombre_total_parts=10)
+
+    def expirer(self, reservation):
+        ReservationParts.objects.filter(pk=reservation.pk).update(
+            date_expiration=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_lecture_perimee_sans_survente(self):
+        # Deux investisseurs voient le même projet (10 parts libres) ; le second arrive après le premier
+        vu_par_le_second = Projet.objects.get(pk=self.projet.pk)
+        self.assertIsNotNone(ReservationParts.reserver(self.projet, self.investisseur, 8))
+
+        self.assertEqual(vu_par_le_second.parts_restantes, 10)
+        self.assertIsNone(ReservationParts.reserver(vu_par_le_second, self.investisseur, 3))
+        self.assertIsNotNone(ReservationParts.reserver(vu_par_le_second, self.investisseur, 2))
+        self.projet.refresh_from_db()
+        self.assertEqual(self.projet.parts_reservees, 10)
+
+    def test_reservation_reprend_les_parts_expirees(self):
+        ancienne = ReservationParts.reserver(self.projet, self.investisseur, 10)
+        self.assertIsNone(ReservationParts.reserver(self.projet, self.investisseur, 4))
+
+        self.expirer(ancienne)
+        nouvelle = ReservationParts.reserver(self.projet, self.investisseur, 4)
+
+        self.assertIsNotNone(nouvelle)
+        ancienne.refresh_from_db()
+        self.assertEqual(ancienne.statut, StatutReservation.EXPIREE)
+        self.projet.refresh_from_db()
+        self.assertEqual(self.projet.parts_reservees, 4)
+
+    def test_commande_libere_les_reservations_expirees(self):
+        expiree = ReservationParts.reserver(self.projet, self.investisseur, 3)
+        active = ReservationParts.reserver(self.projet, self.investisseur, 2)
+        self.expirer(expiree)
+
+        sortie = StringIO()
+        call_command('liberer_reservations', stdout=sortie)
+
+        self.assertIn('1 réservation(s)', sortie.getvalue())
+        expiree.refresh_from_db()
+        active.refresh_from_db()
+        self.assertEqual(expiree.statut, StatutReservation.EXPIREE)
+        self.assertEqual(active.statut, StatutReservation.ACTIVE)
+        self.projet.refresh_from_db()
+        self.assertEqual(self.projet.parts_reservees, 2)
+
+
+class IntentionInvestissementTests(TestCase):
+
+    def setUp(self):
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        self.projet = creer_projet(self.promoteur, nombre_total_parts=10)
+
+    def test_promoteur_notifie_apres_commit(self):
+        investisseurs = [
+            Utilisateur.objects.create_user(f'investisseur{rang}@crowdbuilding.bf', 'x', nom='I', prenom=str(rang))
+            for rang in range(2)
+        ]
+        for investisseur in investisseurs:
+            requete = RequestFactory().post('/')
+            requete.user = investisseur
+            reservation = ReservationParts.reserver(self.projet, investisseur, 2)
+            avant = list(Notification.objects.values_list('pk', 'occurrences'))
+            with self.captureOnCommitCallbacks() as rappels:
+                _enregistrer_investissement(
+                    requete, self.projet, reservation, 2, 1, Decimal('20000'), 'ORANGE_MONEY', 'SALAIRE', True
+                )
+            # Rien n'est écrit sur les notifications dans la transaction de l'intention
+            self.assertEqual(list(Notification.objects.values_list('pk', 'occurrences')), avant)
+            self.assertEqual(len(rappels), 1)
+            for rappel in rappels:
+                rappel()
+
+        notification = Notification.objects.get(utilisateur=self.promoteur)
+        self.assertEqual(notification.occurrences, 2)
+
+
+class CatalogueFinancementTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        self.investisseur = Utilisateur.objects.create_user('investisseur@crowdbuilding.bf', 'x', nom='I', prenom='I')
+
+    def nombre(self, statut):
+        return next(
+            element['nombre'] for element in catalogue.facettes()['statut'] if element['valeur'] == statut
+        )
+
+    def test_projet_finance_dans_les_facettes(self):
+        projet = creer_projet(self.promoteur, nombre_total_parts=2)
+        self.assertEqual((self.nombre(StatutProjet.EN_CAMPAGNE), self.nombre(StatutProjet.FINANCE)), (1, 0))
+
+        investissement = Investissement.objects.create(
+            projet=projet, investisseur=self.investisseur, nombre_parts=2,
+            montant=Decimal('20000'), origine_fonds='SALAIRE'
+        )
+        Investissement.TRANSITIONS['recevoir_paiement'].appliquer(investissement)
+        with self.captureOnCommitCallbacks(execute=True):
+            Investissement.confirmer_en_masse(Investissement.objects.filter(pk=investissement.pk))
+
+        projet.refresh_from_db()
+        self.assertEqual(projet.statut, StatutProjet.FINANCE)
+        self.assertEqual((self.nombre(StatutProjet.EN_CAMPAGNE), self.nombre(StatutProjet.FINANCE)), (0, 1))
+
+
+class ReconcilierFinancementsTests(TransactionTestCase):
+
+    def setUp(self):
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        self.projet = creer_projet(self.promoteur, nombre_total_parts=10)
+
+    def test_rapport_sur_la_sortie_de_la_commande(self):
+        Projet.objects.filter(pk=self.projet.pk).update(parts_reservees=4)
+
+        sortie = StringIO()
+        call_command('reconcilier_financements', '--repair', stdout=sortie)
+
+        lignes = sortie.getvalue().splitlines()
+        self.assertEqual(lignes[0], ','.join(COLONNES_RAPPORT))
+        self.assertIn(f'{self.projet.pk},{self.projet.reference},parts_reservees,4,0,', lignes[1])
+        self.assertIn('1 écart(s) sur 1 projet(s), 1 projet(s) corrigé(s)', lignes[-1])
+        self.projet.refresh_from_db()
+        self.assertEqual(self.projet.parts_reservees, 0)
+
+
+class SoldeFinancementTests(TestCase):
+
+    def setUp(self):
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        self.investisseur = Utilisateur.objects.create_user('investisseur@crowdbuilding.bf', 'x', nom='I', prenom='I')
+
+    def investir(self, projet, nombre_parts=2, investisseur=None):
+        return Investissement.objects.create(
+            projet=projet, investisseur=investisseur or self.investisseur, nombre_parts=nombre_parts,
+            montant=Decimal('10000') * nombre_parts, origine_fonds='SALAIRE'
+        )
+
+    def totaux(self, solde):
+        return {champ: solde.__dict__[champ] for champ in SoldeFinancement.CHAMPS_TOTAUX}
+
+    def test_global_reparti_par_tranche(self):
+        with self.settings(SOLDE_GLOBAL_TRANCHES=4):
+            projets = [creer_projet(self.promoteur) for _ in range(3)]
+            for projet in projets:
+                self.investir(projet)
+
+            # Une intention ne modifie que la tranche de son projet
+            cles = set(SoldeFinancement.objects.filter(cle__startswith='G').values_list('cle', flat=True))
+            self.assertEqual(cles, {SoldeFinancement.cle_tranche(projet.pk) for projet in projets})
+
+            globale = SoldeFinancement.globale()
+            self.assertEqual(globale.montant_en_attente, Decimal('60000'))
+            self.assertEqual(globale.investissements_en_attente, 3)
+
+    def test_compteurs_distincts_et_reconstruction(self):
+        with self.settings(SOLDE_GLOBAL_TRANCHES=4):
+            projets = [creer_projet(self.promoteur) for _ in range(2)]
+            autre = Utilisateur.objects.create_user('autre@crowdbuilding.bf', 'x', nom='A', prenom='A')
+            investissements = [self.investir(projets[0]), self.investir(projets[1]), self.investir(projets[1], 3, autre)]
+            for investissement in investissements:
+                Investissement.TRANSITIONS['recevoir_paiement'].appliquer(investissement)
+            Investissement.confirmer_en_masse(Investissement.objects.all())
+
+            globale = SoldeFinancement.globale()
+            self.assertEqual(globale.montant_confirme, Decimal('70000'))
+            self.assertEqual(globale.nombre_projets, 2)
+            self.assertEqual(globale.nombre_investisseurs, 2)
+
+            incremental = self.totaux(globale)
+            SoldeFinancement.reconstruire()
+            self.assertEqual(self.totaux(SoldeFinancement.globale()), incremental)
+
+    def test_save_sur_instance_perimee(self):
+        projet = creer_projet(self.promoteur)
+        investissement = self.investir(projet)
+        perimee = Investissement.objects.get(pk=investissement.pk)
+
+        # Paiement reçu puis confirmé par un autre traitement
+        Investissement.TRANSITIONS['recevoir_paiement'].appliquer(investissement)
+        Investissement.confirmer_en_masse(Investissement.objects.filter(pk=investissement.pk))
+
+        perimee.nombre_parts += 1
+        perimee.montant += Decimal('10000')
+        perimee.save()
+
+        # La confirmation survit au save de l'instance chargée avant elle
+        self.assertEqual(perimee.statut, StatutInvestissement.CONFIRME)
+        investissement.refresh_from_db()
+        self.assertEqual(investissement.statut, StatutInvestissement.CONFIRME)
+
+        # Compteurs du projet, soldes et reconstruction concordent
+        projet.refresh_from_db()
+        solde = SoldeFinancement.pour_projet(projet)
+        self.assertEqual((projet.montant_collecte, projet.parts_vendues), (Decimal('30000'), 3))
+        self.assertEqual(
+            (solde.montant_confirme, solde.parts_confirmees), (projet.montant_collecte, projet.parts_vendues)
+        )
+        incremental = self.totaux(solde), self.totaux(SoldeFinancement.globale())
+        SoldeFinancement.reconstruire()
+        self.assertEqual(
+            (self.totaux(SoldeFinancement.pour_projet(projet)), self.totaux(SoldeFinancement.globale())),
+            incremental
+        )
+
+    def test_transition_groupee_en_un_passage(self):
+        projet = creer_projet(self.promoteur)
+        for rang in range(6):
+            investisseur = Utilisateur.objects.create_user(
+                f'investisseur{rang}@crowdbuilding.bf', 'x', nom='I', prenom=str(rang)
+            )
+            investissement = self.investir(projet, investisseur=investisseur)
+            Investissement.TRANSITIONS['recevoir_paiement'].appliquer(investissement)
+
+        with mock.patch.object(SoldeFinancement, 'appliquer', wraps=SoldeFinancement.appliquer) as appliquer, \
+                mock.patch.object(CumulMensuel, '_cumuler', wraps=CumulMensuel._cumuler) as cumuler:
+            self.assertEqual(Investissement.rejeter_en_masse(Investissement.objects.all(), "Dossier incomplet"), 6)
+
+        # Un seul passage pour les 6 investissements remboursés
+        self.assertEqual(appliquer.call_count, 1)
+        self.assertEqual(len(appliquer.call_args.args[0]), 6)
+        self.assertEqual(cumuler.call_count, 2)   # investissements, puis remboursements
+
+        incremental = self.totaux(SoldeFinancement.pour_projet(projet)), self.totaux(SoldeFinancement.globale())
+        SoldeFinancement.reconstruire()
+        self.assertEqual(
+            (self.totaux(SoldeFinancement.pour_projet(projet)), self.totaux(SoldeFinancement.globale())),
+            incremental
+        )
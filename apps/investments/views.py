@@ -14,9 +14,9 @@ from django.utils import timezone
 from apps.accounts.models import Utilisateur
 from apps.projects.models import Projet
 from apps.notifications.models import Notification
-from .models import Investissement, Transaction, StatutInvestissement, TypeTransaction, StatutTransaction
+from apps.notifications import compteurs as compteurs_notifications
+from .models import Investissement, Transaction, StatutInvestissement, TypeTransaction, StatutTransaction, ReservationParts, SoldeFinancement
 from django.utils import timezone
-from django.db.models import Sum
 
 from django.db import transaction
 
@@ -50,8 +50,8 @@ def investir_projet(request, project_id):
             )
             return redirect('investments:investir', project_id=project_id)
 
-        # 🔹 Vérification des parts disponibles
-        parts_restantes = projet.nombre_total_parts - projet.parts_vendues
+        # 🔹 Vérification des parts disponibles (indicative, la réservation fait foi)
+        parts_restantes = projet.parts_restantes
         if nombre_parts > parts_restantes:
             messages.error(
                 request,
@@ -74,55 +74,29 @@ def investir_projet(request, project_id):
             )
             return redirect('investments:investir', project_id=project_id)
 
-        # 🔒 Transaction atomique pour éviter les doublons
-        with transaction.atomic():
-            investissement_existant = Investissement.objects.filter(
-                investisseur=request.user,
-                projet=projet
-            ).first()
-
-            if investissement_existant:
-                total_parts_apres = investissement_existant.nombre_parts + nombre_parts
-            else:
-                total_parts_apres = nombre_parts
-
-            if total_parts_apres < nombre_min_parts:
-                messages.error(
-                    request,
-                    f"Le minimum requis pour ce projet est {nombre_min_parts} parts "
-                    f"(vous en auriez {total_parts_apres})."
-                )
-                return redirect('investments:investir', project_id=project_id)
-
-            # 🔹 Vérifier si l'investisseur a déjà un investissement pour ce projet
-            investissement, created = Investissement.objects.get_or_create(
-                investisseur=request.user,
-                projet=projet,
-                defaults={
-                    'montant': montant,
-                    'nombre_parts': nombre_parts,  # ✅ On ajoute le nombre de parts ici
-                    'origine_fonds': origine_fonds,
-                    'contrat_accepte': contrat_accepte,
-                    'date_investissement': timezone.now(),
-                }
+        # 🔒 Réservation des parts : UPDATE conditionnel, hors transaction pour
+        # ne pas garder le verrou sur le projet pendant la création
+        reservation = ReservationParts.reserver(projet, request.user, nombre_parts)
+        if reservation is None:
+            projet.refresh_from_db(fields=['parts_vendues', 'parts_reservees'])
+            messages.error(
+                request,
+                f"Seulement {max(0, projet.parts_restantes)} parts restantes disponibles."
             )
+            return redirect('investments:investir', project_id=project_id)
 
-            if not created:
-                # ➕ Ajouter les nouvelles parts à l'investissement existant
-                investissement.montant += montant
-                investissement.nombre_parts += nombre_parts  # ✅ MAJ nombre_parts
-                investissement.date_investissement = timezone.now()
-                investissement.save()
-
-            # 🔹 Création de la transaction associée
-            Transaction.objects.create(
-                investissement=investissement,
-                montant=montant,
-                type=TypeTransaction.INVESTISSEMENT,
-                statut=StatutTransaction.EN_ATTENTE,
-                mode_paiement=mode_paiement,
-                description=f"Ajout de {nombre_parts} parts dans le projet '{projet.titre}'"
+        try:
+            investissement = _enregistrer_investissement(
+                request, projet, reservation, nombre_parts, nombre_min_parts,
+                montant, mode_paiement, origine_fonds, contrat_accepte
             )
+        except Exception:
+            reservation.liberer()
+            raise
+
+        if investissement is None:
+            reservation.liberer()
+            return redirect('investments:investir', project_id=project_id)
 
         messages.success(
             request,
@@ -147,6 +121,73 @@ def investir_projet(request, project_id):
     })
 
 
+def _enregistrer_investissement(request, projet, reservation, nombre_parts, nombre_min_parts,
+                                montant, mode_paiement, origine_fonds, contrat_accepte):
+    """
+    Crée ou complète l'investissement et sa transaction pour des parts déjà réservées
+    Retourne None si la demande est refusée
+    """
+    # 🔒 Transaction atomique pour éviter les doublons
+    with transaction.atomic():
+        # Verrou sur l'investissement existant : un paiement traité en parallèle
+        # attend la fin de cette transaction au lieu d'être écrasé par le save()
+        investissement_existant = Investissement.objects.select_for_update().filter(
+            investisseur=request.user,
+            projet=projet
+        ).first()
+
+        if investissement_existant:
+            total_parts_apres = investissement_existant.nombre_parts + nombre_parts
+        else:
+            total_parts_apres = nombre_parts
+
+        if total_parts_apres < nombre_min_parts:
+            messages.error(
+                request,
+                f"Le minimum requis pour ce projet est {nombre_min_parts} parts "
+                f"(vous en auriez {total_parts_apres})."
+            )
+            return None
+
+        # 🔹 Vérifier si l'investisseur a déjà un investissement pour ce projet
+        investissement, created = Investissement.objects.get_or_create(
+            investisseur=request.user,
+            projet=projet,
+            defaults={
+                'montant': montant,
+                'nombre_parts': nombre_parts,  # ✅ On ajoute le nombre de parts ici
+                'origine_fonds': origine_fonds,
+                'contrat_accepte': contrat_accepte,
+                'date_investissement': timezone.now(),
+            }
+        )
+
+        if not created:
+            # ➕ Ajouter les nouvelles parts à l'investissement existant
+            investissement.montant += montant
+            investissement.nombre_parts += nombre_parts  # ✅ MAJ nombre_parts
+            investissement.date_investissement = timezone.now()
+            investissement.save()
+
+        # 🔹 Création de la transaction associée
+        transaction_paiement = Transaction.objects.create(
+            investissement=investissement,
+            montant=montant,
+            type=TypeTransaction.INVESTISSEMENT,
+            statut=StatutTransaction.EN_ATTENTE,
+            mode_paiement=mode_paiement,
+            description=f"Ajout de {nombre_parts} parts dans le projet '{projet.titre}'"
+        )
+
+        reservation.rattacher(investissement, transaction_paiement)
+
+        # 🔔 Notification du promoteur (regroupée tant qu'il ne l'a pas lue), après le commit :
+        # la transaction de l'intention ne prend aucun verrou de notification
+        transaction.on_commit(lambda: Notification.creer_notification_nouvel_investissement(investissement))
+
+    return investissement
+
+
 
 
 @login_required
@@ -256,10 +297,11 @@ def dashboard_investisseur(request):
         statut='CONFIRME'
     ).select_related('projet')
     
-    # Statistiques
+    # Statistiques (solde tenu à jour à chaque changement de statut)
+    solde = SoldeFinancement.pour_investisseur(user)
     stats_investissements = {
-        'total': investissements.count(),
-        'montant_total': investissements.aggregate(total=Sum('montant'))['total'] or Decimal('0'),
+        'total': solde.investissements_confirmes,
+        'montant_total': solde.montant_confirme,
     }
     
     # Projets investis
@@ -287,11 +329,11 @@ def dashboard_investisseur(request):
         utilisateur=user
     ).order_by('-date_creation')
     
-    # Notifications récentes (limitées à 5)
-    notifications_recentes = notifications_all[:5]
+    # Notifications récentes (limitées à 5), filigrane de lecture appliqué
+    notifications_recentes = Notification.appliquer_filigrane(list(notifications_all[:5]), user)
     
-    # Compter les non-lues dans le queryset complet
-    notifications_unread = notifications_all.filter(lue=False).count()
+    # Non lues : compteur en cache
+    notifications_unread = compteurs_notifications.lire(user.pk)
     
     context = {
         'user': user,
@@ -2,9 +2,12 @@
 Configuration de l'interface d'administration Django
 Module notifications - Plateforme crowdBuilding
 """
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Notification
+from .models import DiffusionNotification, EmailSortant, EnvoiResume, Notification, NotificationArchivee, StatutEmail
 
 
 @admin.register(Notification)
@@ -12,7 +15,7 @@ class NotificationAdmin(admin.ModelAdmin):
     """
     Administration des notifications
     """
-    list_display = ('utilisateur', 'titre', 'type', 'lue', 'date_creation', 'action_requise')
+    list_display = ('utilisateur', 'titre', 'type', 'occurrences', 'lue', 'date_creation', 'action_requise')
     list_filter = ('type', 'lue', 'action_requise', 'date_creation')
     search_fields = ('utilisateur__nom', 'utilisateur__prenom', 'titre', 'contenu')
     ordering = ('-date_creation',)
@@ -25,7 +28,7 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('titre', 'contenu', 'type')
         }),
         ('Statut', {
-            'fields': ('lue', 'date_lecture')
+            'fields': ('lue', 'date_lecture', 'occurrences')
         }),
         ('Relations', {
             'fields': ('projet', 'investissement'),
@@ -41,7 +44,15 @@ class NotificationAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('date_creation', 'date_lecture')
+    readonly_fields = ('date_creation', 'date_lecture', 'occurrences')
+    
+    def changelist_view(self, request, extra_context=None):
+        # Gain du regroupement, recompté au plus une fois par COMPTEURS_ADMIN_TTL
+        evitees = cache.get_or_set(
+            'notifications:ecritures_evitees', Notification.ecritures_evitees, settings.COMPTEURS_ADMIN_TTL
+        )
+        self.message_user(request, f"Regroupement : {evitees} notification(s) évitée(s).")
+        return super().changelist_view(request, extra_context)
     
     actions = ['marquer_comme_lues', 'envoyer_notifications']
     
@@ -64,3 +75,99 @@ class NotificationAdmin(admin.ModelAdmin):
         
         self.message_user(request, f'{count} notification(s) envoyée(s).')
     envoyer_notifications.short_description = "Envoyer les notifications"
+
+
+@admin.register(DiffusionNotification)
+class DiffusionNotificationAdmin(admin.ModelAdmin):
+    """
+    Suivi des diffusions (envoyées par la commande diffuser_notifications)
+    """
+    list_display = ('titre', 'cible', 'projet', 'statut', 'avancement', 'date_creation', 'date_fin')
+    list_filter = ('statut', 'cible', 'type')
+    search_fields = ('titre', 'projet__titre')
+    ordering = ('-date_creation',)
+    raw_id_fields = ('projet',)
+    readonly_fields = (
+        'statut', 'dernier_destinataire', 'destinataires_traites', 'total_destinataires',
+        'date_creation', 'date_debut', 'date_fin'
+    )
+
+    def avancement(self, obj):
+        return f"{obj.destinataires_traites}/{obj.total_destinataires or '?'} ({obj.progression} %)"
+    avancement.short_description = "Avancement"
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EnvoiResume)
+class EnvoiResumeAdmin(admin.ModelAdmin):
+    """
+    Suivi des résumés par email (commande envoyer_resumes)
+    """
+    list_display = ('frequence', 'debut', 'fin', 'utilisateurs_traites', 'emails_envoyes', 'termine', 'date_fin')
+    list_filter = ('frequence', 'termine')
+    ordering = ('-fin',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(NotificationArchivee)
+class NotificationArchiveeAdmin(admin.ModelAdmin):
+    """
+    Consultation des notifications archivées (politique de rétention)
+    """
+    list_display = ('utilisateur', 'titre', 'type', 'lue', 'date_creation', 'date_archivage')
+    list_filter = ('type', 'lue')
+    search_fields = ('utilisateur__email', 'titre')
+    ordering = ('-date_creation',)
+    raw_id_fields = ('utilisateur', 'projet', 'investissement')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EmailSortant)
+class EmailSortantAdmin(admin.ModelAdmin):
+    """
+    Boîte d'envoi des emails (commande envoyer_emails)
+    """
+    list_display = ('sujet', 'domaine', 'statut', 'tentatives', 'prochaine_tentative', 'date_creation', 'date_envoi')
+    list_filter = ('statut', 'domaine')
+    search_fields = ('sujet', 'destinataires')
+    ordering = ('-date_creation',)
+    exclude = ('message',)
+    actions = ['reessayer']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        # État de la file en tête de liste
+        metriques = EmailSortant.metriques()
+        self.message_user(request, (
+            f"File : {metriques['profondeur']} email(s), plus ancien {metriques['age_plus_ancien']:.0f} s · "
+            f"dernière heure : {metriques['envoyes']} envoyé(s), {metriques['echecs']} échec(s), "
+            f"attente p95 {metriques['attente_p95'] or 0:.0f} s, SMTP p95 {metriques['smtp_p95_ms'] or 0} ms"
+        ))
+        return super().changelist_view(request, extra_context)
+
+    def reessayer(self, request, queryset):
+        """Remet en file les emails en échec définitif"""
+        count = queryset.filter(statut=StatutEmail.ECHEC).update(
+            statut=StatutEmail.EN_ATTENTE,
+            tentatives=0,
+            prochaine_tentative=timezone.now()
+        )
+        self.message_user(request, f'{count} email(s) remis en file.')
+    reessayer.short_description = "Réessayer l'envoi"
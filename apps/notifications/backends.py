@@ -0,0 +1,20 @@
+"""
+Backend email de la plateforme : la boîte d'envoi transactionnelle
+Plateforme crowdBuilding - Burkina Faso
+
+send_mail, la réinitialisation de mot de passe, les résumés... n'attendent
+plus le serveur SMTP : les messages sont écrits dans EmailSortant, dans la
+transaction en cours (annulés avec elle), puis envoyés par le worker
+`manage.py envoyer_emails` via EMAILS_BACKEND_ENVOI.
+"""
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+class BoiteEnvoiBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        from apps.notifications.models import EmailSortant
+
+        emails = [EmailSortant.depuis_message(message) for message in email_messages if message.recipients()]
+        EmailSortant.objects.bulk_create(emails)
+        return len(emails)
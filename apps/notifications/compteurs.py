@@ -0,0 +1,115 @@
+"""
+Compteurs de notifications par utilisateur, tenus dans le cache partagé
+Plateforme crowdBuilding - Burkina Faso
+
+Un compteur par filtre de la boîte de réception (non lues, toutes, projets,
+investissements) :
+- une notification créée / lue / supprimée ajuste les compteurs par delta,
+  après le commit (Notification.save / delete) ;
+- les opérations groupées (diffusions, opérations par lots, archivage)
+  effacent les compteurs concernés : ils sont recomptés à la prochaine lecture ;
+- une clé absente ou expirée (NOTIFICATIONS_NON_LUES_TTL) est recomptée à la lecture,
+  et le résultat posé par cache.add : il n'écrase pas un compteur déjà remis en
+  cache et ajusté pendant le recomptage.
+
+La répartition par type (`par_type`) est un seul GROUP BY type, mis en cache
+et effacé à chaque variation des compteurs de l'utilisateur.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+PREFIXE_CLE = 'notifications:'
+
+# Non lue : ni marquée lue, ni antérieure au filigrane de lecture de son destinataire
+# (Utilisateur.notifications_lues_jusqua, posé par « tout marquer comme lu »)
+NON_LUES = Q(lue=False) & (
+    Q(utilisateur__notifications_lues_jusqua__isnull=True)
+    | Q(date_creation__gt=F('utilisateur__notifications_lues_jusqua'))
+)
+
+# Lue : marquée lue, ou sous le filigrane de lecture (complément de NON_LUES)
+LUES = Q(lue=True) | Q(date_creation__lte=F('utilisateur__notifications_lues_jusqua'))
+
+# filtre -> (condition en base, même condition sur une instance)
+# (instance : utilisé à la création, toujours postérieure au filigrane)
+FILTRES = {
+    'non_lues': (NON_LUES, lambda notification: not notification.lue),
+    'toutes': (Q(), lambda notification: True),
+    'projets': (Q(projet__isnull=False), lambda notification: notification.projet_id is not None),
+    'investissements': (Q(investissement__isnull=False), lambda notification: notification.investissement_id is not None),
+}
+
+
+def _cle(utilisateur_id, filtre):
+    return f'{PREFIXE_CLE}{filtre}:{utilisateur_id}'
+
+
+def lire(utilisateur_id, filtre='non_lues'):
+    """Compteur d'un utilisateur : le cache, sinon un COUNT mis en cache"""
+    valeur = cache.get(_cle(utilisateur_id, filtre))
+    if valeur is None:
+        from apps.notifications.models import Notification
+
+        condition, _ = FILTRES[filtre]
+        valeur = Notification.objects.filter(condition, utilisateur_id=utilisateur_id).count()
+        # add et non set : une valeur posée puis incrémentée pendant le COUNT est plus récente
+        if not cache.add(_cle(utilisateur_id, filtre), valeur, settings.NOTIFICATIONS_NON_LUES_TTL):
+            valeur = cache.get(_cle(utilisateur_id, filtre), valeur)
+    return valeur
+
+
+def par_type(utilisateur_id):
+    """
+    Notifications d'un utilisateur par type : {type: {'libelle', 'total', 'non_lues'}}
+    Une requête groupée (type × lue) mise en cache, jamais les notifications elles-mêmes
+    """
+    repartition = cache.get(_cle(utilisateur_id, 'types'))
+    if repartition is None:
+        from apps.notifications.models import Notification, TypeNotification
+
+        libelles = dict(TypeNotification.choices)
+        repartition = {
+            ligne['type']: {
+                'libelle': libelles.get(ligne['type'], ligne['type']),
+                'total': ligne['total'],
+                'non_lues': ligne['non_lues'],
+            }
+            for ligne in Notification.objects.filter(utilisateur_id=utilisateur_id).order_by().values('type').annotate(
+                total=Count('pk'),
+                non_lues=Count('pk', filter=NON_LUES)
+            )
+        }
+        cache.add(_cle(utilisateur_id, 'types'), repartition, settings.NOTIFICATIONS_NON_LUES_TTL)
+    return repartition
+
+
+def filtres(notification):
+    """Filtres dont relève la notification"""
+    return [filtre for filtre, (_, correspond) in FILTRES.items() if correspond(notification)]
+
+
+def ajuster(utilisateur_id, delta, filtre='non_lues'):
+    """Applique un delta au commit de la transaction courante"""
+    if delta:
+        transaction.on_commit(lambda: _incrementer(utilisateur_id, filtre, delta))
+
+
+def invalider(utilisateur_ids):
+    """Compteurs inconnus après une opération groupée : recomptés à la prochaine lecture"""
+    cles = [
+        _cle(utilisateur_id, filtre)
+        for utilisateur_id in set(utilisateur_ids) for filtre in (*FILTRES, 'types')
+    ]
+    if cles:
+        transaction.on_commit(lambda: cache.delete_many(cles))
+
+
+def _incrementer(utilisateur_id, filtre, delta):
+    cache.delete(_cle(utilisateur_id, 'types'))
+    try:
+        cache.incr(_cle(utilisateur_id, filtre), delta)
+    except ValueError:
+        # Clé absente : elle sera recomptée à la prochaine lecture
+        pass
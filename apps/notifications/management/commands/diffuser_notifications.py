@@ -0,0 +1,36 @@
+"""
+Envoie les diffusions de notifications programmées (administrateurs, investisseurs d'un projet)
+Usage : python manage.py diffuser_notifications [--boucle]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.models import DiffusionNotification
+
+
+class Command(BaseCommand):
+    help = "Crée par lots les notifications des diffusions en attente"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=1000, help="Notifications insérées par transaction")
+        parser.add_argument('--boucle', action='store_true', help="Tourner en continu (worker)")
+        parser.add_argument('--pause', type=float, default=1.0, help="Attente en secondes quand la file est vide")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            diffusion = DiffusionNotification.traiter_lot(taille=options['lot'])
+            if diffusion is None:
+                if not options['boucle']:
+                    break
+                time.sleep(options['pause'])
+                continue
+
+            total += 1
+            self.stdout.write(
+                f"Diffusion {diffusion.pk} : {diffusion.destinataires_traites}"
+                f"/{diffusion.total_destinataires} ({diffusion.progression} %)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{total} lot(s) de notifications envoyé(s)"))
@@ -0,0 +1,69 @@
+"""
+Worker de la boîte d'envoi : envoie les emails de EmailSortant par lots
+Usage : python manage.py envoyer_emails [--processus 4] [--lot 50] [--boucle]
+        python manage.py envoyer_emails --metriques
+"""
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.notifications.models import EmailSortant
+
+
+class Command(BaseCommand):
+    help = "Envoie les emails en attente (sessions SMTP par lot, backoff, limites par domaine)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processus', type=int, default=1, help="Nombre de processus d'envoi")
+        parser.add_argument('--lot', type=int, default=50, help="Emails envoyés par session SMTP")
+        parser.add_argument('--boucle', action='store_true', help="Tourner en continu (worker)")
+        parser.add_argument('--pause', type=float, default=1.0, help="Attente en secondes quand la file est vide")
+        parser.add_argument('--metriques', action='store_true', help="Afficher l'état de la file et les latences")
+
+    def handle(self, *args, **options):
+        if options['metriques']:
+            for nom, valeur in EmailSortant.metriques().items():
+                self.stdout.write(f"{nom} : {valeur}")
+            return
+
+        if options['processus'] <= 1:
+            self.travailler(options)
+            return
+
+        # Connexions à la base non partagées avec les processus enfants
+        connections.close_all()
+        processus = [
+            multiprocessing.Process(target=self.travailler, args=(options,), daemon=True)
+            for _ in range(options['processus'])
+        ]
+        for enfant in processus:
+            enfant.start()
+        try:
+            for enfant in processus:
+                enfant.join()
+        except KeyboardInterrupt:
+            for enfant in processus:
+                enfant.terminate()
+
+    def travailler(self, options):
+        totaux = {'envoyes': 0, 'reportes': 0, 'echecs': 0}
+        while True:
+            resultats = EmailSortant.envoyer_lot(taille=options['lot'])
+            if resultats is None:
+                if not options['boucle']:
+                    break
+                time.sleep(options['pause'])
+                continue
+
+            for nom, valeur in resultats.items():
+                totaux[nom] += valeur
+            self.stdout.write(
+                f"Lot : {resultats['envoyes']} envoyé(s), {resultats['reportes']} reporté(s), "
+                f"{resultats['echecs']} échec(s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{totaux['envoyes']} email(s) envoyé(s), {totaux['reportes']} reporté(s), {totaux['echecs']} échec(s)"
+        ))
@@ -0,0 +1,40 @@
+"""
+Envoie par email les résumés des notifications non lues (ParametreNotification)
+Usage : python manage.py envoyer_resumes --frequence quotidien|hebdomadaire
+(cron : tous les jours / toutes les semaines ; une exécution interrompue est reprise)
+"""
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from apps.notifications.models import EnvoiResume, FrequenceResume
+
+
+class Command(BaseCommand):
+    help = "Génère et envoie les résumés quotidiens ou hebdomadaires des notifications non lues"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frequence', required=True, choices=['quotidien', 'hebdomadaire'])
+        parser.add_argument('--lot', type=int, default=200, help="Emails envoyés par lot")
+        parser.add_argument('--page', type=int, default=5000, help="Notifications lues par requête")
+        parser.add_argument('--max-elements', type=int, default=20, help="Notifications détaillées par résumé")
+
+    def handle(self, *args, **options):
+        envoi = EnvoiResume.demarrer(FrequenceResume(options['frequence'].upper()))
+        if envoi.dernier_utilisateur:
+            self.stdout.write(f"Reprise après l'utilisateur {envoi.dernier_utilisateur}")
+
+        # Une seule connexion SMTP pour tous les lots
+        with get_connection() as connexion:
+            envoi.envoyer(
+                connexion,
+                taille_lot=options['lot'],
+                taille_page=options['page'],
+                max_elements=options['max_elements'],
+                progression=lambda e: self.stdout.write(
+                    f"{e.utilisateurs_traites} résumé(s), {e.emails_envoyes} email(s) envoyé(s)"
+                )
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{envoi}: {envoi.utilisateurs_traites} résumé(s), {envoi.emails_envoyes} email(s) envoyé(s)"
+        ))
@@ -0,0 +1,33 @@
+"""
+Applique la politique de rétention des notifications (voir NOTIFICATIONS_RETENTION_* dans settings)
+Usage : python manage.py purger_notifications [--lot 1000] [--pause 0.1]
+(cron quotidien, aux heures creuses)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.notifications.models import Notification, NotificationArchivee
+
+
+class Command(BaseCommand):
+    help = "Archive les notifications expirées et supprime les archives trop anciennes, par petits lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=1000, help="Lignes déplacées ou supprimées par transaction")
+        parser.add_argument('--pause', type=float, default=0.1, help="Pause en secondes entre deux lots")
+        parser.add_argument('--simulation', action='store_true', help="Compter sans rien modifier")
+
+    def handle(self, *args, **options):
+        if options['simulation']:
+            self.stdout.write(f"{Notification.expirees().count()} notification(s) à archiver")
+            return
+
+        archivees = Notification.archiver_expirees(
+            taille_lot=options['lot'],
+            pause=options['pause'],
+            progression=lambda total: self.stdout.write(f"{total} notification(s) archivée(s)")
+        )
+        supprimees = NotificationArchivee.purger(taille_lot=options['lot'], pause=options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{archivees} notification(s) archivée(s), {supprimees} archive(s) supprimée(s)"
+        ))
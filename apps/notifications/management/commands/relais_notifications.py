@@ -0,0 +1,31 @@
+"""
+Relais des notifications en direct entre les processus (workers ASGI, commandes)
+Usage : python manage.py relais_notifications [--adresse 127.0.0.1:8765]
+Les processus s'y connectent via NOTIFICATIONS_FLUX_RELAIS (même adresse)
+"""
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.notifications.temps_reel import demarrer_relais
+
+
+class Command(BaseCommand):
+    help = "Rediffuse les événements de notification publiés par un processus à tous les autres"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--adresse', default=settings.NOTIFICATIONS_FLUX_RELAIS or '127.0.0.1:8765',
+            help="hote:port d'écoute"
+        )
+
+    def handle(self, *args, **options):
+        hote, port = options['adresse'].rsplit(':', 1)
+        asyncio.run(self.servir(hote, int(port)))
+
+    async def servir(self, hote, port):
+        serveur = await demarrer_relais(hote, port)
+        self.stdout.write(self.style.SUCCESS(f"Relais des notifications à l'écoute sur {hote}:{port}"))
+        async with serveur:
+            await serveur.serve_forever()
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projet_parts_reservees'),
+        ('notifications', '0003_parametrenotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiffusionNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cible', models.CharField(choices=[('ADMINISTRATEURS', 'Administrateurs'), ('INVESTISSEURS_PROJET', 'Investisseurs confirmés du projet')], max_length=30, verbose_name='Destinataires')),
+                ('titre', models.CharField(max_length=200, verbose_name='Titre')),
+                ('contenu', models.TextField(verbose_name='Contenu')),
+                ('type', models.CharField(max_length=30, verbose_name='Type de notification')),
+                ('action_requise', models.BooleanField(default=False, verbose_name='Action requise')),
+                ('lien_action', models.CharField(blank=True, max_length=200, verbose_name="Lien d'action")),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINEE', 'Terminée')], default='EN_ATTENTE', max_length=10, verbose_name='Statut')),
+                ('dernier_destinataire', models.BigIntegerField(default=0, verbose_name='Dernier destinataire traité')),
+                ('destinataires_traites', models.IntegerField(default=0, verbose_name='Notifications créées')),
+                ('total_destinataires', models.IntegerField(blank=True, null=True, verbose_name='Destinataires (au démarrage)')),
+                ('date_creation', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de création')),
+                ('date_debut', models.DateTimeField(blank=True, null=True, verbose_name="Début de l'envoi")),
+                ('date_fin', models.DateTimeField(blank=True, null=True, verbose_name="Fin de l'envoi")),
+                ('projet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='diffusions', to='projects.projet', verbose_name='Projet concerné')),
+            ],
+            options={
+                'verbose_name': 'Diffusion de notification',
+                'verbose_name_plural': 'Diffusions de notifications',
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['statut', 'id'], name='notificatio_statut_248b32_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_diffusionnotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvoiResume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequence', models.CharField(choices=[('QUOTIDIEN', 'Quotidien'), ('HEBDOMADAIRE', 'Hebdomadaire')], max_length=15, verbose_name='Fréquence')),
+                ('debut', models.DateTimeField(verbose_name='Notifications créées après')),
+                ('fin', models.DateTimeField(verbose_name="Notifications créées jusqu'à")),
+                ('dernier_utilisateur', models.BigIntegerField(default=0, verbose_name='Dernier utilisateur traité')),
+                ('utilisateurs_traites', models.IntegerField(default=0, verbose_name='Résumés générés')),
+                ('emails_envoyes', models.IntegerField(default=0, verbose_name='Emails envoyés')),
+                ('termine', models.BooleanField(default=False, verbose_name='Terminé')),
+                ('date_debut', models.DateTimeField(default=django.utils.timezone.now, verbose_name="Début de l'envoi")),
+                ('date_fin', models.DateTimeField(blank=True, null=True, verbose_name="Fin de l'envoi")),
+            ],
+            options={
+                'verbose_name': 'Envoi de résumés',
+                'verbose_name_plural': 'Envois de résumés',
+                'ordering': ['-fin'],
+                'indexes': [models.Index(fields=['frequence', 'termine', 'fin'], name='notificatio_frequen_163ef3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projet_parts_reservees'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('investments', '0010_investissement_index_diffusion'),
+        ('notifications', '0005_envoiresume'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchivee',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('titre', models.CharField(max_length=200, verbose_name='Titre')),
+                ('contenu', models.TextField(verbose_name='Contenu')),
+                ('type', models.CharField(choices=[('VALIDATION_COMPTE', 'Validation de compte'), ('VALIDATION_PROJET', 'Validation de projet'), ('NOUVEL_INVESTISSEMENT', 'Nouvel investissement'), ('MISE_A_JOUR_PROJET', 'Mise à jour de projet'), ('ALERTE_SYSTEME', 'Alerte système'), ('RAPPEL', 'Rappel'), ('CONFIRMATION_INVESTISSEMENT', "Confirmation d'investissement"), ('REFUS_INVESTISSEMENT', "Refus d'investissement"), ('PROJET_FINANCE', 'Projet entièrement financé'), ('ETAPE_TERMINEE', 'Étape terminée'), ('COMPTE_RENDU_PUBLIE', 'Compte rendu publié'), ('NOUVEAU_PROJET_A_VALIDER', 'Nouveau projet à valider')], max_length=30, verbose_name='Type de notification')),
+                ('date_creation', models.DateTimeField(verbose_name='Date de création')),
+                ('date_lecture', models.DateTimeField(blank=True, null=True, verbose_name='Date de lecture')),
+                ('lue', models.BooleanField(default=False, verbose_name='Lue')),
+                ('action_requise', models.BooleanField(default=False, verbose_name='Action requise')),
+                ('lien_action', models.URLField(blank=True, verbose_name="Lien d'action")),
+                ('date_archivage', models.DateTimeField(default=django.utils.timezone.now, verbose_name="Date d'archivage")),
+                ('investissement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='investments.investissement', verbose_name='Investissement concerné')),
+                ('projet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.projet', verbose_name='Projet concerné')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications_archivees', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur destinataire')),
+            ],
+            options={
+                'verbose_name': 'Notification archivée',
+                'verbose_name_plural': 'Notifications archivées',
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['utilisateur', 'date_creation'], name='notificatio_utilisa_216299_idx'), models.Index(fields=['date_archivage'], name='notificatio_date_ar_2caf4c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notificationarchivee'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', '-date_creation', '-id'], name='notif_boite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', 'lue', '-date_creation', '-id'], name='notif_boite_non_lues_idx'),
+        ),
+        # Après les créations : MySQL garde toujours un index pour la clé étrangère utilisateur
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_utilisa_74632e_idx',
+        ),
+    ]
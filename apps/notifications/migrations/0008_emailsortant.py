@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_index_boite_reception'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailSortant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sujet', models.CharField(max_length=255, verbose_name='Sujet')),
+                ('expediteur', models.CharField(max_length=255, verbose_name='Expéditeur')),
+                ('destinataires', models.JSONField(verbose_name='Destinataires (enveloppe)')),
+                ('domaine', models.CharField(max_length=255, verbose_name='Domaine')),
+                ('message', models.BinaryField(verbose_name='Message MIME')),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', "En cours d'envoi"), ('ENVOYE', 'Envoyé'), ('ECHEC', 'Échec définitif')], default='EN_ATTENTE', max_length=20, verbose_name='Statut')),
+                ('tentatives', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('prochaine_tentative', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochaine tentative')),
+                ('verrou_jusqua', models.DateTimeField(blank=True, null=True, verbose_name="Réservé jusqu'au")),
+                ('derniere_erreur', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('date_creation', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de création')),
+                ('date_envoi', models.DateTimeField(blank=True, null=True, verbose_name="Date d'envoi")),
+                ('duree_envoi', models.PositiveIntegerField(blank=True, null=True, verbose_name='Durée SMTP (ms)')),
+            ],
+            options={
+                'verbose_name': 'Email sortant',
+                'verbose_name_plural': 'Emails sortants',
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['statut', 'prochaine_tentative'], name='notificatio_statut_63ddbc_idx'), models.Index(fields=['date_envoi'], name='notificatio_date_en_59921c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_emailsortant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1, verbose_name='Occurrences regroupées'),
+        ),
+        migrations.AddField(
+            model_name='notificationarchivee',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1, verbose_name='Occurrences regroupées'),
+        ),
+    ]
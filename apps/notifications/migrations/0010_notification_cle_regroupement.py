@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0009_notification_occurrences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='cle_regroupement',
+            field=models.CharField(blank=True, editable=False, max_length=80, null=True, unique=True, verbose_name='Clé de regroupement'),
+        ),
+    ]
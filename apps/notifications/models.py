@@ -2,13 +2,44 @@
 Modèles pour la gestion des notifications
 Plateforme crowdBuilding - Burkina Faso
 """
-from django.db import models
+import smtplib
+import time
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.message import sanitize_address
+from django.db import IntegrityError, models
+from django.db import transaction
+from django.template.loader import render_to_string
 from django.utils import timezone
 from apps.accounts.models import Utilisateur
 from apps.projects.models import Projet
-from apps.investments.models import Investissement
+from apps.projects.utils import get_administrateurs
+from apps.investments.models import Investissement, StatutInvestissement
+from apps.notifications import compteurs, temps_reel
+
 
 
+def parcourir_par_lots(queryset, taille_lot=1000, pause=0, champs=()):
+    """
+    Lignes (pk, *champs) du queryset par lots, dans l'ordre des pk (pagination par clé)
+    Chaque lot est traité dans sa propre transaction par l'appelant : les verrous
+    ne portent jamais que sur un lot ; `pause` secondes entre deux lots
+    """
+    dernier = 0
+    while True:
+        lignes = list(queryset.filter(pk__gt=dernier).order_by('pk').values_list('pk', *champs)[:taille_lot])
+        if not lignes:
+            return
+        yield lignes
+        if len(lignes) < taille_lot:
+            return
+        dernier = lignes[-1][0]
+        if pause:
+            time.sleep(pause)
 
 
 class TypeNotification(models.TextChoices):
@@ -27,6 +58,17 @@ class TypeNotification(models.TextChoices):
     NOUVEAU_PROJET_A_VALIDER = 'NOUVEAU_PROJET_A_VALIDER', 'Nouveau projet à valider'
 
 
+# Types regroupés : une notification non lue par (destinataire, type, projet)
+# pendant NOTIFICATIONS_REGROUPEMENT_MINUTES, dont le compteur `occurrences` augmente
+TYPES_REGROUPES = {
+    TypeNotification.NOUVEL_INVESTISSEMENT,
+    TypeNotification.NOUVEAU_PROJET_A_VALIDER,
+}
+
+# Insertions concurrentes sur une même clé de regroupement : tentatives avant d'abandonner
+TENTATIVES_REGROUPEMENT = 3
+
+
 class Notification(models.Model):
     """
     Modèle pour les notifications du système
@@ -52,6 +94,13 @@ class Notification(models.Model):
     date_creation = models.DateTimeField(default=timezone.now, verbose_name="Date de création")
     date_lecture = models.DateTimeField(null=True, blank=True, verbose_name="Date de lecture")
     lue = models.BooleanField(default=False, verbose_name="Lue")
+    occurrences = models.PositiveIntegerField(default=1, verbose_name="Occurrences regroupées")
+    # (destinataire, type, projet) des TYPES_REGROUPES : unique, une seule ligne par clé
+    # peut recevoir les regroupements ; libérée quand la notification n'est plus regroupable
+    cle_regroupement = models.CharField(
+        max_length=80, null=True, blank=True, unique=True, editable=False,
+        verbose_name="Clé de regroupement"
+    )
     
     # Relations optionnelles pour contextualiser la notification
     projet = models.ForeignKey(
@@ -80,19 +129,90 @@ class Notification(models.Model):
         verbose_name_plural = "Notifications"
         ordering = ['-date_creation']
         indexes = [
-            models.Index(fields=['utilisateur', 'lue']),
+            # Boîte de réception : pagination par curseur sur (date_creation DESC, id DESC)
+            models.Index(fields=['utilisateur', '-date_creation', '-id'], name='notif_boite_idx'),
+            models.Index(fields=['utilisateur', 'lue', '-date_creation', '-id'], name='notif_boite_non_lues_idx'),
             models.Index(fields=['date_creation']),
         ]
     
     def __str__(self):
         return f"{self.utilisateur.nom_complet} - {self.titre}"
     
+    # Valeur de `lue` en base, pour tenir les compteurs au save() / delete()
+    _lue_en_base = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._lue_en_base = instance.__dict__.get('lue')
+        return instance
+
+    def save(self, *args, **kwargs):
+        ajout = self._state.adding
+        super().save(*args, **kwargs)
+        if ajout:
+            for filtre in compteurs.filtres(self):
+                compteurs.ajuster(self.utilisateur_id, 1, filtre)
+            temps_reel.publier_notifications([self])
+        elif self._lue_en_base is None:
+            compteurs.invalider([self.utilisateur_id])
+            temps_reel.resynchroniser([self.utilisateur_id])
+        elif self._lue_en_base != self.lue and not self.sous_filigrane():
+            compteurs.ajuster(self.utilisateur_id, int(self._lue_en_base) - int(self.lue))
+            temps_reel.ajuster(self.utilisateur_id, int(self._lue_en_base) - int(self.lue))
+        self._lue_en_base = self.lue
+
+    def delete(self, *args, **kwargs):
+        resultat = super().delete(*args, **kwargs)
+        if self._lue_en_base is None:
+            compteurs.invalider([self.utilisateur_id])
+            temps_reel.resynchroniser([self.utilisateur_id])
+        else:
+            for filtre in compteurs.filtres(self):
+                if filtre != 'non_lues':
+                    compteurs.ajuster(self.utilisateur_id, -1, filtre)
+            if not self._lue_en_base and not self.sous_filigrane():
+                compteurs.ajuster(self.utilisateur_id, -1)
+                temps_reel.ajuster(self.utilisateur_id, -1)
+        return resultat
+
+    def sous_filigrane(self):
+        """Lue implicitement : créée avant le dernier « tout marquer comme lu » de son destinataire"""
+        filigrane = self.utilisateur.notifications_lues_jusqua
+        return filigrane is not None and self.date_creation <= filigrane
+
+    @staticmethod
+    def appliquer_filigrane(notifications, utilisateur):
+        """Affichage : les notifications sous le filigrane de l'utilisateur apparaissent lues"""
+        filigrane = utilisateur.notifications_lues_jusqua
+        if filigrane is not None:
+            for notification in notifications:
+                if not notification.lue and notification.date_creation <= filigrane:
+                    notification.lue = notification._lue_en_base = True
+        return notifications
+
+    @classmethod
+    def marquer_toutes_lues(cls, utilisateurs):
+        """
+        « Tout marquer comme lu » : avance le filigrane de lecture des utilisateurs,
+        une seule écriture par utilisateur, aucune ligne de notification modifiée
+        Retourne le nombre d'utilisateurs concernés
+        """
+        with transaction.atomic():
+            ids = list(utilisateurs.values_list('pk', flat=True))
+            nombre = utilisateurs.update(notifications_lues_jusqua=timezone.now())
+            compteurs.invalider(ids)
+            temps_reel.resynchroniser(ids)
+        return nombre
+
     def marquer_comme_lue(self):
         """Marque la notification comme lue"""
         if not self.lue:
             self.lue = True
             self.date_lecture = timezone.now()
-            self.save()
+            self.cle_regroupement = None
+            # Seuls les champs de lecture : un regroupement concurrent n'est pas écrasé
+            self.save(update_fields=['lue', 'date_lecture', 'cle_regroupement'])
     
     def envoyer(self):
         """Envoie la notification (email + stockage en base)"""
@@ -100,6 +220,151 @@ class Notification(models.Model):
         # Pour l'instant, on se contente de sauvegarder en base
         self.save()
     
+    # ========== REGROUPEMENT ==========
+
+    @staticmethod
+    def cle_pour(utilisateur_id, type, projet_id=None):
+        return f"{utilisateur_id}:{type}:{projet_id or ''}"
+
+    @classmethod
+    def creer_ou_regrouper(cls, utilisateur_ids, type, projet_id=None, **valeurs):
+        """
+        Notifie les utilisateurs ; pour les TYPES_REGROUPES, la notification non lue
+        de même (destinataire, type, projet) reçue depuis moins de
+        NOTIFICATIONS_REGROUPEMENT_MINUTES est mise à jour (occurrences + 1, titre
+        et contenu les plus récents, remontée en tête) au lieu d'une nouvelle ligne
+        Retourne (notifications créées ou mises à jour, nombre de regroupements)
+        """
+        utilisateur_ids = sorted(set(utilisateur_ids))
+        if type not in TYPES_REGROUPES or not utilisateur_ids:
+            with transaction.atomic():
+                return cls._regrouper(utilisateur_ids, type, projet_id, {}, valeurs), 0
+
+        # Deux créations concurrentes pour une même clé : la seconde insertion échoue
+        # sur l'unicité de cle_regroupement, et la tentative suivante regroupe
+        for tentative in range(TENTATIVES_REGROUPEMENT):
+            try:
+                with transaction.atomic():
+                    cles = {cls.cle_pour(utilisateur_id, type, projet_id): utilisateur_id
+                            for utilisateur_id in utilisateur_ids}
+                    # Verrou sur les seules lignes de regroupement, dans l'ordre des clés
+                    verrouillees = dict(cls.objects.select_for_update().filter(
+                        cle_regroupement__in=cles
+                    ).order_by('cle_regroupement').values_list('pk', 'utilisateur_id'))
+                    maintenant = timezone.now()
+                    ouvertes = dict(cls.objects.filter(
+                        compteurs.NON_LUES,
+                        pk__in=verrouillees,
+                        date_creation__gte=maintenant - timedelta(minutes=settings.NOTIFICATIONS_REGROUPEMENT_MINUTES)
+                    ).values_list('utilisateur_id', 'pk'))
+                    # Lues ou hors fenêtre : la clé passe à la notification suivante
+                    fermees = set(verrouillees) - set(ouvertes.values())
+                    if fermees:
+                        cls.objects.filter(pk__in=fermees).update(cle_regroupement=None)
+                    resultat = cls._regrouper(utilisateur_ids, type, projet_id, ouvertes, valeurs, maintenant)
+                return resultat, len(ouvertes)
+            except IntegrityError:
+                if tentative == TENTATIVES_REGROUPEMENT - 1:
+                    raise
+
+    @classmethod
+    def _regrouper(cls, utilisateur_ids, type, projet_id, existantes, valeurs, maintenant=None):
+        """Met à jour les notifications `existantes` ({utilisateur_id: pk}), crée les autres"""
+        maintenant = maintenant or timezone.now()
+        regroupees = []
+        if existantes:
+            cls.objects.filter(pk__in=existantes.values()).update(
+                occurrences=models.F('occurrences') + 1,
+                date_creation=maintenant,
+                **valeurs
+            )
+            regroupees = list(cls.objects.filter(pk__in=existantes.values()))
+
+        regroupable = type in TYPES_REGROUPES
+        nouvelles = cls.objects.bulk_create([
+            cls(
+                utilisateur_id=utilisateur_id, type=type, projet_id=projet_id, date_creation=maintenant,
+                cle_regroupement=cls.cle_pour(utilisateur_id, type, projet_id) if regroupable else None,
+                **valeurs
+            )
+            for utilisateur_id in utilisateur_ids if utilisateur_id not in existantes
+        ])
+        # Les notifications regroupées restent non lues : leurs compteurs ne changent pas
+        compteurs.invalider(notification.utilisateur_id for notification in nouvelles)
+        temps_reel.publier_notifications(nouvelles + regroupees)
+        return nouvelles + regroupees
+
+    @classmethod
+    def ecritures_evitees(cls):
+        """Insertions évitées par le regroupement, archives comprises"""
+        somme = models.Sum(models.F('occurrences') - 1)
+        return sum(
+            modele.objects.filter(occurrences__gt=1).aggregate(total=somme)['total'] or 0
+            for modele in (cls, NotificationArchivee)
+        )
+
+    # ========== OPÉRATIONS GROUPÉES (par lots) ==========
+
+    @classmethod
+    def marquer_lues_par_lots(cls, queryset, taille_lot=1000, pause=0):
+        """Marque comme lues les notifications du queryset, un UPDATE court par lot"""
+        total = 0
+        for lignes in parcourir_par_lots(queryset.filter(lue=False), taille_lot, pause, champs=('utilisateur_id',)):
+            with transaction.atomic():
+                total += cls.objects.filter(id__in=[pk for pk, _ in lignes], lue=False).update(
+                    lue=True,
+                    date_lecture=timezone.now()
+                )
+                compteurs.invalider(utilisateur_id for _, utilisateur_id in lignes)
+                temps_reel.resynchroniser(utilisateur_id for _, utilisateur_id in lignes)
+        return total
+
+    @classmethod
+    def supprimer_par_lots(cls, queryset, taille_lot=1000, pause=0):
+        """Supprime les notifications du queryset, un DELETE court par lot"""
+        total = 0
+        for lignes in parcourir_par_lots(queryset, taille_lot, pause, champs=('utilisateur_id',)):
+            with transaction.atomic():
+                total += cls.objects.filter(id__in=[pk for pk, _ in lignes]).delete()[0]
+                compteurs.invalider(utilisateur_id for _, utilisateur_id in lignes)
+                temps_reel.resynchroniser(utilisateur_id for _, utilisateur_id in lignes)
+        return total
+
+    @classmethod
+    def expirees(cls, maintenant=None):
+        """
+        Notifications sorties de la période de rétention :
+        lues (filigrane compris) depuis NOTIFICATIONS_RETENTION_LUES_JOURS, ou toutes après
+        NOTIFICATIONS_RETENTION_JOURS
+        """
+        maintenant = maintenant or timezone.now()
+        return cls.objects.filter(
+            compteurs.LUES
+            & models.Q(date_creation__lt=maintenant - timedelta(days=settings.NOTIFICATIONS_RETENTION_LUES_JOURS))
+            | models.Q(date_creation__lt=maintenant - timedelta(days=settings.NOTIFICATIONS_RETENTION_JOURS))
+        )
+
+    @classmethod
+    def archiver_expirees(cls, taille_lot=1000, pause=0, progression=None):
+        """
+        Déplace les notifications expirées vers NotificationArchivee, lot par lot :
+        copie et suppression dans la même transaction courte
+        Retourne le nombre de notifications archivées
+        """
+        total = 0
+        for lignes in parcourir_par_lots(cls.expirees(), taille_lot, pause):
+            with transaction.atomic():
+                notifications = cls.objects.filter(id__in=[pk for pk, in lignes]).values(*CHAMPS_ARCHIVES)
+                archivees = [NotificationArchivee(**valeurs) for valeurs in notifications]
+                NotificationArchivee.objects.bulk_create(archivees, ignore_conflicts=True)
+                cls.objects.filter(id__in=[archivee.id for archivee in archivees]).delete()
+                compteurs.invalider(archivee.utilisateur_id for archivee in archivees)
+                temps_reel.resynchroniser(archivee.utilisateur_id for archivee in archivees if not archivee.lue)
+            total += len(archivees)
+            if progression:
+                progression(total)
+        return total
+    
     @classmethod
     def creer_notification_validation_compte(cls, utilisateur, valide=True):
         """Crée une notification de validation de compte"""
@@ -141,6 +406,10 @@ class Notification(models.Model):
     
     @classmethod
     def creer_notification_nouvel_investissement(cls, investissement):
+        """
+        Notifie le promoteur d'une intention d'investissement
+        Regroupée avec la précédente tant que le promoteur ne l'a pas lue
+        """
         titre = "Nouvelle intention d’investissement"
         contenu = (
             f"Bonjour {investissement.projet.promoteur.prenom},\n\n"
@@ -150,14 +419,15 @@ class Notification(models.Model):
             f"Statut : En attente de paiement."
         )
 
-        return cls.objects.create(
-            utilisateur=investissement.projet.promoteur,
+        notifications, _ = cls.creer_ou_regrouper(
+            [investissement.projet.promoteur_id],
+            TypeNotification.NOUVEL_INVESTISSEMENT,
+            projet_id=investissement.projet_id,
             titre=titre,
             contenu=contenu,
-            type=TypeNotification.NOUVEL_INVESTISSEMENT,
-            projet=investissement.projet,
-            investissement=investissement
+            investissement_id=investissement.pk
         )
+        return notifications[0]
 
     
 
@@ -196,56 +466,36 @@ class Notification(models.Model):
     
     @classmethod
     def creer_notification_etape_terminee(cls, etape):
-        """Crée une notification quand une étape est terminée"""
-        titre = "Étape terminée"
-        contenu = f"L'étape '{etape.titre}' du projet '{etape.projet.titre}' a été terminée avec succès."
-        
-        # Notifier tous les investisseurs du projet
-        investisseurs = Utilisateur.objects.filter(
-            investissements__projet=etape.projet,
-            investissements__statut='CONFIRME'
-        ).distinct()
-        
-        notifications = []
-        for investisseur in investisseurs:
-            notifications.append(cls(
-                utilisateur=investisseur,
-                titre=titre,
-                contenu=contenu,
-                type=TypeNotification.ETAPE_TERMINEE,
-                projet=etape.projet
-            ))
-        
-        return cls.objects.bulk_create(notifications)
+        """
+        Programme la notification des investisseurs quand une étape est terminée
+        L'envoi est fait par la commande diffuser_notifications
+        """
+        return DiffusionNotification.programmer(
+            cible=CibleDiffusion.INVESTISSEURS_PROJET,
+            projet=etape.projet,
+            titre="Étape terminée",
+            contenu=f"L'étape '{etape.titre}' du projet '{etape.projet.titre}' a été terminée avec succès.",
+            type=TypeNotification.ETAPE_TERMINEE
+        )
     
     @classmethod
     def creer_notification_compte_rendu(cls, compte_rendu):
-        """Crée une notification quand un compte rendu est publié"""
-        titre = "Nouveau compte rendu publié"
-        contenu = f"Un nouveau compte rendu a été publié pour le projet '{compte_rendu.projet.titre}'.\n\nTitre: {compte_rendu.titre}\nAvancement: {compte_rendu.avancement}%"
-        
-        # Notifier tous les investisseurs du projet
-        investisseurs = Utilisateur.objects.filter(
-            investissements__projet=compte_rendu.projet,
-            investissements__statut='CONFIRME'
-        ).distinct()
-        
-        notifications = []
-        for investisseur in investisseurs:
-            notifications.append(cls(
-                utilisateur=investisseur,
-                titre=titre,
-                contenu=contenu,
-                type=TypeNotification.COMPTE_RENDU_PUBLIE,
-                projet=compte_rendu.projet
-            ))
-        
-        return cls.objects.bulk_create(notifications)
+        """
+        Programme la notification des investisseurs quand un compte rendu est publié
+        L'envoi est fait par la commande diffuser_notifications
+        """
+        return DiffusionNotification.programmer(
+            cible=CibleDiffusion.INVESTISSEURS_PROJET,
+            projet=compte_rendu.projet,
+            titre="Nouveau compte rendu publié",
+            contenu=f"Un nouveau compte rendu a été publié pour le projet '{compte_rendu.projet.titre}'.\n\nTitre: {compte_rendu.titre}\nAvancement: {compte_rendu.avancement}%",
+            type=TypeNotification.COMPTE_RENDU_PUBLIE
+        )
     
     @classmethod
     def get_notifications_non_lues(cls, utilisateur):
         """Retourne les notifications non lues d'un utilisateur"""
-        return cls.objects.filter(utilisateur=utilisateur, lue=False)
+        return cls.objects.filter(compteurs.NON_LUES, utilisateur=utilisateur)
     
     @classmethod
     def get_notifications_recentes(cls, utilisateur, limit=10):
@@ -253,6 +503,221 @@ class Notification(models.Model):
         return cls.objects.filter(utilisateur=utilisateur)[:limit]
 
 
+# =========================
+# ARCHIVES
+# =========================
+
+CHAMPS_ARCHIVES = (
+    'id', 'utilisateur_id', 'titre', 'contenu', 'type', 'date_creation', 'date_lecture', 'lue', 'occurrences',
+    'projet_id', 'investissement_id', 'action_requise', 'lien_action',
+)
+
+
+class NotificationArchivee(models.Model):
+    """
+    Notifications sorties de la table principale par la politique de rétention
+    (commande purger_notifications), avec leur identifiant d'origine
+    Supprimées à leur tour après NOTIFICATIONS_ARCHIVES_CONSERVATION_JOURS
+    """
+    id = models.BigIntegerField(primary_key=True)
+    utilisateur = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.CASCADE,
+        related_name='notifications_archivees',
+        verbose_name="Utilisateur destinataire"
+    )
+    titre = models.CharField(max_length=200, verbose_name="Titre")
+    contenu = models.TextField(verbose_name="Contenu")
+    type = models.CharField(max_length=30, choices=TypeNotification.choices, verbose_name="Type de notification")
+    date_creation = models.DateTimeField(verbose_name="Date de création")
+    date_lecture = models.DateTimeField(null=True, blank=True, verbose_name="Date de lecture")
+    lue = models.BooleanField(default=False, verbose_name="Lue")
+    occurrences = models.PositiveIntegerField(default=1, verbose_name="Occurrences regroupées")
+    projet = models.ForeignKey(
+        Projet,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Projet concerné"
+    )
+    investissement = models.ForeignKey(
+        Investissement,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Investissement concerné"
+    )
+    action_requise = models.BooleanField(default=False, verbose_name="Action requise")
+    lien_action = models.URLField(blank=True, verbose_name="Lien d'action")
+    date_archivage = models.DateTimeField(default=timezone.now, verbose_name="Date d'archivage")
+
+    class Meta:
+        verbose_name = "Notification archivée"
+        verbose_name_plural = "Notifications archivées"
+        ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['utilisateur', 'date_creation']),
+            models.Index(fields=['date_archivage']),
+        ]
+
+    def __str__(self):
+        return f"{self.titre} (archivée)"
+
+    @classmethod
+    def purger(cls, taille_lot=1000, pause=0, maintenant=None):
+        """Supprime par lots les archives plus anciennes que la durée de conservation"""
+        maintenant = maintenant or timezone.now()
+        limite = maintenant - timedelta(days=settings.NOTIFICATIONS_ARCHIVES_CONSERVATION_JOURS)
+        total = 0
+        for lignes in parcourir_par_lots(cls.objects.filter(date_archivage__lt=limite), taille_lot, pause):
+            total += cls.objects.filter(id__in=[pk for pk, in lignes]).delete()[0]
+        return total
+
+
+# =========================
+# DIFFUSIONS
+# =========================
+
+class CibleDiffusion(models.TextChoices):
+    """Ensembles de destinataires d'une diffusion"""
+    ADMINISTRATEURS = 'ADMINISTRATEURS', 'Administrateurs'
+    INVESTISSEURS_PROJET = 'INVESTISSEURS_PROJET', 'Investisseurs confirmés du projet'
+
+
+class StatutDiffusion(models.TextChoices):
+    EN_ATTENTE = 'EN_ATTENTE', 'En attente'
+    EN_COURS = 'EN_COURS', 'En cours'
+    TERMINEE = 'TERMINEE', 'Terminée'
+
+
+class DiffusionNotification(models.Model):
+    """
+    Une même notification à envoyer à tout un ensemble de destinataires
+    La requête ne fait qu'insérer la diffusion ; la commande diffuser_notifications
+    parcourt les destinataires par clé (id > dernier_destinataire) et insère les
+    notifications par lots. La position avance dans la même transaction que le lot :
+    une diffusion interrompue reprend là où elle s'était arrêtée, sans doublon
+    """
+    cible = models.CharField(max_length=30, choices=CibleDiffusion.choices, verbose_name="Destinataires")
+    projet = models.ForeignKey(
+        Projet,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='diffusions',
+        verbose_name="Projet concerné"
+    )
+
+    # Contenu des notifications créées
+    titre = models.CharField(max_length=200, verbose_name="Titre")
+    contenu = models.TextField(verbose_name="Contenu")
+    type = models.CharField(max_length=30, verbose_name="Type de notification")
+    action_requise = models.BooleanField(default=False, verbose_name="Action requise")
+    lien_action = models.CharField(max_length=200, blank=True, verbose_name="Lien d'action")
+
+    # Avancement
+    statut = models.CharField(
+        max_length=10,
+        choices=StatutDiffusion.choices,
+        default=StatutDiffusion.EN_ATTENTE,
+        verbose_name="Statut"
+    )
+    dernier_destinataire = models.BigIntegerField(default=0, verbose_name="Dernier destinataire traité")
+    destinataires_traites = models.IntegerField(default=0, verbose_name="Notifications créées")
+    total_destinataires = models.IntegerField(null=True, blank=True, verbose_name="Destinataires (au démarrage)")
+
+    date_creation = models.DateTimeField(default=timezone.now, verbose_name="Date de création")
+    date_debut = models.DateTimeField(null=True, blank=True, verbose_name="Début de l'envoi")
+    date_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin de l'envoi")
+
+    class Meta:
+        verbose_name = "Diffusion de notification"
+        verbose_name_plural = "Diffusions de notifications"
+        ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['statut', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.titre} ({self.get_cible_display()})"
+
+    @property
+    def progression(self):
+        """Pourcentage de destinataires traités"""
+        if self.statut == StatutDiffusion.TERMINEE:
+            return 100
+        if not self.total_destinataires:
+            return 0
+        return min(99, int(self.destinataires_traites * 100 / self.total_destinataires))
+
+    @classmethod
+    def programmer(cls, cible, titre, contenu, type, projet=None, lien_action='', action_requise=False):
+        """Enregistre une diffusion : une seule insertion dans la requête en cours"""
+        return cls.objects.create(
+            cible=cible,
+            projet=projet,
+            titre=titre,
+            contenu=contenu,
+            type=type,
+            lien_action=lien_action,
+            action_requise=action_requise
+        )
+
+    def destinataires(self, apres=0):
+        """Identifiants des destinataires d'id > apres, dans l'ordre croissant"""
+        if self.cible == CibleDiffusion.ADMINISTRATEURS:
+            return get_administrateurs().filter(id__gt=apres).order_by('id').values_list('id', flat=True)
+
+        # Un seul investissement par couple (investisseur, projet) : pas de doublon
+        return Investissement.objects.filter(
+            projet_id=self.projet_id,
+            statut=StatutInvestissement.CONFIRME,
+            investisseur_id__gt=apres
+        ).order_by('investisseur_id').values_list('investisseur_id', flat=True)
+
+    @classmethod
+    def traiter_lot(cls, taille=1000):
+        """
+        Envoie le lot suivant de la plus ancienne diffusion non terminée
+        Les diffusions verrouillées par un autre worker sont sautées
+        Retourne la diffusion avancée, ou None s'il n'y a rien à envoyer
+        """
+        with transaction.atomic():
+            diffusion = cls.objects.filter(
+                statut__in=[StatutDiffusion.EN_ATTENTE, StatutDiffusion.EN_COURS]
+            ).order_by('pk').select_for_update(skip_locked=True).first()
+            if diffusion is None:
+                return None
+
+            if diffusion.statut == StatutDiffusion.EN_ATTENTE:
+                diffusion.statut = StatutDiffusion.EN_COURS
+                diffusion.date_debut = timezone.now()
+                diffusion.total_destinataires = diffusion.destinataires().count()
+
+            ids = list(diffusion.destinataires(apres=diffusion.dernier_destinataire)[:taille])
+            Notification.creer_ou_regrouper(
+                ids,
+                diffusion.type,
+                projet_id=diffusion.projet_id,
+                titre=diffusion.titre,
+                contenu=diffusion.contenu,
+                action_requise=diffusion.action_requise,
+                lien_action=diffusion.lien_action
+            )
+
+            if ids:
+                diffusion.dernier_destinataire = ids[-1]
+                diffusion.destinataires_traites += len(ids)
+            if len(ids) < taille:
+                diffusion.statut = StatutDiffusion.TERMINEE
+                diffusion.date_fin = timezone.now()
+            diffusion.save()
+
+        return diffusion
+
+
 class ParametreNotification(models.Model):
     """Paramètres de notification par utilisateur"""
     utilisateur = models.OneToOneField(
@@ -279,4 +744,412 @@ class ParametreNotification(models.Model):
         verbose_name_plural = "Paramètres de notification"
     
     def __str__(self):
-        return f"Paramètres notifications - {self.utilisateur.email}"
\ No newline at end of file
+        return f"Paramètres notifications - {self.utilisateur.email}"
+
+
+# =========================
+# RÉSUMÉS PAR EMAIL
+# =========================
+
+class FrequenceResume(models.TextChoices):
+    QUOTIDIEN = 'QUOTIDIEN', 'Quotidien'
+    HEBDOMADAIRE = 'HEBDOMADAIRE', 'Hebdomadaire'
+
+
+PERIODES_RESUME = {
+    FrequenceResume.QUOTIDIEN: timedelta(days=1),
+    FrequenceResume.HEBDOMADAIRE: timedelta(days=7),
+}
+
+
+class EnvoiResume(models.Model):
+    """
+    Une exécution de la commande envoyer_resumes pour une fréquence
+    Le résumé reprend les notifications non lues créées dans la fenêtre
+    (debut, fin], fixée au démarrage : chaque notification figure dans un seul
+    résumé par fréquence. dernier_utilisateur est le point de reprise, enregistré
+    après chaque lot d'emails : une exécution interrompue est reprise par la suivante
+    """
+    frequence = models.CharField(max_length=15, choices=FrequenceResume.choices, verbose_name="Fréquence")
+    debut = models.DateTimeField(verbose_name="Notifications créées après")
+    fin = models.DateTimeField(verbose_name="Notifications créées jusqu'à")
+
+    dernier_utilisateur = models.BigIntegerField(default=0, verbose_name="Dernier utilisateur traité")
+    utilisateurs_traites = models.IntegerField(default=0, verbose_name="Résumés générés")
+    emails_envoyes = models.IntegerField(default=0, verbose_name="Emails envoyés")
+    termine = models.BooleanField(default=False, verbose_name="Terminé")
+
+    date_debut = models.DateTimeField(default=timezone.now, verbose_name="Début de l'envoi")
+    date_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin de l'envoi")
+
+    class Meta:
+        verbose_name = "Envoi de résumés"
+        verbose_name_plural = "Envois de résumés"
+        ordering = ['-fin']
+        indexes = [
+            models.Index(fields=['frequence', 'termine', 'fin']),
+        ]
+
+    def __str__(self):
+        return f"Résumé {self.get_frequence_display().lower()} jusqu'au {self.fin:%d/%m/%Y %H:%M}"
+
+    @classmethod
+    def demarrer(cls, frequence):
+        """Reprend l'exécution interrompue de cette fréquence, ou en ouvre une nouvelle"""
+        en_cours = cls.objects.filter(frequence=frequence, termine=False).order_by('pk').first()
+        if en_cours:
+            return en_cours
+
+        fin = timezone.now()
+        precedent = cls.objects.filter(frequence=frequence, termine=True).order_by('-fin').first()
+        return cls.objects.create(
+            frequence=frequence,
+            debut=precedent.fin if precedent else fin - PERIODES_RESUME[frequence],
+            fin=fin
+        )
+
+    def notifications(self):
+        """Notifications non lues de la fenêtre, pour les utilisateurs abonnés à cette fréquence"""
+        if self.frequence == FrequenceResume.QUOTIDIEN:
+            abonnes = models.Q(utilisateur__parametres_notification__resume_quotidien=True)
+        else:
+            # Sans paramètres enregistrés : valeur par défaut (résumé hebdomadaire)
+            abonnes = (
+                models.Q(utilisateur__parametres_notification__isnull=True)
+                | models.Q(utilisateur__parametres_notification__resume_hebdomadaire=True)
+            )
+        return Notification.objects.filter(
+            abonnes,
+            compteurs.NON_LUES,
+            date_creation__gt=self.debut,
+            date_creation__lte=self.fin,
+            utilisateur__is_active=True
+        ).exclude(utilisateur__email='')
+
+    def _parcourir(self, taille_page):
+        """
+        Une passe ordonnée (utilisateur_id, id), par pages `(utilisateur, id) > dernier`
+        La mémoire ne dépend que de la taille des pages
+        """
+        champs = ('utilisateur_id', 'id', 'utilisateur__email', 'utilisateur__prenom', 'titre', 'type', 'date_creation')
+        dernier_utilisateur, dernier_id = self.dernier_utilisateur, None
+        while True:
+            if dernier_id is None:
+                apres = models.Q(utilisateur_id__gt=dernier_utilisateur)
+            else:
+                apres = models.Q(utilisateur_id__gt=dernier_utilisateur) | models.Q(
+                    utilisateur_id=dernier_utilisateur, id__gt=dernier_id
+                )
+            page = list(
+                self.notifications().filter(apres).order_by('utilisateur_id', 'id').values_list(*champs)[:taille_page]
+            )
+            yield from page
+            if len(page) < taille_page:
+                return
+            dernier_utilisateur, dernier_id = page[-1][0], page[-1][1]
+
+    def resumes(self, taille_page=5000, max_elements=20):
+        """
+        Un résumé par utilisateur : (utilisateur_id, email, prénom, notifications, total)
+        Au plus max_elements notifications sont gardées par résumé
+        """
+        for utilisateur_id, lignes in groupby(self._parcourir(taille_page), key=lambda ligne: ligne[0]):
+            elements, total, email, prenom = [], 0, '', ''
+            for _, _, email, prenom, titre, type_notif, date_creation in lignes:
+                total += 1
+                if len(elements) < max_elements:
+                    elements.append({
+                        'titre': titre,
+                        'type': type_notif,
+                        'date': timezone.localtime(date_creation).strftime('%d/%m/%Y %H:%M'),
+                    })
+            yield utilisateur_id, email, prenom, elements, total
+
+    def composer(self, email, prenom, elements, total):
+        """Email du résumé d'un utilisateur"""
+        contexte = {
+            'prenom': prenom,
+            'frequence': self.get_frequence_display().lower(),
+            'notifications': elements,
+            'total': total,
+            'autres': total - len(elements),
+            'debut': timezone.localtime(self.debut).strftime('%d/%m/%Y à %H:%M'),
+        }
+        return EmailMessage(
+            subject=f"crowdBuilding - Votre résumé {contexte['frequence']} ({total} notification(s))",
+            body=render_to_string('notifications/email/resume.txt', contexte),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email]
+        )
+
+    def envoyer(self, connexion, taille_lot=200, taille_page=5000, max_elements=20, progression=None):
+        """
+        Envoie les résumés par lots de taille_lot emails sur une même connexion
+        Le point de reprise avance après chaque lot envoyé : en cas d'interruption,
+        au plus le dernier lot est renvoyé
+        """
+        lot = []
+        for utilisateur_id, email, prenom, elements, total in self.resumes(taille_page, max_elements):
+            lot.append((utilisateur_id, self.composer(email, prenom, elements, total)))
+            if len(lot) >= taille_lot:
+                self._envoyer_lot(connexion, lot, progression)
+                lot = []
+        if lot:
+            self._envoyer_lot(connexion, lot, progression)
+
+        self.termine = True
+        self.date_fin = timezone.now()
+        self.save(update_fields=['termine', 'date_fin'])
+
+    def _envoyer_lot(self, connexion, lot, progression):
+        # Boîte d'envoi et point de reprise dans la même transaction : chaque résumé est écrit une seule fois
+        with transaction.atomic():
+            envoyes = connexion.send_messages([message for _, message in lot]) or 0
+            self.dernier_utilisateur = lot[-1][0]
+            self.utilisateurs_traites += len(lot)
+            self.emails_envoyes += envoyes
+            self.save(update_fields=['dernier_utilisateur', 'utilisateurs_traites', 'emails_envoyes'])
+        if progression:
+            progression(self)
+
+
+class StatutEmail(models.TextChoices):
+    """États d'un email de la boîte d'envoi"""
+    EN_ATTENTE = 'EN_ATTENTE', 'En attente'
+    EN_COURS = 'EN_COURS', "En cours d'envoi"
+    ENVOYE = 'ENVOYE', 'Envoyé'
+    ECHEC = 'ECHEC', 'Échec définitif'
+
+
+class MimeStocke:
+    """Message MIME déjà sérialisé, présenté aux backends Django comme un message construit"""
+
+    def __init__(self, donnees):
+        self.donnees = donnees
+
+    def as_bytes(self, linesep='\n'):
+        return self.donnees.replace(b'\n', linesep.encode())
+
+    def get_charset(self):
+        return None
+
+
+class MessageStocke(EmailMessage):
+    """Email de la boîte d'envoi, rejoué tel quel par le backend d'envoi"""
+
+    def __init__(self, email):
+        super().__init__(subject=email.sujet, from_email=email.expediteur)
+        self.mime = MimeStocke(bytes(email.message))
+        self.enveloppe = email.destinataires
+
+    def message(self):
+        return self.mime
+
+    def recipients(self):
+        return self.enveloppe
+
+
+class EmailSortant(models.Model):
+    """
+    Boîte d'envoi transactionnelle : les emails sont écrits dans la transaction
+    de l'événement métier (backend BoiteEnvoiBackend), puis envoyés par le
+    worker `manage.py envoyer_emails`
+    """
+    sujet = models.CharField(max_length=255, verbose_name="Sujet")
+    expediteur = models.CharField(max_length=255, verbose_name="Expéditeur")
+    destinataires = models.JSONField(verbose_name="Destinataires (enveloppe)")
+    # Domaine du premier destinataire : limites d'envoi par domaine
+    domaine = models.CharField(max_length=255, verbose_name="Domaine")
+    message = models.BinaryField(verbose_name="Message MIME")
+
+    statut = models.CharField(
+        max_length=20,
+        choices=StatutEmail.choices,
+        default=StatutEmail.EN_ATTENTE,
+        verbose_name="Statut"
+    )
+    tentatives = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    prochaine_tentative = models.DateTimeField(default=timezone.now, verbose_name="Prochaine tentative")
+    # Bail du worker qui a réservé l'email : repris par un autre worker après expiration
+    verrou_jusqua = models.DateTimeField(null=True, blank=True, verbose_name="Réservé jusqu'au")
+    derniere_erreur = models.TextField(blank=True, verbose_name="Dernière erreur")
+
+    date_creation = models.DateTimeField(default=timezone.now, verbose_name="Date de création")
+    date_envoi = models.DateTimeField(null=True, blank=True, verbose_name="Date d'envoi")
+    duree_envoi = models.PositiveIntegerField(null=True, blank=True, verbose_name="Durée SMTP (ms)")
+
+    class Meta:
+        verbose_name = "Email sortant"
+        verbose_name_plural = "Emails sortants"
+        ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['statut', 'prochaine_tentative']),
+            models.Index(fields=['date_envoi']),
+        ]
+
+    def __str__(self):
+        return f"{', '.join(self.destinataires)} - {self.sujet}"
+
+    @classmethod
+    def depuis_message(cls, message):
+        """Ligne de la boîte d'envoi pour un EmailMessage Django"""
+        encodage = message.encoding or settings.DEFAULT_CHARSET
+        destinataires = [sanitize_address(adresse, encodage) for adresse in message.recipients()]
+        return cls(
+            sujet=str(message.subject)[:255],
+            expediteur=sanitize_address(message.from_email, encodage),
+            destinataires=destinataires,
+            domaine=destinataires[0].rpartition('@')[2].rstrip('>').lower(),
+            message=message.message().as_bytes(),
+        )
+
+    # ========== WORKER ==========
+
+    @classmethod
+    def reserver(cls, taille=50):
+        """
+        Réserve le lot suivant d'emails à envoyer (bail de EMAILS_BAIL secondes)
+        Les lignes verrouillées par un autre worker sont sautées ; un bail expiré
+        (worker arrêté en cours de lot) rend l'email à nouveau disponible
+        """
+        maintenant = timezone.now()
+        with transaction.atomic():
+            ids = list(cls.objects.filter(
+                models.Q(statut=StatutEmail.EN_ATTENTE, prochaine_tentative__lte=maintenant)
+                | models.Q(statut=StatutEmail.EN_COURS, verrou_jusqua__lt=maintenant)
+            ).order_by('prochaine_tentative', 'id').select_for_update(skip_locked=True).values_list('id', flat=True)[:taille])
+            cls.objects.filter(id__in=ids).update(
+                statut=StatutEmail.EN_COURS,
+                verrou_jusqua=maintenant + timedelta(seconds=settings.EMAILS_BAIL)
+            )
+        return list(cls.objects.filter(id__in=ids).order_by('domaine', 'id'))
+
+    @classmethod
+    def envoyer_lot(cls, taille=50, connexion=None):
+        """
+        Envoie un lot sur une seule session SMTP
+        Retourne {'envoyes', 'reportes', 'echecs'}, ou None si la file est vide
+        """
+        emails = cls.reserver(taille)
+        if not emails:
+            return None
+
+        resultats = {'envoyes': 0, 'reportes': 0, 'echecs': 0}
+        connexion = connexion or get_connection(settings.EMAILS_BACKEND_ENVOI)
+        restants = list(emails)
+        try:
+            connexion.open()
+            while restants:
+                email = restants.pop(0)
+                if not quota_domaine(email.domaine):
+                    email.reporter()
+                    resultats['reportes'] += 1
+                    continue
+
+                debut = time.monotonic()
+                try:
+                    connexion.send_messages([MessageStocke(email)])
+                except Exception as erreur:
+                    email.echouer(erreur)
+                    resultats['echecs'] += 1
+                    # Session SMTP peut-être perdue : une nouvelle pour la suite du lot
+                    connexion.close()
+                    connexion.open()
+                else:
+                    email.marquer_envoye(int((time.monotonic() - debut) * 1000))
+                    resultats['envoyes'] += 1
+        except Exception as erreur:
+            # Serveur injoignable : le reste du lot repart en backoff
+            for email in restants:
+                email.echouer(erreur)
+            resultats['echecs'] += len(restants)
+        finally:
+            connexion.close()
+        return resultats
+
+    def marquer_envoye(self, duree):
+        self.statut = StatutEmail.ENVOYE
+        self.date_envoi = timezone.now()
+        self.duree_envoi = duree
+        self.verrou_jusqua = None
+        self.tentatives += 1
+        self.save(update_fields=['statut', 'date_envoi', 'duree_envoi', 'verrou_jusqua', 'tentatives'])
+
+    def reporter(self):
+        """Quota du domaine atteint : réessayé à la minute suivante, sans compter de tentative"""
+        maintenant = timezone.now()
+        self.statut = StatutEmail.EN_ATTENTE
+        self.prochaine_tentative = maintenant.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        self.verrou_jusqua = None
+        self.save(update_fields=['statut', 'prochaine_tentative', 'verrou_jusqua'])
+
+    def echouer(self, erreur):
+        """Erreur d'envoi : réessai avec backoff exponentiel, ou échec définitif"""
+        self.tentatives += 1
+        self.derniere_erreur = f"{type(erreur).__name__}: {erreur}"[:2000]
+        self.verrou_jusqua = None
+        if erreur_definitive(erreur) or self.tentatives >= settings.EMAILS_TENTATIVES_MAX:
+            self.statut = StatutEmail.ECHEC
+        else:
+            self.statut = StatutEmail.EN_ATTENTE
+            delai = min(settings.EMAILS_BACKOFF_BASE * 2 ** (self.tentatives - 1), settings.EMAILS_BACKOFF_MAX)
+            self.prochaine_tentative = timezone.now() + timedelta(seconds=delai)
+        self.save(update_fields=['tentatives', 'derniere_erreur', 'verrou_jusqua', 'statut', 'prochaine_tentative'])
+
+    # ========== MÉTRIQUES ==========
+
+    @classmethod
+    def metriques(cls, fenetre=timedelta(hours=1), echantillon=1000):
+        """
+        Profondeur de la file et latences d'envoi sur la fenêtre :
+        attente (création -> envoi) et durée de la transaction SMTP, p50 / p95
+        """
+        maintenant = timezone.now()
+        file = cls.objects.filter(statut__in=[StatutEmail.EN_ATTENTE, StatutEmail.EN_COURS])
+        plus_ancien = file.aggregate(date=models.Min('date_creation'))['date']
+        envoyes = list(cls.objects.filter(
+            statut=StatutEmail.ENVOYE, date_envoi__gte=maintenant - fenetre
+        ).order_by('-date_envoi').values_list('date_creation', 'date_envoi', 'duree_envoi')[:echantillon])
+
+        attentes = sorted((date_envoi - date_creation).total_seconds() for date_creation, date_envoi, _ in envoyes)
+        durees = sorted(duree for _, _, duree in envoyes if duree is not None)
+        return {
+            'profondeur': file.count(),
+            'a_envoyer': file.filter(prochaine_tentative__lte=maintenant).count(),
+            'age_plus_ancien': (maintenant - plus_ancien).total_seconds() if plus_ancien else 0,
+            'envoyes': len(envoyes),
+            'echecs': cls.objects.filter(statut=StatutEmail.ECHEC, date_creation__gte=maintenant - fenetre).count(),
+            'attente_p50': centile(attentes, 50),
+            'attente_p95': centile(attentes, 95),
+            'smtp_p50_ms': centile(durees, 50),
+            'smtp_p95_ms': centile(durees, 95),
+        }
+
+
+def centile(valeurs_triees, rang):
+    if not valeurs_triees:
+        return None
+    return valeurs_triees[min(len(valeurs_triees) - 1, len(valeurs_triees) * rang // 100)]
+
+
+def quota_domaine(domaine):
+    """
+    Limite d'envoi par domaine et par minute (EMAILS_LIMITES_DOMAINES, sinon
+    EMAILS_LIMITE_PAR_DOMAINE), partagée entre les workers via le cache
+    """
+    limite = settings.EMAILS_LIMITES_DOMAINES.get(domaine, settings.EMAILS_LIMITE_PAR_DOMAINE)
+    cle = f'emails_domaine:{domaine}:{int(time.time()) // 60}'
+    cache.add(cle, 0, 120)
+    try:
+        return cache.incr(cle) <= limite
+    except ValueError:
+        return True
+
+
+def erreur_definitive(erreur):
+    """Refus permanent du serveur (codes 5xx) : inutile de réessayer"""
+    if isinstance(erreur, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in erreur.recipients.values())
+    if isinstance(erreur, smtplib.SMTPResponseException):
+        return 500 <= erreur.smtp_code < 600
+    return False
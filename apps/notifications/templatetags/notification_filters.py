@@ -1,32 +1,20 @@
 from django import template
+from django.db.models import QuerySet
 
-register = template.Library()
-
-@register.filter
-def filter_by_type(notifications, types_str):
-    """
-    Filtre les notifications par type
-    Usage dans le template : {{ notifications|filter_by_type:"TYPE1,TYPE2" }}
-    """
-    if not notifications:
-        return []
-    
-    types = [t.strip() for t in types_str.split(',')]
-    return [n for n in notifications if n.type in types]
+from .notifications_tags import filter_by_type, get_notifications_by_user, get_unread_count_by_type
 
-@register.filter
-def get_notifications_by_user(notifications, user):
-    """Filtre les notifications par utilisateur"""
-    return [n for n in notifications if n.utilisateur == user]
+register = template.Library()
 
-@register.filter
-def get_unread_count_by_type(notifications, notification_type):
-    """Compte les notifications non lues d'un type spécifique"""
-    return len([n for n in notifications if n.type == notification_type and not n.lue])
+# Mêmes filtres que notifications_tags : comptes en base, jamais de notifications chargées
+register.filter('filter_by_type', filter_by_type)
+register.filter('get_notifications_by_user', get_notifications_by_user)
+register.filter('get_unread_count_by_type', get_unread_count_by_type)
 
 @register.filter
 def sort_by_date(notifications, order='desc'):
-    """Trie les notifications par date"""
+    """Trie les notifications par date (en base pour un queryset)"""
+    if isinstance(notifications, QuerySet):
+        return notifications.order_by('date_creation' if order == 'asc' else '-date_creation')
     if order == 'asc':
         return sorted(notifications, key=lambda x: x.date_creation)
     else:
@@ -4,6 +4,10 @@ Plateforme crowdBuilding - Burkina Faso
 """
 from django import template
 from django.contrib.auth.models import AnonymousUser
+from django.db.models import QuerySet
+
+from apps.notifications import compteurs
+from apps.notifications.models import Notification
 
 register = template.Library()
 
@@ -12,12 +16,13 @@ register = template.Library()
 def unread_notifications_count(user):
     """
     Retourne le nombre de notifications non lues pour un utilisateur
+    Lu dans le cache partagé (apps.notifications.compteurs)
     """
     if isinstance(user, AnonymousUser):
         return 0
     
     try:
-        return user.notifications.filter(lue=False).count()
+        return compteurs.lire(user.pk)
     except:
         return 0
 
@@ -31,24 +36,45 @@ def recent_notifications(user, limit=5):
         return []
     
     try:
-        return user.notifications.all()[:limit]
+        # Filigrane de lecture appliqué pour l'affichage (lues / non lues)
+        return Notification.appliquer_filigrane(list(user.notifications.all()[:limit]), user)
     except:
         return []
 
 
-# AJOUTEZ CES NOUVELLES FONCTIONS :
+@register.filter
+def notifications_par_type(user):
+    """
+    Répartition des notifications d'un utilisateur par type (une requête groupée, en cache)
+    Usage dans template: {% with par_type=user|notifications_par_type %}
+    """
+    if isinstance(user, AnonymousUser):
+        return {}
+
+    try:
+        return compteurs.par_type(user.pk)
+    except:
+        return {}
+
+
+def _types(types_str):
+    return [t.strip() for t in str(types_str).split(',')]
+
 
 @register.filter
 def filter_by_type(notifications, types_str):
     """
     Filtre les notifications par type
     Usage dans template: {{ notifications|filter_by_type:"TYPE1,TYPE2" }}
+    Un queryset est filtré en base ; une liste (page déjà chargée) en Python
     """
     if not notifications:
         return []
     
     try:
-        types = [t.strip() for t in types_str.split(',')]
+        if isinstance(notifications, QuerySet):
+            return notifications.filter(type__in=_types(types_str))
+        types = _types(types_str)
         return [n for n in notifications if hasattr(n, 'type') and n.type in types]
     except (AttributeError, ValueError):
         return []
@@ -56,11 +82,27 @@ def filter_by_type(notifications, types_str):
 
 @register.filter
 def get_notifications_by_user(notifications, user):
-    """Filtre les notifications par utilisateur"""
-    return [n for n in notifications if n.utilisateur == user]
+    """Filtre les notifications par utilisateur (en base pour un queryset)"""
+    if isinstance(notifications, QuerySet):
+        return notifications.filter(utilisateur=user)
+    return [n for n in notifications if n.utilisateur_id == user.pk]
+
+
+@register.filter
+def get_unread_count_by_type(par_type, types_str):
+    """
+    Compte les notifications non lues des types donnés
+    Usage dans template: {{ par_type|get_unread_count_by_type:"TYPE1,TYPE2" }}
+    (par_type : user|notifications_par_type, ou `par_type` du contexte de la boîte de réception)
+    """
+    if not isinstance(par_type, dict):
+        par_type = notifications_par_type(par_type)
+    return sum(par_type.get(t, {}).get('non_lues', 0) for t in _types(types_str))
 
 
 @register.filter
-def get_unread_count_by_type(notifications, notification_type):
-    """Compte les notifications non lues d'un type spécifique"""
-    return len([n for n in notifications if n.type == notification_type and not n.lue])
\ No newline at end of file
+def get_count_by_type(par_type, types_str):
+    """Compte les notifications des types donnés, lues ou non"""
+    if not isinstance(par_type, dict):
+        par_type = notifications_par_type(par_type)
+    return sum(par_type.get(t, {}).get('total', 0) for t in _types(types_str))
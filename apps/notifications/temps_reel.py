@@ -0,0 +1,353 @@
+"""
+Livraison en direct des notifications (Server-Sent Events sur l'application ASGI)
+Plateforme crowdBuilding - Burkina Faso
+
+- le code synchrone (modèles, commandes) publie après le commit :
+  `publier_notifications`, `ajuster`, `resynchroniser` ;
+- le bus en mémoire remet chaque événement aux connexions ouvertes de
+  l'utilisateur dans ce processus ;
+- avec NOTIFICATIONS_FLUX_RELAIS (hote:port), les événements passent par le
+  relais (`manage.py relais_notifications`), qui les rediffuse à tous les
+  processus : plusieurs workers ASGI, commandes diffuser_notifications... ;
+- `FluxNotifications` est l'application ASGI de /notifications/flux/
+  (crowdBuilding/asgi.py) : une coroutine par connexion, sans thread ni
+  connexion à la base pendant l'attente.
+
+Événements envoyés au navigateur :
+- `compteur`       {"non_lues": n} à l'ouverture, puis {"delta": d} ;
+- `notification`   une notification créée (non_lue : le compteur augmente de 1),
+                   ou regroupée avec une notification déjà comptée (regroupee) ;
+- `resynchroniser` compteur inconnu après une opération groupée : le client se reconnecte.
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+
+from apps.notifications import compteurs
+
+logger = logging.getLogger(__name__)
+
+# Événements en attente par connexion ; au-delà, le client est resynchronisé
+TAILLE_FILE = 100
+
+# Notifications renvoyées au plus à la reconnexion (Last-Event-ID)
+REJEU_MAX = 50
+
+# Première ligne envoyée au relais par un processus qui veut recevoir les événements
+MARQUEUR_ECOUTE = b'ECOUTE\n'
+
+# Tampon d'écriture maximal d'un processus à l'écoute du relais (octets)
+TAMPON_RELAIS_MAX = 4 * 1024 * 1024
+
+
+# ========== PUBLICATION (code synchrone) ==========
+
+def publier(messages):
+    """Publie les messages (utilisateur_id, evenement, donnees) au commit de la transaction courante"""
+    messages = list(messages)
+    if messages:
+        transaction.on_commit(lambda: bus().publier(messages))
+
+
+def publier_notifications(notifications):
+    """Nouvelles notifications, poussées à leurs destinataires"""
+    publier((notification.utilisateur_id, 'notification', _donnees(notification)) for notification in notifications)
+
+
+def ajuster(utilisateur_id, delta):
+    """Variation du nombre de notifications non lues"""
+    if delta:
+        publier([(utilisateur_id, 'compteur', {'delta': delta})])
+
+
+def resynchroniser(utilisateur_ids):
+    """Compteurs inconnus après une opération groupée"""
+    publier((utilisateur_id, 'resynchroniser', {}) for utilisateur_id in set(utilisateur_ids))
+
+
+def _donnees(notification, rejeu=False):
+    return {
+        'id': notification.pk,
+        'titre': notification.titre,
+        'contenu': notification.contenu,
+        'type': notification.type,
+        'lien_action': notification.lien_action,
+        'date_creation': notification.date_creation,
+        'non_lue': not notification.lue,
+        'occurrences': notification.occurrences,
+        'regroupee': notification.occurrences > 1 and not rejeu,
+        'rejeu': rejeu,
+    }
+
+
+# ========== BUS ==========
+
+class Abonnement:
+    """Une connexion ouverte : sa file d'événements, dans la boucle asyncio du worker"""
+
+    def __init__(self, utilisateur_id, boucle):
+        self.utilisateur_id = utilisateur_id
+        self.boucle = boucle
+        self.file = asyncio.Queue(TAILLE_FILE)
+
+    def deposer(self, evenement):
+        """Appelé dans la boucle de l'abonnement"""
+        if self.file.full():
+            # Client trop lent : ses événements sont remplacés par une resynchronisation
+            while not self.file.empty():
+                self.file.get_nowait()
+            evenement = evenement and ('resynchroniser', {})
+        self.file.put_nowait(evenement)
+
+    def fermer(self):
+        self.deposer(None)
+
+
+class BusLocal:
+    """Connexions ouvertes dans ce processus, par utilisateur"""
+
+    def __init__(self):
+        self.abonnements = {}
+        self.verrou = threading.Lock()
+
+    def abonner(self, utilisateur_id):
+        abonnement = Abonnement(utilisateur_id, asyncio.get_running_loop())
+        with self.verrou:
+            self.abonnements.setdefault(utilisateur_id, set()).add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self.verrou:
+            abonnements = self.abonnements.get(abonnement.utilisateur_id, set())
+            abonnements.discard(abonnement)
+            if not abonnements:
+                self.abonnements.pop(abonnement.utilisateur_id, None)
+
+    def connexions(self):
+        with self.verrou:
+            return sum(len(abonnements) for abonnements in self.abonnements.values())
+
+    def publier(self, messages):
+        self.livrer(messages)
+
+    def livrer(self, messages):
+        """Remet les messages aux connexions de ce processus, depuis n'importe quel thread"""
+        for utilisateur_id, evenement, donnees in messages:
+            with self.verrou:
+                abonnements = list(self.abonnements.get(utilisateur_id, ()))
+            for abonnement in abonnements:
+                try:
+                    abonnement.boucle.call_soon_threadsafe(abonnement.deposer, (evenement, donnees))
+                except RuntimeError:
+                    # Boucle fermée : la connexion est en train de se terminer
+                    pass
+
+
+class BusRelais(BusLocal):
+    """
+    Bus partagé entre processus : les publications partent vers le relais,
+    qui les renvoie à chaque processus à l'écoute (y compris celui qui publie)
+    """
+
+    def __init__(self, adresse):
+        super().__init__()
+        hote, port = adresse.rsplit(':', 1)
+        self.adresse = (hote, int(port))
+        self._envoi = None
+        self._verrou_envoi = threading.Lock()
+        self._ecoute = None
+
+    def abonner(self, utilisateur_id):
+        self._demarrer_ecoute()
+        return super().abonner(utilisateur_id)
+
+    def publier(self, messages):
+        lignes = b''.join(json.dumps(message, cls=DjangoJSONEncoder).encode() + b'\n' for message in messages)
+        with self._verrou_envoi:
+            for _ in range(2):
+                try:
+                    if self._envoi is None:
+                        self._envoi = socket.create_connection(self.adresse, timeout=2)
+                    self._envoi.sendall(lignes)
+                    return
+                except OSError:
+                    # Connexion coupée (relais redémarré) : une nouvelle tentative
+                    if self._envoi is not None:
+                        self._envoi.close()
+                    self._envoi = None
+        logger.warning("Relais des notifications injoignable : %d événement(s) perdu(s)", len(messages))
+
+    def _demarrer_ecoute(self):
+        with self.verrou:
+            if self._ecoute is None:
+                self._ecoute = threading.Thread(target=self._ecouter, name='relais-notifications', daemon=True)
+                self._ecoute.start()
+
+    def _ecouter(self):
+        while True:
+            try:
+                with socket.create_connection(self.adresse) as connexion:
+                    connexion.sendall(MARQUEUR_ECOUTE)
+                    for ligne in connexion.makefile('rb'):
+                        self.livrer([json.loads(ligne)])
+            except OSError:
+                logger.warning("Relais des notifications injoignable, nouvelle tentative dans 1 s")
+            time.sleep(1)
+
+
+_bus = None
+
+
+def bus():
+    """Bus du processus : relais si NOTIFICATIONS_FLUX_RELAIS est défini, mémoire sinon"""
+    global _bus
+    if _bus is None:
+        relais = settings.NOTIFICATIONS_FLUX_RELAIS
+        _bus = BusRelais(relais) if relais else BusLocal()
+    return _bus
+
+
+async def demarrer_relais(hote, port):
+    """
+    Relais entre processus (commande relais_notifications) : chaque ligne reçue
+    d'un éditeur est recopiée vers tous les processus à l'écoute
+    """
+    ecouteurs = set()
+
+    async def client(lecteur, ecrivain):
+        ligne = await lecteur.readline()
+        if ligne == MARQUEUR_ECOUTE:
+            ecouteurs.add(ecrivain)
+            try:
+                await lecteur.read()
+            finally:
+                ecouteurs.discard(ecrivain)
+                ecrivain.close()
+            return
+
+        while ligne:
+            for ecouteur in list(ecouteurs):
+                if ecouteur.transport.get_write_buffer_size() > TAMPON_RELAIS_MAX:
+                    # Processus bloqué : déconnecté, il se reconnectera
+                    ecouteurs.discard(ecouteur)
+                    ecouteur.close()
+                else:
+                    ecouteur.write(ligne)
+            ligne = await lecteur.readline()
+        ecrivain.close()
+
+    return await asyncio.start_server(client, hote, port, limit=2 ** 20)
+
+
+# ========== APPLICATION ASGI ==========
+
+def _authentifier(cle_session):
+    """Identifiant de l'utilisateur de la session, ou None"""
+    try:
+        if not cle_session:
+            return None
+        moteur = import_module(settings.SESSION_ENGINE)
+        utilisateur = get_user(SimpleNamespace(session=moteur.SessionStore(cle_session)))
+        return utilisateur.pk if utilisateur.is_authenticated and utilisateur.is_active else None
+    finally:
+        # Pas de connexion à la base gardée pendant toute la durée du flux
+        close_old_connections()
+
+
+def _etat_initial(utilisateur_id, depuis):
+    """Compteur de non lues et notifications manquées depuis l'id `depuis`"""
+    from apps.notifications.models import Notification
+
+    try:
+        rejeu = []
+        if depuis:
+            rejeu = [
+                ('notification', _donnees(notification, rejeu=True))
+                for notification in Notification.objects.filter(
+                    utilisateur_id=utilisateur_id, id__gt=depuis
+                ).order_by('id')[:REJEU_MAX]
+            ]
+        return [('compteur', {'non_lues': compteurs.lire(utilisateur_id)})] + rejeu
+    finally:
+        close_old_connections()
+
+
+def _format(evenement, donnees):
+    texte = f"event: {evenement}\n"
+    # Une notification regroupée garde son id : il ne fait pas avancer Last-Event-ID
+    if donnees.get('id') and not donnees.get('regroupee'):
+        texte += f"id: {donnees['id']}\n"
+    return (texte + f"data: {json.dumps(donnees, cls=DjangoJSONEncoder)}\n\n").encode()
+
+
+class FluxNotifications:
+    """Application ASGI : flux SSE de l'utilisateur connecté (session Django)"""
+
+    async def __call__(self, scope, receive, send):
+        entetes = dict(scope['headers'])
+        cookies = SimpleCookie(entetes.get(b'cookie', b'').decode('latin-1'))
+        cle_session = cookies[settings.SESSION_COOKIE_NAME].value if settings.SESSION_COOKIE_NAME in cookies else None
+
+        utilisateur_id = await sync_to_async(_authentifier, thread_sensitive=False)(cle_session)
+        if utilisateur_id is None:
+            await send({'type': 'http.response.start', 'status': 403, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        # Last-Event-ID à la reconnexion automatique, ?depuis= après une resynchronisation
+        depuis = entetes.get(b'last-event-id', b'').decode() or \
+            parse_qs(scope.get('query_string', b'').decode()).get('depuis', [''])[0]
+        depuis = int(depuis) if depuis.isdigit() else None
+
+        abonnement = bus().abonner(utilisateur_id)
+        surveillance = asyncio.ensure_future(self._surveiller(receive, abonnement))
+        try:
+            evenements = await sync_to_async(_etat_initial, thread_sensitive=False)(utilisateur_id, depuis)
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await self._envoyer(send, b'retry: 5000\n\n' + b''.join(_format(*e) for e in evenements))
+
+            while True:
+                try:
+                    evenement = await asyncio.wait_for(abonnement.file.get(), settings.NOTIFICATIONS_FLUX_PING)
+                except asyncio.TimeoutError:
+                    # Commentaire de maintien : garde la connexion ouverte à travers les proxys
+                    await self._envoyer(send, b': ping\n\n')
+                    continue
+                if evenement is None:
+                    break
+                await self._envoyer(send, _format(*evenement))
+        finally:
+            bus().desabonner(abonnement)
+            surveillance.cancel()
+
+    @staticmethod
+    async def _envoyer(send, corps):
+        await send({'type': 'http.response.body', 'body': corps, 'more_body': True})
+
+    @staticmethod
+    async def _surveiller(receive, abonnement):
+        """Ferme le flux à la déconnexion du client"""
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        abonnement.fermer()
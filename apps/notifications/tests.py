@@ -0,0 +1,475 @@
+import asyncio
+import json
+import queue
+import socket
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from aiosmtpd.controller import Controller
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import Utilisateur
+from apps.notifications import compteurs, temps_reel
+from apps.notifications.models import (
+    EmailSortant, EnvoiResume, FrequenceResume, Notification, NotificationArchivee, StatutEmail,
+    TypeNotification,
+)
+from apps.notifications.templatetags.notifications_tags import get_unread_count_by_type
+
+
+class ConnexionTest:
+    """Client SSE minimal : pilote FluxNotifications comme un serveur ASGI"""
+
+    def __init__(self, cookie):
+        self.cookie = cookie
+        self.deconnexion = asyncio.Event()
+        self.corps = b''
+        self.recu = asyncio.Event()
+
+    async def receive(self):
+        await self.deconnexion.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.statut = message['status']
+        else:
+            self.corps += message.get('body', b'')
+            self.recu.set()
+
+    def ouvrir(self, flux, query_string=b''):
+        scope = {
+            'type': 'http', 'path': '/notifications/flux/', 'query_string': query_string,
+            'headers': [(b'cookie', f'{settings.SESSION_COOKIE_NAME}={self.cookie}'.encode())],
+        }
+        return asyncio.ensure_future(flux(scope, self.receive, self.send))
+
+    def evenements(self, nom):
+        blocs = self.corps.decode().split('\n\n')
+        return [
+            json.loads(bloc.split('data: ', 1)[1])
+            for bloc in blocs if bloc.startswith(f'event: {nom}\n')
+        ]
+
+
+@override_settings(NOTIFICATIONS_FLUX_RELAIS='')
+class FluxNotificationsTests(TransactionTestCase):
+    CONNEXIONS = 2000
+
+    def setUp(self):
+        temps_reel._bus = None
+        self.utilisateur = Utilisateur.objects.create_user('investisseur@crowdbuilding.bf', 'x', nom='I', prenom='I')
+        self.client.force_login(self.utilisateur)
+        self.cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def test_milliers_de_connexions_inactives(self):
+        async def scenario():
+            flux = temps_reel.FluxNotifications()
+            connexions = [ConnexionTest(self.cookie) for _ in range(self.CONNEXIONS)]
+            taches = [connexion.ouvrir(flux) for connexion in connexions]
+
+            # Toutes les connexions restent ouvertes dans la même boucle
+            while temps_reel.bus().connexions() < self.CONNEXIONS:
+                await asyncio.sleep(0.05)
+            for connexion in connexions:
+                await connexion.recu.wait()
+                connexion.recu.clear()
+
+            # Une notification créée hors de la boucle (vue synchrone) arrive sur chaque connexion
+            await asyncio.get_running_loop().run_in_executor(None, lambda: Notification.objects.create(
+                utilisateur=self.utilisateur, titre='Paiement reçu', contenu='Merci', type='RAPPEL'
+            ))
+            for connexion in connexions:
+                await asyncio.wait_for(connexion.recu.wait(), 10)
+
+            for connexion in connexions:
+                connexion.deconnexion.set()
+            await asyncio.gather(*taches)
+            return connexions
+
+        connexions = asyncio.run(scenario())
+
+        for connexion in connexions:
+            self.assertEqual(connexion.statut, 200)
+            self.assertEqual(connexion.evenements('compteur'), [{'non_lues': 0}])
+            self.assertEqual([e['titre'] for e in connexion.evenements('notification')], ['Paiement reçu'])
+        self.assertEqual(temps_reel.bus().connexions(), 0)
+
+    def test_session_anonyme_refusee(self):
+        async def scenario():
+            connexion = ConnexionTest('inconnue')
+            await connexion.ouvrir(temps_reel.FluxNotifications())
+            return connexion
+
+        self.assertEqual(asyncio.run(scenario()).statut, 403)
+
+    def test_rejeu_depuis_le_dernier_identifiant(self):
+        premiere = Notification.objects.create(utilisateur=self.utilisateur, titre='A', contenu='a', type='RAPPEL')
+        Notification.objects.create(utilisateur=self.utilisateur, titre='B', contenu='b', type='RAPPEL')
+
+        async def scenario():
+            connexion = ConnexionTest(self.cookie)
+            tache = connexion.ouvrir(temps_reel.FluxNotifications(), f'depuis={premiere.pk}'.encode())
+            await connexion.recu.wait()
+            connexion.deconnexion.set()
+            await tache
+            return connexion
+
+        connexion = asyncio.run(scenario())
+
+        self.assertEqual(connexion.evenements('compteur'), [{'non_lues': 2}])
+        self.assertEqual([(e['titre'], e['rejeu']) for e in connexion.evenements('notification')], [('B', True)])
+
+    def test_relais_entre_processus(self):
+        # Relais dans son propre thread et sa propre boucle, comme la commande relais_notifications
+        port = queue.Queue()
+
+        async def relais():
+            serveur = await temps_reel.demarrer_relais('127.0.0.1', 0)
+            port.put(serveur.sockets[0].getsockname()[1])
+            await serveur.serve_forever()
+
+        threading.Thread(target=asyncio.run, args=(relais(),), daemon=True).start()
+        adresse = f'127.0.0.1:{port.get(timeout=5)}'
+
+        async def scenario():
+            connexion = ConnexionTest(self.cookie)
+            tache = connexion.ouvrir(temps_reel.FluxNotifications())
+            await connexion.recu.wait()
+            connexion.recu.clear()
+            # Laisse au processus le temps de s'enregistrer auprès du relais
+            await asyncio.sleep(0.2)
+
+            # Publication par un autre processus (un second bus relié au même relais)
+            await asyncio.get_running_loop().run_in_executor(
+                None, temps_reel.BusRelais(adresse).publier, [(self.utilisateur.pk, 'compteur', {'delta': 3})]
+            )
+            await asyncio.wait_for(connexion.recu.wait(), 5)
+
+            connexion.deconnexion.set()
+            await tache
+            return connexion
+
+        with self.settings(NOTIFICATIONS_FLUX_RELAIS=adresse):
+            temps_reel._bus = None
+            connexion = asyncio.run(scenario())
+        self.assertEqual(connexion.evenements('compteur'), [{'non_lues': 0}, {'delta': 3}])
+
+
+class BoiteReceptionTests(TestCase):
+
+    def setUp(self):
+        self.utilisateur = Utilisateur.objects.create_user('boite@crowdbuilding.bf', 'x', nom='B', prenom='B')
+        self.client.force_login(self.utilisateur)
+
+    def test_curseur_parcourt_tout_sans_doublon(self):
+        Notification.objects.bulk_create([
+            Notification(utilisateur=self.utilisateur, titre=str(i), contenu='c', type='RAPPEL', lue=i % 2 == 0)
+            for i in range(45)
+        ])
+        # Dates identiques : l'id départage
+        Notification.objects.update(date_creation=timezone.now())
+
+        ids, curseur = [], None
+        while True:
+            page = self.client.get(
+                reverse('notifications:page'), {'filter': 'non_lues', **({'curseur': curseur} if curseur else {})}
+            ).json()
+            ids += [notification['id'] for notification in page['notifications']]
+            curseur = page['curseur_suivant']
+            if not curseur:
+                break
+
+        attendus = list(Notification.objects.filter(lue=False).order_by('-id').values_list('id', flat=True))
+        self.assertEqual(ids, attendus)
+        self.assertEqual(page['total_count'], 22)
+
+
+class FiligraneLectureTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = Utilisateur.objects.create_user('filigrane@crowdbuilding.bf', 'x', nom='F', prenom='F')
+        self.client.force_login(self.utilisateur)
+
+    def creer(self, nombre):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                Notification.objects.create(utilisateur=self.utilisateur, titre='t', contenu='c', type='RAPPEL')
+                for _ in range(nombre)
+            ]
+
+    def test_tout_marquer_lu_sans_toucher_les_notifications(self):
+        anciennes = self.creer(5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notifications:mark_all_read'))
+        self.assertEqual(Notification.objects.filter(lue=False).count(), 5)
+        self.assertEqual(compteurs.lire(self.utilisateur.pk), 0)
+
+        # Les suivantes restent non lues ; la lecture d'une ancienne ne décompte rien
+        nouvelle, = self.creer(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.get(pk=anciennes[0].pk).marquer_comme_lue()
+            Notification.objects.get(pk=anciennes[1].pk).delete()
+        self.assertEqual(compteurs.lire(self.utilisateur.pk), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.get(pk=nouvelle.pk).marquer_comme_lue()
+        self.assertEqual(compteurs.lire(self.utilisateur.pk), 0)
+
+        cache.clear()
+        self.assertEqual(compteurs.lire(self.utilisateur.pk), 0)
+        self.assertEqual(Notification.get_notifications_non_lues(self.utilisateur).count(), 0)
+        page = self.client.get(reverse('notifications:page')).json()
+        self.assertTrue(all(notification['lue'] for notification in page['notifications']))
+
+    def test_recomptage_concurrent_sans_ecraser_le_compteur(self):
+        self.creer(2)
+        cache.clear()
+        compter = QuerySet.count
+        cle = compteurs._cle(self.utilisateur.pk, 'non_lues')
+
+        def compter_puis_concurrent(queryset):
+            valeur = compter(queryset)
+            # Pendant le COUNT : un autre lecteur pose le compteur, une création l'incrémente
+            cache.set(cle, valeur)
+            cache.incr(cle)
+            return valeur
+
+        with mock.patch.object(QuerySet, 'count', autospec=True, side_effect=compter_puis_concurrent):
+            self.assertEqual(compteurs.lire(self.utilisateur.pk), 3)
+        self.assertEqual(cache.get(cle), 3)
+
+    def test_resume_sans_les_notifications_sous_filigrane(self):
+        self.creer(3)
+        envoi = EnvoiResume.demarrer(FrequenceResume.HEBDOMADAIRE)
+        self.assertEqual(envoi.notifications().count(), 3)
+
+        Notification.marquer_toutes_lues(Utilisateur.objects.filter(pk=self.utilisateur.pk))
+
+        self.assertFalse(envoi.notifications().exists())
+
+    @override_settings(NOTIFICATIONS_RETENTION_LUES_JOURS=30, NOTIFICATIONS_RETENTION_JOURS=365)
+    def test_retention_courte_pour_les_notifications_sous_filigrane(self):
+        autre = Utilisateur.objects.create_user('autre@crowdbuilding.bf', 'x', nom='A', prenom='A')
+        ancienne = timezone.now() - timedelta(days=60)
+        sous_filigrane, = self.creer(1)
+        non_lue = Notification.objects.create(utilisateur=autre, titre='t', contenu='c', type='RAPPEL')
+        Notification.objects.update(date_creation=ancienne)
+        Utilisateur.objects.filter(pk=self.utilisateur.pk).update(
+            notifications_lues_jusqua=ancienne + timedelta(days=1)
+        )
+
+        self.assertEqual(Notification.archiver_expirees(), 1)
+
+        self.assertTrue(NotificationArchivee.objects.filter(pk=sous_filigrane.pk).exists())
+        self.assertTrue(Notification.objects.filter(pk=non_lue.pk).exists())
+
+
+class RegroupementTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = Utilisateur.objects.create_user('regroupement@crowdbuilding.bf', 'x', nom='R', prenom='R')
+
+    def notifier(self, type=TypeNotification.NOUVEL_INVESTISSEMENT, projet_id=None, titre='t'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.creer_ou_regrouper([self.utilisateur.pk], type, projet_id=projet_id, titre=titre, contenu='c')
+
+    def test_regroupe_tant_que_non_lue_dans_la_fenetre(self):
+        for i in range(3):
+            self.notifier(titre=f'intention {i}')
+        notification = Notification.objects.get()
+        self.assertEqual((notification.occurrences, notification.titre), (3, 'intention 2'))
+        self.assertEqual(compteurs.lire(self.utilisateur.pk), 1)
+
+        # Lue : la suivante est une nouvelle notification
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.marquer_comme_lue()
+        self.notifier()
+        # Hors de la fenêtre de regroupement : nouvelle notification
+        Notification.objects.filter(lue=False).update(
+            date_creation=timezone.now() - timedelta(minutes=settings.NOTIFICATIONS_REGROUPEMENT_MINUTES + 1)
+        )
+        _, regroupees = self.notifier()
+        # Types non regroupés : une ligne par notification
+        self.notifier(type=TypeNotification.RAPPEL)
+        self.notifier(type=TypeNotification.RAPPEL)
+
+        self.assertEqual(regroupees, 0)
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertEqual(compteurs.lire(self.utilisateur.pk), 4)
+        self.assertEqual(Notification.ecritures_evitees(), 2)
+
+    def test_insertion_concurrente_reprise(self):
+        regrouper = Notification._regrouper
+
+        def apres_insertion_concurrente(utilisateur_ids, type, projet_id, existantes, valeurs, *args):
+            # Une autre transaction a créé la notification de la même clé entre-temps
+            if not existantes and appels.call_count == 1:
+                Notification.objects.create(
+                    utilisateur=self.utilisateur, type=type, titre='concurrente', contenu='c',
+                    cle_regroupement=Notification.cle_pour(self.utilisateur.pk, type, projet_id)
+                )
+            return regrouper(utilisateur_ids, type, projet_id, existantes, valeurs, *args)
+
+        with mock.patch.object(Notification, '_regrouper', side_effect=apres_insertion_concurrente) as appels:
+            self.notifier(titre='intention')
+
+        self.assertEqual(appels.call_count, 2)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.titre, notification.occurrences), ('intention', 1))
+
+
+class RegroupementConcurrentTests(TransactionTestCase):
+
+    FILS = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            self.skipTest("SQLite : pas de verrou de ligne, une lecture qui passe en écriture échoue au lieu d'attendre")
+        cache.clear()
+        self.utilisateur = Utilisateur.objects.create_user('regroupement@crowdbuilding.bf', 'x', nom='R', prenom='R')
+
+    def notifier(self, erreurs):
+        try:
+            Notification.creer_ou_regrouper(
+                [self.utilisateur.pk], TypeNotification.NOUVEL_INVESTISSEMENT, titre='t', contenu='c'
+            )
+        except Exception as erreur:
+            erreurs.append(erreur)
+        finally:
+            connections.close_all()
+
+    def test_une_notification_par_cle(self):
+        erreurs = []
+        fils = [threading.Thread(target=self.notifier, args=(erreurs,)) for _ in range(self.FILS)]
+        for f in fils:
+            f.start()
+        for f in fils:
+            f.join()
+
+        self.assertEqual(erreurs, [])
+        self.assertEqual(Notification.objects.get().occurrences, self.FILS)
+
+
+class ServeurSMTPTest:
+    """Serveur SMTP local (aiosmtpd) : refuse les adresses refus-4xx@ / refus-5xx@"""
+
+    def __init__(self):
+        self.recus = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('refus-4xx@'):
+            return '451 Réessayez plus tard'
+        if address.startswith('refus-5xx@'):
+            return '550 Adresse inconnue'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recus.append((envelope.mail_from, envelope.rcpt_tos, envelope.content))
+        return '250 Message accepted for delivery'
+
+
+class BoiteEnvoiTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serveur = ServeurSMTPTest()
+        with socket.socket() as libre:
+            libre.bind(('127.0.0.1', 0))
+            port = libre.getsockname()[1]
+        self.controleur = Controller(self.serveur, hostname='127.0.0.1', port=port)
+        self.controleur.start()
+        # Le lanceur de tests impose le backend locmem : on rétablit la boîte d'envoi
+        self.reglages = self.settings(
+            EMAIL_BACKEND='apps.notifications.backends.BoiteEnvoiBackend',
+            EMAILS_BACKEND_ENVOI='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=port,
+            EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+            EMAILS_LIMITES_DOMAINES={}, EMAILS_LIMITE_PAR_DOMAINE=100,
+        )
+        self.reglages.enable()
+
+    def tearDown(self):
+        self.reglages.disable()
+        self.controleur.stop()
+
+    def envoyer(self, *destinataires):
+        for destinataire in destinataires:
+            mail.send_mail('Bienvenue', 'Bonjour', 'noreply@crowdbuilding.bf', [destinataire])
+
+    def test_ecrit_dans_la_transaction_de_l_appelant(self):
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            self.envoyer('a@exemple.bf')
+            1 / 0
+        self.assertEqual(EmailSortant.objects.count(), 0)
+
+        self.envoyer('a@exemple.bf')
+        self.assertEqual(EmailSortant.objects.count(), 1)
+        self.assertEqual(self.serveur.recus, [])
+
+    def test_worker_envoie_par_session_smtp(self):
+        self.envoyer('a@exemple.bf', 'b@exemple.bf', 'c@autre.bf')
+
+        self.assertEqual(EmailSortant.envoyer_lot(), {'envoyes': 3, 'reportes': 0, 'echecs': 0})
+        self.assertEqual(sorted(rcpt for _, (rcpt,), _ in self.serveur.recus), ['a@exemple.bf', 'b@exemple.bf', 'c@autre.bf'])
+        self.assertIn(b'Subject: Bienvenue', self.serveur.recus[0][2])
+        self.assertFalse(EmailSortant.objects.exclude(statut=StatutEmail.ENVOYE).exists())
+        self.assertIsNone(EmailSortant.envoyer_lot())
+        self.assertEqual(EmailSortant.metriques()['envoyes'], 3)
+
+    def test_backoff_et_echec_definitif(self):
+        self.envoyer('refus-4xx@exemple.bf', 'refus-5xx@exemple.bf', 'ok@exemple.bf')
+
+        self.assertEqual(EmailSortant.envoyer_lot(), {'envoyes': 1, 'reportes': 0, 'echecs': 2})
+        temporaire = EmailSortant.objects.get(destinataires=['refus-4xx@exemple.bf'])
+        self.assertEqual((temporaire.statut, temporaire.tentatives), (StatutEmail.EN_ATTENTE, 1))
+        self.assertGreater(temporaire.prochaine_tentative, timezone.now() + timezone.timedelta(seconds=50))
+        self.assertEqual(EmailSortant.objects.get(destinataires=['refus-5xx@exemple.bf']).statut, StatutEmail.ECHEC)
+
+        # Pas avant l'échéance du backoff
+        self.assertIsNone(EmailSortant.envoyer_lot())
+
+    def test_limite_par_domaine(self):
+        with self.settings(EMAILS_LIMITES_DOMAINES={'exemple.bf': 2}):
+            self.envoyer('a@exemple.bf', 'b@exemple.bf', 'c@exemple.bf', 'd@autre.bf')
+            self.assertEqual(EmailSortant.envoyer_lot(), {'envoyes': 3, 'reportes': 1, 'echecs': 0})
+
+        reporte = EmailSortant.objects.get(statut=StatutEmail.EN_ATTENTE)
+        self.assertEqual((reporte.domaine, reporte.tentatives), ('exemple.bf', 0))
+
+
+class RepartitionParTypeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = Utilisateur.objects.create_user('types@crowdbuilding.bf', 'x', nom='T', prenom='T')
+
+    def test_une_requete_groupee_en_cache(self):
+        Notification.objects.bulk_create([
+            Notification(utilisateur=self.utilisateur, titre='t', contenu='c', type=type, lue=lue)
+            for type, lue in [('RAPPEL', False), ('RAPPEL', True), ('RAPPEL', False), ('VALIDATION_DOCUMENT', False)]
+        ])
+
+        with self.assertNumQueries(1):
+            repartition = compteurs.par_type(self.utilisateur.pk)
+        self.assertEqual(repartition['RAPPEL'], {'libelle': 'Rappel', 'total': 3, 'non_lues': 2})
+        self.assertEqual(repartition['VALIDATION_DOCUMENT']['libelle'], 'VALIDATION_DOCUMENT')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count_by_type(compteurs.par_type(self.utilisateur.pk), 'RAPPEL,VALIDATION_DOCUMENT'), 3)
+
+        # Toute variation des compteurs efface la répartition
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.filter(type='RAPPEL', lue=False).first().marquer_comme_lue()
+        self.assertEqual(compteurs.par_type(self.utilisateur.pk)['RAPPEL']['non_lues'], 1)
@@ -4,41 +4,62 @@ Plateforme crowdBuilding - Burkina Faso
 """
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from .models import Notification, ParametreNotification, TypeNotification
+from . import compteurs
 from django.views.decorators.http import require_http_methods
 from .forms import ParametreNotificationForm
 from django.core.paginator import Paginator
 from django.db.models import Q, Count  # 🔥 CORRECTION : Ajout de Q
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Sum
-from apps.investments.models import Investissement, StatutInvestissement
+from apps.investments.models import SoldeFinancement
+from apps.core.pagination import paginer_par_curseur
+from apps.accounts.models import Utilisateur
 
 
 
+# Notifications par page de la boîte de réception
+TAILLE_PAGE_NOTIFICATIONS = 20
+
+
+def _page_notifications(request):
+    """
+    Page courante de la boîte de réception : filtre, notifications, curseur suivant
+    Pagination par curseur sur l'index (utilisateur, date_creation DESC, id DESC)
+    """
+    filtre = request.GET.get('filter', 'toutes')
+    if filtre not in compteurs.FILTRES:
+        filtre = 'toutes'
+    condition, _ = compteurs.FILTRES[filtre]
+
+    notifications, curseur_suivant = paginer_par_curseur(
+        request.user.notifications.filter(condition).select_related('projet'),
+        request.GET.get('curseur'),
+        TAILLE_PAGE_NOTIFICATIONS
+    )
+    return filtre, Notification.appliquer_filigrane(notifications, request.user), curseur_suivant
+
+
 @login_required
 def list_notifications(request):
     """Liste des notifications de l'utilisateur connecté"""
 
-    notifications = request.user.notifications.all().order_by('-date_creation')
-
-    # Filtres
-    filter_param = request.GET.get('filter', 'toutes')
-    if filter_param == 'non_lues':
-        notifications = notifications.filter(lue=False)
-    elif filter_param == 'projets':
-        notifications = notifications.filter(projet__isnull=False)
-    elif filter_param == 'investissements':
-        notifications = notifications.filter(investissement__isnull=False)
+    filtre, notifications, curseur_suivant = _page_notifications(request)
 
+    # 🔢 Compteurs lus dans le cache (pas de COUNT par page) : onglets et répartition par type
+    onglets = {nom: compteurs.lire(request.user.pk, nom) for nom in compteurs.FILTRES}
     context = {
         'notifications': notifications,
-        'total_count': notifications.count(),
-        'unread_count': notifications.filter(lue=False).count(),
+        'filtre': filtre,
+        'curseur_suivant': curseur_suivant,
+        'total_count': onglets[filtre],
+        'unread_count': onglets['non_lues'],
+        'onglets': onglets,
+        'par_type': compteurs.par_type(request.user.pk),
     }
 
     # === PROMOTEUR ===
@@ -61,22 +82,13 @@ def list_notifications(request):
     # === INVESTISSEUR ===
     if request.user.est_investisseur():
 
-        # ✅ CAPITAL CONFIRMÉ (argent réellement validé)
-        total_confirme = Investissement.objects.filter(
-            investisseur=request.user,
-            statut=StatutInvestissement.CONFIRME
-        ).aggregate(total=Sum('montant'))['total'] or 0
-
-        # ✅ NOMBRE DE PROJETS INVESTIS
-        nb_projets_investis = Investissement.objects.filter(
-            investisseur=request.user,
-            statut=StatutInvestissement.CONFIRME
-        ).values('projet').distinct().count()
+        # ✅ CAPITAL CONFIRMÉ ET PROJETS INVESTIS (une lecture du solde)
+        solde = SoldeFinancement.pour_investisseur(request.user)
 
         # 🔁 Injection dans le contexte
         context.update({
-            'total_confirme': total_confirme,
-            'nb_projets_investis': nb_projets_investis,
+            'total_confirme': solde.montant_confirme,
+            'nb_projets_investis': solde.nombre_projets,
         })
 
         return render(request, 'notifications/list_investisseur.html', context)
@@ -89,21 +101,54 @@ def list_notifications(request):
     return render(request, 'notifications/list_pending.html', context)
 
 
+@login_required
+def page_notifications(request):
+    """Page suivante de la boîte de réception en JSON (défilement infini)"""
+    filtre, notifications, curseur_suivant = _page_notifications(request)
+
+    return JsonResponse({
+        'notifications': [
+            {
+                'id': notification.id,
+                'titre': notification.titre,
+                'contenu': notification.contenu,
+                'type': notification.type,
+                'lue': notification.lue,
+                'date_creation': notification.date_creation,
+                'lien_action': notification.lien_action,
+                'projet': {
+                    'id': notification.projet.id,
+                    'titre': notification.projet.titre,
+                } if notification.projet else None,
+            }
+            for notification in notifications
+        ],
+        'curseur_suivant': curseur_suivant,
+        'total_count': compteurs.lire(request.user.pk, filtre),
+        'unread_count': compteurs.lire(request.user.pk),
+    })
+
+
 @require_POST
 @login_required
 def mark_all_read(request):
     """Marquer toutes les notifications comme lues"""
     try:
+        # Filigrane de lecture : une écriture par utilisateur, aucune ligne de notification modifiée
         if request.user.est_administrateur():
-            # Admin: marquer toutes les notifications
-            updated_count = Notification.objects.filter(lue=False).update(lue=True)
+            # Admin: marquer toutes les notifications (filigrane de tous les utilisateurs)
+            nombre = Notification.marquer_toutes_lues(Utilisateur.objects.all())
+            message = f'Notifications de {nombre} utilisateur(s) marquées comme lues'
+            updated_count = None
         else:
             # Utilisateur normal: seulement ses notifications
-            updated_count = request.user.notifications.filter(lue=False).update(lue=True)
+            updated_count = compteurs.lire(request.user.pk)
+            Notification.marquer_toutes_lues(Utilisateur.objects.filter(pk=request.user.pk))
+            message = f'{updated_count} notification(s) marquée(s) comme lue(s)'
             
         return JsonResponse({
             'success': True,
-            'message': f'{updated_count} notification(s) marquée(s) comme lue(s)',
+            'message': message,
             'updated_count': updated_count
         })
     except Exception as e:
@@ -174,14 +219,13 @@ def delete_notification(request, notification_id):
 def delete_all_notifications(request):
     """Supprimer toutes les notifications"""
     try:
+        # Par lots : chaque DELETE ne verrouille qu'un lot de lignes
         if request.user.est_administrateur():
             # Admin peut supprimer toutes les notifications
-            deleted_count = Notification.objects.count()
-            Notification.objects.all().delete()
+            deleted_count = Notification.supprimer_par_lots(Notification.objects.all())
         else:
             # Utilisateur normal: seulement ses notifications
-            deleted_count = request.user.notifications.count()
-            request.user.notifications.all().delete()
+            deleted_count = Notification.supprimer_par_lots(request.user.notifications.all())
             
         return JsonResponse({
             'success': True,
@@ -192,4 +236,12 @@ def delete_all_notifications(request):
         return JsonResponse({
             'success': False,
             'message': f'Erreur: {str(e)}'
-        })
\ No newline at end of file
+        })
+
+def flux_notifications(request):
+    """
+    Flux SSE des notifications : servi par l'application ASGI (crowdBuilding/asgi.py),
+    qui intercepte cette URL avant Django. Sous WSGI, 204 : le navigateur ne se
+    reconnecte pas et la page garde le comportement habituel (compteur au chargement)
+    """
+    return HttpResponse(status=204)
@@ -1,3 +1,193 @@
-from django.contrib import admin
+import csv
+import io
 
-# Register your models here.
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import EvenementPaiement, ImportReleve, StatutImport, lire_entete
+
+
+@admin.register(EvenementPaiement)
+class EvenementPaiementAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'reference',
+        'statut_recu',
+        'resultat',
+        'date_reception',
+        'date_traitement'
+    )
+
+    list_filter = (
+        'resultat',
+        'statut_recu',
+        'date_reception'
+    )
+
+    search_fields = (
+        'reference',
+        'cle_dedoublonnage'
+    )
+
+    readonly_fields = (
+        'cle_dedoublonnage',
+        'reference',
+        'statut_recu',
+        'payload',
+        'date_reception',
+        'date_traitement',
+        'resultat'
+    )
+
+
+class ImportReleveForm(forms.ModelForm):
+    """
+    Refuse un relevé illisible avant tout enregistrement : encodage, format CSV
+    et colonnes de l'en-tête ; un relevé importé dans la requête est lu en entier
+    """
+
+    class Meta:
+        model = ImportReleve
+        fields = ('operateur', 'fichier')
+
+    def clean_fichier(self):
+        fichier = self.cleaned_data.get('fichier')
+        if not fichier:
+            raise forms.ValidationError("Veuillez joindre le relevé CSV.")
+
+        flux = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+        try:
+            separateur, _ = lire_entete(flux)
+            if fichier.size <= settings.RELEVES_IMPORT_DIRECT_MAX_OCTETS:
+                for _ in csv.reader(flux, delimiter=separateur):
+                    pass
+        except UnicodeDecodeError:
+            raise forms.ValidationError(
+                "Le relevé doit être encodé en UTF-8 "
+                "(autre encodage : python manage.py importer_releve --encodage)."
+            )
+        except csv.Error as e:
+            raise forms.ValidationError(f"Relevé CSV illisible : {e}")
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        finally:
+            flux.detach()
+            fichier.seek(0)
+        return fichier
+
+
+@admin.register(ImportReleve)
+class ImportReleveAdmin(admin.ModelAdmin):
+    """
+    L'ajout d'un import = téléversement du relevé CSV, importé dans la requête
+    s'il est petit, mis en file pour la commande traiter_releves sinon
+    """
+
+    form = ImportReleveForm
+
+    list_display = (
+        'date_import',
+        'operateur',
+        'nom_fichier',
+        'lignes_lues',
+        'validees',
+        'echouees',
+        'deja_traitees',
+        'exceptions',
+        'statut',
+        'importe_par'
+    )
+
+    list_filter = (
+        'statut',
+        'operateur',
+        'date_import'
+    )
+
+    search_fields = (
+        'nom_fichier',
+    )
+
+    fields_resultat = (
+        'operateur',
+        'fichier',
+        'nom_fichier',
+        'importe_par',
+        'date_import',
+        'lignes_lues',
+        'validees',
+        'echouees',
+        'deja_traitees',
+        'exceptions',
+        'lien_rapport',
+        'statut',
+        'erreur'
+    )
+
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ('operateur', 'fichier')
+        return self.fields_resultat
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return ()
+        return self.fields_resultat
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        obj.importe_par = request.user
+        obj.nom_fichier = form.cleaned_data['fichier'].name[:255]
+        direct = form.cleaned_data['fichier'].size <= settings.RELEVES_IMPORT_DIRECT_MAX_OCTETS
+        obj.statut = StatutImport.EN_COURS if direct else StatutImport.EN_ATTENTE
+        super().save_model(request, obj, form, change)
+
+        if not direct:
+            self.message_user(
+                request,
+                "Relevé volumineux mis en file : il sera importé par la commande traiter_releves.",
+                level=messages.INFO
+            )
+            return
+
+        if not obj.executer():
+            self.message_user(request, obj.erreur, level=messages.ERROR)
+            return
+
+        self.message_user(
+            request,
+            f"{obj.lignes_lues} ligne(s) lue(s) : {obj.validees} paiement(s) validé(s), "
+            f"{obj.echouees} en échec, {obj.deja_traitees} déjà traité(s), {obj.exceptions} exception(s).",
+            level=messages.WARNING if obj.exceptions else messages.SUCCESS
+        )
+
+    # ----- Téléchargement du rapport d'exceptions -----
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:import_id>/rapport/',
+                self.admin_site.admin_view(self.telecharger_rapport),
+                name='payments_importreleve_rapport'
+            ),
+        ] + super().get_urls()
+
+    @admin.display(description="Rapport d'exceptions")
+    def lien_rapport(self, obj):
+        if not obj.rapport:
+            return "-"
+        url = reverse('admin:payments_importreleve_rapport', args=[obj.pk])
+        return format_html('<a href="{}">Télécharger ({} ligne(s))</a>', url, obj.exceptions)
+
+    def telecharger_rapport(self, request, import_id):
+        releve = get_object_or_404(ImportReleve, pk=import_id)
+        response = HttpResponse(releve.rapport, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="exceptions-releve-{releve.pk}.csv"'
+        return response
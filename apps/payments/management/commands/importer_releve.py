@@ -0,0 +1,44 @@
+"""
+Importe un relevé de règlement mobile money (CSV)
+Usage : python manage.py importer_releve releve.csv --operateur WAVE [--rapport exceptions.csv]
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payments.models import ImportReleve, OPERATEURS_MOBILE_MONEY
+
+
+class Command(BaseCommand):
+    help = "Rapproche un relevé de règlement des transactions et valide les paiements par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Relevé CSV (colonnes reference, montant, statut optionnel)")
+        parser.add_argument(
+            '--operateur',
+            required=True,
+            choices=[code for code, _ in OPERATEURS_MOBILE_MONEY],
+            help="Opérateur émetteur du relevé"
+        )
+        parser.add_argument('--rapport', help="Fichier CSV des exceptions")
+        parser.add_argument('--lot', type=int, default=5000, help="Lignes rapprochées par lot")
+        parser.add_argument('--encodage', default='utf-8-sig', help="Encodage du relevé")
+
+    def handle(self, *args, **options):
+        releve = ImportReleve(operateur=options['operateur'], nom_fichier=options['fichier'][-255:])
+
+        try:
+            with open(options['fichier'], encoding=options['encodage'], errors='replace', newline='') as fichier:
+                releve.importer(fichier, taille_lot=options['lot'])
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(str(e))
+
+        if options['rapport'] and releve.rapport:
+            with open(options['rapport'], 'w', encoding='utf-8', newline='') as fichier:
+                fichier.write(releve.rapport)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{releve.lignes_lues} ligne(s) lue(s) : {releve.validees} paiement(s) validé(s), "
+            f"{releve.echouees} en échec, {releve.deja_traitees} déjà traité(s), "
+            f"{releve.exceptions} exception(s)"
+        ))
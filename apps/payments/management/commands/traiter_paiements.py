@@ -0,0 +1,32 @@
+"""
+Applique les callbacks de paiement reçus par le webhook
+Usage : python manage.py traiter_paiements [--boucle]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.payments.models import EvenementPaiement
+
+
+class Command(BaseCommand):
+    help = "Traite par lots les événements de paiement en attente"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=500, help="Événements traités par transaction")
+        parser.add_argument('--boucle', action='store_true', help="Tourner en continu (worker)")
+        parser.add_argument('--pause', type=float, default=1.0, help="Attente en secondes quand la file est vide")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            traites = EvenementPaiement.traiter_lot(taille=options['lot'])
+            total += traites
+            if traites:
+                self.stdout.write(f"{traites} événement(s) traité(s)")
+            if traites < options['lot']:
+                if not options['boucle']:
+                    break
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} événement(s) de paiement traité(s)"))
@@ -0,0 +1,40 @@
+"""
+Importe les relevés de règlement mis en file depuis l'admin
+Usage : python manage.py traiter_releves [--boucle]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.payments.models import ImportReleve
+
+
+class Command(BaseCommand):
+    help = "Importe un à un les relevés téléversés en attente de traitement"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=5000, help="Lignes rapprochées par lot")
+        parser.add_argument('--boucle', action='store_true', help="Tourner en continu (worker)")
+        parser.add_argument('--pause', type=float, default=5.0, help="Attente en secondes quand la file est vide")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            releve = ImportReleve.prendre_en_attente()
+            if releve is None:
+                if not options['boucle']:
+                    break
+                time.sleep(options['pause'])
+                continue
+
+            total += 1
+            if releve.executer(taille_lot=options['lot']):
+                self.stdout.write(
+                    f"{releve} : {releve.lignes_lues} ligne(s) lue(s), {releve.validees} paiement(s) validé(s), "
+                    f"{releve.echouees} en échec, {releve.deja_traitees} déjà traité(s), "
+                    f"{releve.exceptions} exception(s)"
+                )
+            else:
+                self.stderr.write(f"{releve} : {releve.erreur}")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} relevé(s) traité(s)"))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvenementPaiement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle_dedoublonnage', models.CharField(max_length=64, unique=True, verbose_name='Clé de dédoublonnage')),
+                ('reference', models.CharField(max_length=50, verbose_name='Référence transaction')),
+                ('statut_recu', models.CharField(max_length=20, verbose_name='Statut reçu')),
+                ('payload', models.TextField(verbose_name='Contenu brut')),
+                ('date_reception', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de réception')),
+                ('date_traitement', models.DateTimeField(blank=True, null=True, verbose_name='Date de traitement')),
+                ('resultat', models.CharField(blank=True, choices=[('VALIDE', 'Paiement validé'), ('ECHEC', 'Paiement échoué'), ('IGNORE', 'Sans effet (déjà traité)'), ('INCONNU', 'Référence inconnue')], max_length=10, verbose_name='Résultat')),
+            ],
+            options={
+                'verbose_name': 'Événement de paiement',
+                'verbose_name_plural': 'Événements de paiement',
+                'ordering': ['date_reception'],
+                'indexes': [models.Index(fields=['date_traitement', 'id'], name='payments_ev_date_tr_93a302_idx')],
+            },
+        ),
+    ]
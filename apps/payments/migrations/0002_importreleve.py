@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:28
+
+import apps.payments.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportReleve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operateur', models.CharField(choices=[('ORANGE_MONEY', 'Orange Money'), ('MOOV_MONEY', 'Moov Money'), ('WAVE', 'Wave')], max_length=20, verbose_name='Opérateur')),
+                ('fichier', models.FileField(blank=True, upload_to=apps.payments.models.releve_path, verbose_name='Relevé (CSV)')),
+                ('nom_fichier', models.CharField(blank=True, max_length=255, verbose_name='Nom du fichier')),
+                ('date_import', models.DateTimeField(default=django.utils.timezone.now, verbose_name="Date d'import")),
+                ('lignes_lues', models.PositiveIntegerField(default=0, verbose_name='Lignes lues')),
+                ('validees', models.PositiveIntegerField(default=0, verbose_name='Paiements validés')),
+                ('echouees', models.PositiveIntegerField(default=0, verbose_name='Paiements en échec')),
+                ('deja_traitees', models.PositiveIntegerField(default=0, verbose_name='Déjà traitées')),
+                ('exceptions', models.PositiveIntegerField(default=0, verbose_name='Exceptions')),
+                ('rapport', models.TextField(blank=True, verbose_name="Rapport d'exceptions (CSV)")),
+                ('importe_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='imports_releves', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Import de relevé',
+                'verbose_name_plural': 'Imports de relevés',
+                'ordering': ['-date_import'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_importreleve'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='evenementpaiement',
+            name='resultat',
+            field=models.CharField(blank=True, choices=[('VALIDE', 'Paiement validé'), ('ECHEC', 'Paiement échoué'), ('IGNORE', 'Sans effet (déjà traité)'), ('INCONNU', 'Référence inconnue'), ('REFUSE', "Refusé : l'investissement n'attend plus de paiement")], max_length=10, verbose_name='Résultat'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_evenementpaiement_resultat_refuse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importreleve',
+            name='erreur',
+            field=models.TextField(blank=True, verbose_name='Erreur'),
+        ),
+        migrations.AddField(
+            model_name='importreleve',
+            name='statut',
+            field=models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINE', 'Terminé'), ('ERREUR', 'Erreur')], default='TERMINE', max_length=20, verbose_name='Statut'),
+        ),
+    ]
@@ -1,3 +1,405 @@
+"""
+Modèles pour la réception des notifications de paiement (webhooks)
+et l'import des relevés de règlement des opérateurs mobile money
+Plateforme crowdBuilding - Burkina Faso
+"""
+import csv
+import hashlib
+import io
+import unicodedata
+import uuid
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
 from django.db import models
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from apps.investments.models import StatutTransaction, Transaction
+
+
+class ResultatEvenement(models.TextChoices):
+    VALIDE = 'VALIDE', 'Paiement validé'
+    ECHEC = 'ECHEC', 'Paiement échoué'
+    IGNORE = 'IGNORE', 'Sans effet (déjà traité)'
+    INCONNU = 'INCONNU', 'Référence inconnue'
+    REFUSE = 'REFUSE', "Refusé : l'investissement n'attend plus de paiement"
+
+
+class EvenementPaiement(models.Model):
+    """
+    Boîte de réception des callbacks opérateurs (append-only)
+    Le webhook ne fait qu'insérer ; la commande traiter_paiements applique
+    les changements de statut par lots
+    """
+    cle_dedoublonnage = models.CharField(max_length=64, unique=True, verbose_name="Clé de dédoublonnage")
+    reference = models.CharField(max_length=50, verbose_name="Référence transaction")
+    statut_recu = models.CharField(max_length=20, verbose_name="Statut reçu")
+    payload = models.TextField(verbose_name="Contenu brut")
+    date_reception = models.DateTimeField(default=timezone.now, verbose_name="Date de réception")
+    date_traitement = models.DateTimeField(null=True, blank=True, verbose_name="Date de traitement")
+    resultat = models.CharField(
+        max_length=10,
+        choices=ResultatEvenement.choices,
+        blank=True,
+        verbose_name="Résultat"
+    )
+
+    class Meta:
+        verbose_name = "Événement de paiement"
+        verbose_name_plural = "Événements de paiement"
+        ordering = ['date_reception']
+        indexes = [
+            models.Index(fields=['date_traitement', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.reference} - {self.statut_recu}"
+
+    @staticmethod
+    def calculer_cle(data, corps):
+        """Identifiant d'événement fourni par l'opérateur, sinon empreinte du contenu"""
+        identifiant = data.get('event_id') or data.get('id')
+        if identifiant:
+            return str(identifiant)[:64]
+        return hashlib.sha256(corps).hexdigest()
+
+    @classmethod
+    def enregistrer(cls, data, corps):
+        """
+        Insère l'événement dans la boîte de réception (INSERT ... IGNORE) :
+        une relivraison de l'opérateur est ignorée par la base
+        """
+        cls.objects.bulk_create([
+            cls(
+                cle_dedoublonnage=cls.calculer_cle(data, corps),
+                reference=str(data.get('reference', ''))[:50],
+                statut_recu=str(data.get('status', ''))[:20],
+                payload=corps.decode('utf-8', errors='replace'),
+            )
+        ], ignore_conflicts=True)
+
+    @classmethod
+    def traiter_lot(cls, taille=500):
+        """
+        Applique un lot d'événements en attente avec des UPDATE groupés
+        Les transitions sont conditionnelles sur le statut : rejouer un
+        événement déjà appliqué reste sans effet, et un succès pour un
+        investissement qui n'attend plus de paiement est marqué REFUSE
+        Retourne le nombre d'événements traités
+        """
+        with db_transaction.atomic():
+            evenements = list(
+                cls.objects.filter(date_traitement__isnull=True)
+                .order_by('pk')
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'reference', 'statut_recu')[:taille]
+            )
+            if not evenements:
+                return 0
+
+            transactions, references_connues = {}, set()
+            for transaction_id, reference, statut in Transaction.objects.filter(
+                reference__in={reference for _, reference, _ in evenements}
+            ).order_by('pk').select_for_update().values_list('id', 'reference', 'statut'):
+                references_connues.add(reference)
+                if statut == StatutTransaction.EN_ATTENTE:
+                    transactions[reference] = transaction_id
+
+            # Premier événement reçu pour chaque transaction en attente
+            a_valider, a_echouer = {}, {}
+            resultats = defaultdict(list)
+            for evenement_id, reference, statut_recu in evenements:
+                if reference not in references_connues:
+                    resultats[ResultatEvenement.INCONNU].append(evenement_id)
+                elif reference not in transactions or reference in a_valider or reference in a_echouer:
+                    resultats[ResultatEvenement.IGNORE].append(evenement_id)
+                elif statut_recu == 'SUCCESS':
+                    a_valider[reference] = evenement_id
+                else:
+                    a_echouer[reference] = transactions[reference]
+                    resultats[ResultatEvenement.ECHEC].append(evenement_id)
+
+            if a_valider:
+                ids = [transactions[reference] for reference in a_valider]
+                Transaction.valider_en_masse(ids)
+                # Paiement d'un investissement annulé ou rejeté : rien n'est validé,
+                # l'événement est signalé (remboursement à prévoir)
+                validees = set(
+                    Transaction.objects.filter(id__in=ids, statut=StatutTransaction.VALIDEE)
+                    .values_list('id', flat=True)
+                )
+                for reference, evenement_id in a_valider.items():
+                    resultat = ResultatEvenement.VALIDE if transactions[reference] in validees else ResultatEvenement.REFUSE
+                    resultats[resultat].append(evenement_id)
+
+            if a_echouer:
+                Transaction.marquer_echec_en_masse(list(a_echouer.values()))
+
+            maintenant = timezone.now()
+            for resultat, ids in resultats.items():
+                cls.objects.filter(id__in=ids).update(date_traitement=maintenant, resultat=resultat)
+
+        return len(evenements)
+
+
+# =========================
+# RELEVÉS DE RÈGLEMENT
+# =========================
+
+OPERATEURS_MOBILE_MONEY = [
+    ('ORANGE_MONEY', 'Orange Money'),
+    ('MOOV_MONEY', 'Moov Money'),
+    ('WAVE', 'Wave'),
+]
+
+# Noms de colonnes acceptés (après normalisation : minuscules, sans accents, "_")
+COLONNES_RELEVE = {
+    'reference': {'reference', 'ref', 'reference_transaction', 'reference_marchand', 'merchant_reference',
+                  'transaction_id', 'external_id'},
+    'montant': {'montant', 'amount', 'montant_fcfa', 'montant_xof'},
+    'statut': {'statut', 'status', 'etat'},
+}
+
+STATUTS_RELEVE_SUCCES = {'SUCCESS', 'SUCCES', 'SUCCESSFUL', 'OK', 'VALIDE', 'VALIDEE', 'COMPLETED', 'PAID', 'PAYE'}
+STATUTS_RELEVE_ECHEC = {'FAILED', 'FAILURE', 'ECHEC', 'ECHOUE', 'ECHOUEE', 'REJECTED', 'CANCELLED', 'ANNULE'}
+
+COLONNES_RAPPORT_RELEVE = ['ligne', 'reference', 'montant_releve', 'montant_attendu', 'motif']
+
+
+class MotifException(models.TextChoices):
+    REFERENCE_INCONNUE = 'REFERENCE_INCONNUE', 'Référence inconnue'
+    DOUBLON_FICHIER = 'DOUBLON_FICHIER', 'Référence en double dans le fichier'
+    MONTANT_INVALIDE = 'MONTANT_INVALIDE', 'Montant illisible'
+    MONTANT_DIFFERENT = 'MONTANT_DIFFERENT', 'Montant différent de la transaction'
+    STATUT_INCONNU = 'STATUT_INCONNU', 'Statut de ligne non reconnu'
+    OPERATEUR_DIFFERENT = 'OPERATEUR_DIFFERENT', 'Transaction payée par un autre opérateur'
+    TRANSACTION_CLOSE = 'TRANSACTION_CLOSE', 'Transaction déjà échouée ou annulée'
+    ECHEC_SUR_VALIDEE = 'ECHEC_SUR_VALIDEE', 'Échec signalé sur une transaction validée'
+    INVESTISSEMENT_NON_EN_ATTENTE = 'INVESTISSEMENT_NON_EN_ATTENTE', "L'investissement n'attend plus de paiement"
+
+
+class StatutImport(models.TextChoices):
+    EN_ATTENTE = 'EN_ATTENTE', 'En attente'
+    EN_COURS = 'EN_COURS', 'En cours'
+    TERMINE = 'TERMINE', 'Terminé'
+    ERREUR = 'ERREUR', 'Erreur'
+
+
+def releve_path(instance, filename):
+    """Génère le chemin pour les relevés importés"""
+    ext = filename.split('.')[-1]
+    return f'releves/{instance.operateur}/{timezone.now():%Y/%m}/{uuid.uuid4()}.{ext}'
+
+
+def _normaliser_colonne(nom):
+    nom = unicodedata.normalize('NFKD', nom).encode('ascii', 'ignore').decode()
+    return nom.strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def lire_entete(flux):
+    """
+    Lit la ligne d'en-tête du relevé : (séparateur, {rôle: position de la colonne})
+    Lève ValueError si une colonne obligatoire manque
+    """
+    entete = flux.readline()
+    separateur = max((';', ',', '\t'), key=entete.count)
+    colonnes = [_normaliser_colonne(nom) for nom in next(csv.reader([entete], delimiter=separateur), [])]
+
+    positions = {}
+    for role, noms in COLONNES_RELEVE.items():
+        for position, nom in enumerate(colonnes):
+            if nom in noms:
+                positions[role] = position
+                break
+    manquantes = {'reference', 'montant'} - set(positions)
+    if manquantes:
+        raise ValueError(f"Colonne(s) introuvable(s) dans le relevé : {', '.join(sorted(manquantes))}")
+    return separateur, positions
+
+
+def _lire_montant(valeur):
+    valeur = valeur.replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        return Decimal(valeur)
+    except InvalidOperation:
+        return None
+
+
+class ImportReleve(models.Model):
+    """
+    Import d'un relevé de règlement (CSV) d'un opérateur mobile money
+    Les lignes sont rapprochées des transactions par référence, par lots,
+    et les validations appliquées par UPDATE groupés
+    Les relevés téléversés dans l'admin au-delà de RELEVES_IMPORT_DIRECT_MAX_OCTETS
+    sont mis en file (EN_ATTENTE) et importés par la commande traiter_releves
+    """
+    operateur = models.CharField(max_length=20, choices=OPERATEURS_MOBILE_MONEY, verbose_name="Opérateur")
+    fichier = models.FileField(upload_to=releve_path, blank=True, verbose_name="Relevé (CSV)")
+    nom_fichier = models.CharField(max_length=255, blank=True, verbose_name="Nom du fichier")
+    importe_par = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='imports_releves'
+    )
+    date_import = models.DateTimeField(default=timezone.now, verbose_name="Date d'import")
+
+    lignes_lues = models.PositiveIntegerField(default=0, verbose_name="Lignes lues")
+    validees = models.PositiveIntegerField(default=0, verbose_name="Paiements validés")
+    echouees = models.PositiveIntegerField(default=0, verbose_name="Paiements en échec")
+    deja_traitees = models.PositiveIntegerField(default=0, verbose_name="Déjà traitées")
+    exceptions = models.PositiveIntegerField(default=0, verbose_name="Exceptions")
+    rapport = models.TextField(blank=True, verbose_name="Rapport d'exceptions (CSV)")
+    statut = models.CharField(
+        max_length=20,
+        choices=StatutImport.choices,
+        default=StatutImport.TERMINE,
+        verbose_name="Statut"
+    )
+    erreur = models.TextField(blank=True, verbose_name="Erreur")
+
+    class Meta:
+        verbose_name = "Import de relevé"
+        verbose_name_plural = "Imports de relevés"
+        ordering = ['-date_import']
+
+    def __str__(self):
+        return f"{self.get_operateur_display()} - {self.nom_fichier or f'{self.date_import:%d/%m/%Y}'}"
+
+    def importer(self, flux, taille_lot=5000):
+        """
+        Lit le relevé ligne à ligne (flux texte) et applique les paiements par lots
+        Les compteurs et le rapport d'exceptions sont enregistrés sur l'import
+        """
+        separateur, positions = lire_entete(flux)
+
+        rapport = io.StringIO()
+        self._rapport = csv.writer(rapport)
+        self._rapport.writerow(COLONNES_RAPPORT_RELEVE)
+        self._vues = set()
+
+        lot = []
+        for numero, ligne in enumerate(csv.reader(flux, delimiter=separateur), start=2):
+            if not any(champ.strip() for champ in ligne):
+                continue
+            self.lignes_lues += 1
+            lot.append((numero, *(
+                ligne[positions[role]].strip() if role in positions and positions[role] < len(ligne) else ''
+                for role in ('reference', 'montant', 'statut')
+            )))
+            if len(lot) >= taille_lot:
+                self._traiter_lot(lot)
+                lot = []
+        if lot:
+            self._traiter_lot(lot)
+
+        self.rapport = rapport.getvalue() if self.exceptions else ''
+        self.statut = StatutImport.TERMINE
+        self.save()
+        return self
+
+    def executer(self, taille_lot=5000):
+        """
+        Importe le fichier téléversé (UTF-8) ; retourne False si le relevé est illisible
+        L'erreur est enregistrée sur l'import, avec les compteurs des lots déjà appliqués
+        """
+        try:
+            with self.fichier.open('rb') as fichier:
+                self.importer(io.TextIOWrapper(fichier, encoding='utf-8-sig', newline=''), taille_lot)
+        except (csv.Error, UnicodeDecodeError, ValueError) as e:
+            self.statut = StatutImport.ERREUR
+            self.erreur = str(e)
+            self.rapport = ''
+            self.save()
+            return False
+        return True
+
+    @classmethod
+    def prendre_en_attente(cls):
+        """Passe EN_COURS le plus ancien import en attente et le retourne (None si la file est vide)"""
+        with db_transaction.atomic():
+            releve = (
+                cls.objects.filter(statut=StatutImport.EN_ATTENTE)
+                .order_by('pk')
+                .select_for_update(skip_locked=True)
+                .first()
+            )
+            if releve is not None:
+                cls.objects.filter(pk=releve.pk).update(statut=StatutImport.EN_COURS)
+                releve.statut = StatutImport.EN_COURS
+        return releve
+
+    def _signaler(self, numero, reference, montant, montant_attendu, motif):
+        self.exceptions += 1
+        self._rapport.writerow([numero, reference, montant, montant_attendu if montant_attendu is not None else '', motif])
+
+    def _traiter_lot(self, lot):
+        """Rapproche un lot de lignes des transactions (index en mémoire) et applique le résultat"""
+        from apps.investments.models import Investissement, StatutInvestissement
+
+        index = {
+            reference: (transaction_id, montant, statut, mode_paiement, investissement_id)
+            for transaction_id, reference, montant, statut, mode_paiement, investissement_id in Transaction.objects.filter(
+                reference__in={ligne[1] for ligne in lot}
+            ).values_list('id', 'reference', 'montant', 'statut', 'mode_paiement', 'investissement_id')
+        }
+        investissements_en_attente = set(
+            Investissement.objects.filter(
+                id__in={valeurs[4] for valeurs in index.values()},
+                statut=StatutInvestissement.EN_ATTENTE_PAIEMENT
+            ).values_list('id', flat=True)
+        )
+
+        a_valider, a_echouer = [], []
+        for numero, reference, montant_brut, statut_brut in lot:
+            montant = _lire_montant(montant_brut)
+            statut_ligne = _normaliser_colonne(statut_brut).upper()
+
+            if reference not in index:
+                self._signaler(numero, reference, montant_brut, None, MotifException.REFERENCE_INCONNUE)
+                continue
+            transaction_id, montant_attendu, statut, mode_paiement, investissement_id = index[reference]
+
+            if reference in self._vues:
+                self._signaler(numero, reference, montant_brut, montant_attendu, MotifException.DOUBLON_FICHIER)
+                continue
+            self._vues.add(reference)
+
+            if montant is None:
+                self._signaler(numero, reference, montant_brut, montant_attendu, MotifException.MONTANT_INVALIDE)
+            elif montant != montant_attendu:
+                self._signaler(numero, reference, montant_brut, montant_attendu, MotifException.MONTANT_DIFFERENT)
+            elif mode_paiement and mode_paiement != self.operateur:
+                self._signaler(numero, reference, montant_brut, montant_attendu, MotifException.OPERATEUR_DIFFERENT)
+            elif statut_ligne and statut_ligne not in STATUTS_RELEVE_SUCCES | STATUTS_RELEVE_ECHEC:
+                self._signaler(numero, reference, montant_brut, montant_attendu, MotifException.STATUT_INCONNU)
+
+            elif statut_ligne in STATUTS_RELEVE_ECHEC:
+                if statut == StatutTransaction.EN_ATTENTE:
+                    a_echouer.append(transaction_id)
+                elif statut == StatutTransaction.VALIDEE:
+                    self._signaler(numero, reference, montant_brut, montant_attendu, MotifException.ECHEC_SUR_VALIDEE)
+                else:
+                    self.deja_traitees += 1
+
+            elif statut == StatutTransaction.VALIDEE:
+                self.deja_traitees += 1
+            elif statut != StatutTransaction.EN_ATTENTE:
+                self._signaler(numero, reference, montant_brut, montant_attendu, MotifException.TRANSACTION_CLOSE)
+            elif investissement_id not in investissements_en_attente:
+                self._signaler(
+                    numero, reference, montant_brut, montant_attendu, MotifException.INVESTISSEMENT_NON_EN_ATTENTE
+                )
+            else:
+                a_valider.append(transaction_id)
 
-# Create your models here.
+        # Les UPDATE sont conditionnels : une transaction traitée entre-temps
+        # (webhook) est simplement comptée comme déjà traitée
+        validees = Transaction.valider_en_masse(a_valider) if a_valider else 0
+        echouees = Transaction.marquer_echec_en_masse(a_echouer) if a_echouer else 0
+        self.validees += validees
+        self.echouees += echouees
+        self.deja_traitees += len(a_valider) - validees + len(a_echouer) - echouees
@@ -1,3 +1,228 @@
-from django.test import TestCase
+import csv
+import json
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.accounts.models import Utilisateur
+from apps.investments.models import (
+    Investissement, ReservationParts, StatutInvestissement, StatutReservation,
+    StatutTransaction, Transaction, TypeTransaction,
+)
+from apps.payments.models import EvenementPaiement, ImportReleve, ResultatEvenement, StatutImport
+from apps.projects.models import Projet, StatutProjet
+
+
+class PaiementTestCase(TestCase):
+
+    def setUp(self):
+        self.promoteur = Utilisateur.objects.create_user('promoteur@crowdbuilding.bf', 'x', nom='P', prenom='P')
+        self.projet = Projet.objects.create(
+            titre='Résidence', description='d', montant_total=Decimal('1000000'),
+            nombre_total_parts=100, prix_unitaire=Decimal('10000'), duree=12,
+            date_debut=date(2026, 1, 1), date_fin=date(2027, 1, 1), localisation='Ouagadougou',
+            promoteur=self.promoteur, statut=StatutProjet.EN_CAMPAGNE
+        )
+
+    def creer_paiement(self, rang, nombre_parts=2):
+        """Investissement en attente de paiement, sa transaction et sa réservation"""
+        investisseur = Utilisateur.objects.create_user(
+            f'investisseur{rang}@crowdbuilding.bf', 'x', nom='I', prenom=str(rang)
+        )
+        reservation = ReservationParts.reserver(self.projet, investisseur, nombre_parts)
+        investissement = Investissement.objects.create(
+            projet=self.projet, investisseur=investisseur, nombre_parts=nombre_parts,
+            montant=Decimal('10000') * nombre_parts, origine_fonds='SALAIRE'
+        )
+        transaction_paiement = Transaction.objects.create(
+            investissement=investissement, montant=investissement.montant,
+            type=TypeTransaction.INVESTISSEMENT, mode_paiement='ORANGE_MONEY'
+        )
+        reservation.rattacher(investissement, transaction_paiement)
+        return transaction_paiement
+
+
+class WebhookPaiementTests(PaiementTestCase):
+
+    def envoyer(self, **data):
+        return self.client.post(reverse('payments:webhook'), json.dumps(data), content_type='application/json')
+
+    def resultat(self, **filtres):
+        return EvenementPaiement.objects.get(**filtres).resultat
+
+    def test_webhook_enregistre_sans_appliquer(self):
+        transaction_paiement = self.creer_paiement(1)
+
+        reponse = self.envoyer(event_id='evt-1', reference=transaction_paiement.reference, status='SUCCESS')
+
+        self.assertEqual(reponse.status_code, 200)
+        evenement = EvenementPaiement.objects.get()
+        self.assertIsNone(evenement.date_traitement)
+        transaction_paiement.refresh_from_db()
+        self.assertEqual(transaction_paiement.statut, StatutTransaction.EN_ATTENTE)
+
+    def test_webhook_refuse_json_invalide(self):
+        reponse = self.client.post(reverse('payments:webhook'), 'pas du json', content_type='application/json')
+        self.assertEqual(reponse.status_code, 400)
+        self.assertEqual(self.envoyer(status='SUCCESS').status_code, 400)
+        self.assertFalse(EvenementPaiement.objects.exists())
+
+    def test_doublons_ignores_par_la_base(self):
+        transaction_paiement = self.creer_paiement(1)
+
+        # Relivraison avec le même identifiant d'événement, corps différent
+        self.envoyer(event_id='evt-1', reference=transaction_paiement.reference, status='SUCCESS')
+        self.envoyer(event_id='evt-1', reference=transaction_paiement.reference, status='SUCCESS', essai=2)
+        # Sans identifiant : dédoublonnage sur l'empreinte du corps
+        self.envoyer(reference=transaction_paiement.reference, status='FAILED')
+        self.envoyer(reference=transaction_paiement.reference, status='FAILED')
+
+        self.assertEqual(EvenementPaiement.objects.count(), 2)
+
+    def test_lot_valide_et_echoue(self):
+        payee = self.creer_paiement(1)
+        refusee = self.creer_paiement(2, nombre_parts=3)
+        self.envoyer(event_id='evt-1', reference=payee.reference, status='SUCCESS')
+        self.envoyer(event_id='evt-2', reference=refusee.reference, status='FAILED')
+        self.envoyer(event_id='evt-3', reference='TXN-0000-9999', status='SUCCESS')
+
+        self.assertEqual(EvenementPaiement.traiter_lot(), 3)
+
+        self.assertEqual(self.resultat(cle_dedoublonnage='evt-1'), ResultatEvenement.VALIDE)
+        self.assertEqual(self.resultat(cle_dedoublonnage='evt-2'), ResultatEvenement.ECHEC)
+        self.assertEqual(self.resultat(cle_dedoublonnage='evt-3'), ResultatEvenement.INCONNU)
+
+        payee.refresh_from_db()
+        refusee.refresh_from_db()
+        self.assertEqual(payee.statut, StatutTransaction.VALIDEE)
+        self.assertEqual(payee.investissement.statut, StatutInvestissement.PAIEMENT_RECU)
+        self.assertEqual(payee.reservation.statut, StatutReservation.PAYEE)
+        self.assertEqual(refusee.statut, StatutTransaction.ECHOUEE)
+        self.assertEqual(refusee.reservation.statut, StatutReservation.LIBEREE)
+        self.projet.refresh_from_db()
+        self.assertEqual(self.projet.parts_reservees, 2)
+
+    def test_evenements_sans_effet_ignores(self):
+        transaction_paiement = self.creer_paiement(1)
+        self.envoyer(event_id='evt-1', reference=transaction_paiement.reference, status='SUCCESS')
+        self.envoyer(event_id='evt-2', reference=transaction_paiement.reference, status='FAILED')
+        EvenementPaiement.traiter_lot()
+
+        # Arrivé après traitement de la transaction : rejouer ne change rien
+        self.envoyer(event_id='evt-3', reference=transaction_paiement.reference, status='FAILED')
+        EvenementPaiement.traiter_lot()
+
+        self.assertEqual(self.resultat(cle_dedoublonnage='evt-1'), ResultatEvenement.VALIDE)
+        self.assertEqual(self.resultat(cle_dedoublonnage='evt-2'), ResultatEvenement.IGNORE)
+        self.assertEqual(self.resultat(cle_dedoublonnage='evt-3'), ResultatEvenement.IGNORE)
+        transaction_paiement.refresh_from_db()
+        self.assertEqual(transaction_paiement.statut, StatutTransaction.VALIDEE)
+
+    def test_succes_pour_investissement_annule(self):
+        transaction_paiement = self.creer_paiement(1)
+        transaction_paiement.investissement.annuler()
+        self.envoyer(event_id='evt-1', reference=transaction_paiement.reference, status='SUCCESS')
+
+        EvenementPaiement.traiter_lot()
+
+        self.assertEqual(self.resultat(cle_dedoublonnage='evt-1'), ResultatEvenement.REFUSE)
+        transaction_paiement.refresh_from_db()
+        self.assertEqual(transaction_paiement.statut, StatutTransaction.EN_ATTENTE)
+        self.assertEqual(transaction_paiement.investissement.statut, StatutInvestissement.ANNULE)
+        self.assertEqual(transaction_paiement.reservation.statut, StatutReservation.LIBEREE)
+        self.projet.refresh_from_db()
+        self.assertEqual(self.projet.parts_reservees, 0)
+
+    def test_commande_vide_la_file_par_lots(self):
+        for rang in range(5):
+            transaction_paiement = self.creer_paiement(rang)
+            self.envoyer(event_id=f'evt-{rang}', reference=transaction_paiement.reference, status='SUCCESS')
+
+        sortie = StringIO()
+        call_command('traiter_paiements', lot=2, stdout=sortie)
+
+        self.assertIn('5 événement(s) de paiement traité(s)', sortie.getvalue())
+        self.assertFalse(EvenementPaiement.objects.filter(date_traitement__isnull=True).exists())
+        self.assertEqual(
+            Transaction.objects.filter(statut=StatutTransaction.VALIDEE).count(), 5
+        )
+
+
+class ImportReleveAdminTests(PaiementTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        admin = Utilisateur.objects.create_superuser('admin@crowdbuilding.bf', 'x', nom='Admin', prenom='A')
+        self.client.force_login(admin)
+
+    def televerser(self, contenu):
+        with override_settings(MEDIA_ROOT=self.media):
+            return self.client.post(reverse('admin:payments_importreleve_add'), {
+                'operateur': 'ORANGE_MONEY',
+                'fichier': SimpleUploadedFile('releve.csv', contenu, content_type='text/csv'),
+            })
+
+    def champ_trop_long(self):
+        return b'x' * (csv.field_size_limit() + 1)
+
+    def releve(self, transaction_paiement):
+        return f'reference;montant;statut\n{transaction_paiement.reference};{transaction_paiement.montant};SUCCESS\n'.encode()
+
+    def test_releve_illisible_refuse_par_le_formulaire(self):
+        for contenu in (
+            b'reference;montant\nTXN-1;' + self.champ_trop_long() + b'\n',   # csv.Error
+            'référence;montant\nTXN-1;10000\n'.encode('latin-1'),
+            b'ref_inconnue;total\nTXN-1;10000\n',
+        ):
+            reponse = self.televerser(contenu)
+            self.assertEqual(reponse.status_code, 200)
+            self.assertTrue(reponse.context['adminform'].form.errors['fichier'])
+        self.assertFalse(ImportReleve.objects.exists())
+
+    def test_petit_releve_importe_dans_la_requete(self):
+        transaction_paiement = self.creer_paiement(1)
+
+        self.assertEqual(self.televerser(self.releve(transaction_paiement)).status_code, 302)
+
+        releve = ImportReleve.objects.get()
+        self.assertEqual((releve.statut, releve.validees), (StatutImport.TERMINE, 1))
+        transaction_paiement.refresh_from_db()
+        self.assertEqual(transaction_paiement.statut, StatutTransaction.VALIDEE)
+
+    def test_gros_releve_mis_en_file(self):
+        transaction_paiement = self.creer_paiement(1)
+
+        with self.settings(RELEVES_IMPORT_DIRECT_MAX_OCTETS=10):
+            self.assertEqual(self.televerser(self.releve(transaction_paiement)).status_code, 302)
+        releve = ImportReleve.objects.get()
+        self.assertEqual(releve.statut, StatutImport.EN_ATTENTE)
+        transaction_paiement.refresh_from_db()
+        self.assertEqual(transaction_paiement.statut, StatutTransaction.EN_ATTENTE)
+
+        with override_settings(MEDIA_ROOT=self.media):
+            call_command('traiter_releves', stdout=StringIO())
+
+        releve.refresh_from_db()
+        self.assertEqual((releve.statut, releve.validees), (StatutImport.TERMINE, 1))
+        transaction_paiement.refresh_from_db()
+        self.assertEqual(transaction_paiement.statut, StatutTransaction.VALIDEE)
+
+    def test_erreur_de_lecture_dans_la_file(self):
+        with self.settings(RELEVES_IMPORT_DIRECT_MAX_OCTETS=10):
+            self.televerser(b'reference;montant\nTXN-1;10000\nTXN-2;' + self.champ_trop_long() + b'\n')
+
+        with override_settings(MEDIA_ROOT=self.media):
+            call_command('traiter_releves', stdout=StringIO(), stderr=StringIO())
+
+        releve = ImportReleve.objects.get()
+        self.assertEqual(releve.statut, StatutImport.ERREUR)
+        self.assertIn('field limit', releve.erreur)
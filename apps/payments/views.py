@@ -16,6 +16,7 @@ from apps.investments.models import (
     StatutTransaction,
     TypeTransaction
 )
+from .models import EvenementPaiement
 
 # ======================================================
 # 1️⃣ INITIATION DU PAIEMENT (remplace simuler_paiement)
@@ -76,19 +77,19 @@ def mock_pay(request, transaction_id):
 @csrf_exempt
 @require_POST
 def payment_webhook(request):
+    """
+    Enregistre le callback dans la boîte de réception et acquitte immédiatement
+    Les statuts sont appliqués par lots : python manage.py traiter_paiements
+    """
+    try:
+        data = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({"success": False, "message": "JSON invalide"}, status=400)
 
-    data = json.loads(request.body)
-
-    transaction = get_object_or_404(
-        Transaction,
-        reference=data['reference']
-    )
+    if not isinstance(data, dict) or not data.get('reference'):
+        return JsonResponse({"success": False, "message": "Référence manquante"}, status=400)
 
-    if data['status'] == 'SUCCESS':
-        transaction.valider_paiement()
-    else:
-        transaction.statut = StatutTransaction.ECHOUEE
-        transaction.save()
+    EvenementPaiement.enregistrer(data, request.body)
 
     return JsonResponse({"success": True})
 
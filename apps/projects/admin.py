@@ -5,7 +5,7 @@ Module projects - Plateforme crowdBuilding
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Projet, Etape, CompteRendu, ImageProjet, DocumentProjet
+from .models import Projet, Etape, CompteRendu, ImageProjet, DocumentProjet, Localite
 
 class ImageProjetInline(admin.TabularInline):
     """Inline pour les images du projet"""
@@ -56,7 +56,7 @@ class ProjetAdmin(admin.ModelAdmin):
             'fields': ('duree', 'date_debut', 'date_fin', 'date_debut_execution')
         }),
         ('Localisation', {
-            'fields': ('localisation', 'ville', 'region', 'adresse_complete')
+            'fields': ('localisation', 'ville', 'region', 'adresse_complete', 'latitude', 'longitude')
         }),
         ('Statut et validation', {
             'fields': ('statut', 'date_validation', 'administrateur_validateur', 'motif_refus')
@@ -196,4 +196,15 @@ class CompteRenduAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('date_publication',)
\ No newline at end of file
+    readonly_fields = ('date_publication',)
+
+
+@admin.register(Localite)
+class LocaliteAdmin(admin.ModelAdmin):
+    """
+    Administration des localités (géocodage hors ligne)
+    """
+    list_display = ('nom', 'region', 'latitude', 'longitude')
+    list_filter = ('region',)
+    search_fields = ('nom',)
+    exclude = ('cle',)
@@ -0,0 +1,50 @@
+"""
+Cartes de projets pré-rendues
+Plateforme crowdBuilding - Burkina Faso
+
+Le HTML d'une carte est mis en cache sous (gabarit, projet, version_carte,
+jour) :
+- Projet.version_carte est incrémentée en base à chaque enregistrement du
+  projet, changement de financement ou de réservation (UPDATE atomiques) et
+  modification de ses images : une carte périmée n'est plus jamais lue ;
+- le jour couvre ce qui dépend de la date (jours restants) ;
+- une page lit toutes ses cartes en un seul get_many ; seules les cartes
+  manquantes chargent leurs données (`preparer`) et sont rendues.
+Les éléments propres à la requête (distance, boutons selon l'utilisateur)
+restent hors de la carte.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+PREFIXE_CLE = 'cartes:'
+
+
+def cle(gabarit, projet, jour):
+    return f'{PREFIXE_CLE}{gabarit}:{projet.pk}:{projet.version_carte}:{jour:%Y%m%d}'
+
+
+def rendre(projets, gabarit, nom='projet', preparer=None):
+    """
+    Pose sur chaque projet `carte`, le HTML de sa carte (gabarit rendu avec
+    {nom: projet}) ; `preparer(projets)` charge les données des cartes à rendre
+    Retourne la liste des projets
+    """
+    projets = list(projets)
+    jour = timezone.localdate()
+    cles = {projet.pk: cle(gabarit, projet, jour) for projet in projets}
+    en_cache = cache.get_many(list(cles.values()))
+
+    a_rendre = [projet for projet in projets if cles[projet.pk] not in en_cache]
+    if a_rendre:
+        if preparer:
+            preparer(a_rendre)
+        rendues = {cles[projet.pk]: render_to_string(gabarit, {nom: projet}) for projet in a_rendre}
+        cache.set_many(rendues, settings.CARTES_CACHE_TTL)
+        en_cache.update(rendues)
+
+    for projet in projets:
+        projet.carte = mark_safe(en_cache[cles[projet.pk]])
+    return projets
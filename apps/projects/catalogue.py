@@ -0,0 +1,210 @@
+"""
+Catalogue public des projets
+Plateforme crowdBuilding - Burkina Faso
+
+- une page = `paginer_par_curseur` sur (date_creation DESC, id DESC), parcours
+  de l'index projet_catalogue_idx arrêté après TAILLE_PAGE + 1 projets ;
+- les cartes sont servies pré-rendues (apps.projects.cartes) ; seules celles
+  absentes du cache chargent leurs données : une image de couverture par projet
+  (Prefetch découpé) et le nombre d'investisseurs en une requête groupée ;
+- les facettes (nombre de projets par valeur de chaque filtre, sachant les
+  autres filtres actifs) et le nombre total viennent d'une seule requête
+  groupée sur les quatre champs filtrables (`_cube` : une ligne par
+  combinaison présente, quelques centaines au plus), puis d'une somme en
+  Python par dimension ;
+- ce cube et les facettes de chaque signature de filtres sont mis en cache
+  sous une version du catalogue, renouvelée quand un projet entre, sort ou
+  change de statut, de catégorie, de ville ou de région (Projet.save /
+  delete, passage en FINANCE par Projet.ajouter_financement) ;
+  CATALOGUE_COMPTE_TTL borne toute dérive.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Prefetch, prefetch_related_objects
+
+from apps.core.pagination import paginer_par_curseur
+from apps.projects import cartes
+
+TAILLE_PAGE = 12
+
+GABARIT_CARTE = 'projects/carte_catalogue.html'
+
+PREFIXE_CLE = 'catalogue_projets:'
+CLE_VERSION = PREFIXE_CLE + 'version'
+
+# Champs dont dépendent la visibilité et les filtres du catalogue
+CHAMPS_FILTRES = ('statut', 'categorie', 'ville', 'region')
+
+
+def statuts_visibles():
+    from apps.projects.models import StatutProjet
+
+    return [
+        StatutProjet.EN_CAMPAGNE,
+        StatutProjet.FINANCE,
+        StatutProjet.EN_COURS_EXECUTION,
+        StatutProjet.TERMINE,
+    ]
+
+
+def projets(filtres=None):
+    """Projets visibles du catalogue, filtrés ({champ: valeur}, valeurs vides ignorées)"""
+    from apps.projects.models import Projet
+
+    projets = Projet.objects.filter(statut__in=statuts_visibles())
+    return projets.filter(**{champ: valeur for champ, valeur in (filtres or {}).items() if valeur})
+
+
+def lire_filtres(donnees):
+    """
+    Filtres actifs d'une requête GET : statut et catégorie parmi leurs choix,
+    ville et région telles quelles ; valeur inconnue = filtre vide
+    """
+    from apps.projects.models import Projet
+
+    filtres = {champ: donnees.get(champ, '').strip() for champ in CHAMPS_FILTRES}
+    if filtres['statut'] not in statuts_visibles():
+        filtres['statut'] = ''
+    if filtres['categorie'] not in dict(Projet.TYPE_IMMOBILIER_CHOICES):
+        filtres['categorie'] = ''
+    return filtres
+
+
+def _version():
+    return cache.get_or_set(CLE_VERSION, time.time_ns(), None)
+
+
+def _cube(projets_visibles):
+    """[(statut, categorie, ville, region, nombre)] : une requête groupée"""
+    return list(
+        projets_visibles.order_by().values_list(*CHAMPS_FILTRES).annotate(nombre=Count('pk'))
+    )
+
+
+def _signature(filtres):
+    actifs = sorted((champ, valeur) for champ, valeur in filtres.items() if valeur)
+    return hashlib.md5(urlencode(actifs).encode()).hexdigest()
+
+
+def facettes(filtres=None, parmi=None):
+    """
+    Nombre de projets par valeur de chaque filtre, sachant les autres filtres actifs,
+    et nombre total pour les filtres actifs :
+    {'total': n, champ: [{'valeur', 'libelle', 'nombre', 'actif'}, ...], ...}
+    `parmi` restreint à une partie des projets visibles (résultats d'une recherche,
+    projets dans un rayon) : calcul non mis en cache
+    """
+    filtres = {champ: (filtres or {}).get(champ, '') for champ in CHAMPS_FILTRES}
+    if parmi is not None:
+        return _calculer(_cube(parmi), filtres)
+
+    version = _version()
+    cle = f'{PREFIXE_CLE}{version}:facettes:{_signature(filtres)}'
+    resultat = cache.get(cle)
+    if resultat is None:
+        cle_cube = f'{PREFIXE_CLE}{version}:cube'
+        cube = cache.get(cle_cube)
+        if cube is None:
+            cube = _cube(projets())
+            cache.set(cle_cube, cube, settings.CATALOGUE_COMPTE_TTL)
+        resultat = _calculer(cube, filtres)
+        cache.set(cle, resultat, settings.CATALOGUE_COMPTE_TTL)
+    return resultat
+
+
+def _calculer(cube, filtres):
+    from apps.projects.models import Projet, StatutProjet
+
+    libelles = {
+        'statut': dict(StatutProjet.choices),
+        'categorie': dict(Projet.TYPE_IMMOBILIER_CHOICES),
+    }
+    # Valeurs proposées : les choix pour statut et catégorie, les valeurs présentes sinon
+    valeurs = {
+        'statut': statuts_visibles(),
+        'categorie': list(libelles['categorie']),
+    }
+    for rang, champ in enumerate(CHAMPS_FILTRES[2:], start=2):
+        valeurs[champ] = sorted({ligne[rang] for ligne in cube})
+
+    comptes = {champ: dict.fromkeys(valeurs[champ], 0) for champ in CHAMPS_FILTRES}
+    for champ, valeur in filtres.items():
+        if valeur:
+            comptes[champ].setdefault(valeur, 0)
+    total = 0
+    for *combinaison, nombre in cube:
+        ecarts = [
+            rang for rang, champ in enumerate(CHAMPS_FILTRES)
+            if filtres[champ] and combinaison[rang] != filtres[champ]
+        ]
+        if not ecarts:
+            total += nombre
+        # La ligne compte pour une dimension si elle respecte tous les autres filtres
+        for rang, champ in enumerate(CHAMPS_FILTRES):
+            if not ecarts or ecarts == [rang]:
+                valeur = combinaison[rang]
+                comptes[champ][valeur] = comptes[champ].get(valeur, 0) + nombre
+
+    resultat = {'total': total}
+    for champ in CHAMPS_FILTRES:
+        elements = [
+            {
+                'valeur': str(valeur),
+                'libelle': libelles.get(champ, {}).get(valeur, valeur),
+                'nombre': nombre,
+                'actif': valeur == filtres[champ],
+            }
+            for valeur, nombre in comptes[champ].items()
+        ]
+        if champ not in libelles:
+            elements.sort(key=lambda element: (-element['nombre'], element['valeur']))
+        resultat[champ] = elements
+    return resultat
+
+
+def invalider():
+    """Nouvelle version du catalogue au commit : cube, facettes et nombres sont recalculés à la lecture"""
+    transaction.on_commit(lambda: cache.set(CLE_VERSION, time.time_ns(), None))
+
+
+def preparer_cartes(elements):
+    """Image de couverture et nombre d'investisseurs des projets d'une page (deux requêtes)"""
+    from apps.investments.models import Investissement
+    from apps.projects.models import ImageProjet
+
+    prefetch_related_objects(elements, Prefetch(
+        'images',
+        queryset=ImageProjet.objects.order_by('-est_principale', 'date_ajout', 'pk')[:1],
+        to_attr='images_couverture'
+    ))
+    investisseurs = dict(
+        Investissement.objects.filter(projet_id__in=[projet.pk for projet in elements])
+        .order_by().values('projet_id').annotate(nombre=Count('investisseur', distinct=True))
+        .values_list('projet_id', 'nombre')
+    )
+    for projet in elements:
+        projet.nombre_investisseurs = investisseurs.get(projet.pk, 0)
+    return elements
+
+
+def page(queryset, curseur=None, taille=TAILLE_PAGE):
+    """Une page du catalogue : (projets avec leur carte, curseur suivant)"""
+    elements, curseur_suivant = paginer_par_curseur(queryset, curseur, taille)
+    return cartes.rendre(elements, GABARIT_CARTE, nom='project', preparer=preparer_cartes), curseur_suivant
+
+
+def page_par_rang(queryset, ids, position=0, taille=TAILLE_PAGE):
+    """
+    Une page de résultats de recherche, dans l'ordre de pertinence `ids`
+    Le curseur est la position dans ce classement
+    """
+    ids_page = ids[position:position + taille]
+    rangs = {pk: rang for rang, pk in enumerate(ids_page)}
+    elements = sorted(queryset.filter(pk__in=ids_page), key=lambda projet: rangs[projet.pk])
+    curseur_suivant = str(position + taille) if len(ids) > position + taille else None
+    return cartes.rendre(elements, GABARIT_CARTE, nom='project', preparer=preparer_cartes), curseur_suivant
@@ -0,0 +1,271 @@
+"""
+Localisation des projets et recherche par rayon
+Plateforme crowdBuilding - Burkina Faso
+
+Sans PostGIS : chaque projet géolocalisé porte son geohash (PRECISION
+caractères), en tête de l'index projet_geohash_idx (geohash, latitude,
+longitude, statut) qui suffit au filtre. Une recherche « à moins de r km de » :
+1. boîte englobante du cercle ;
+2. cellules geohash couvrant la boîte, à la précision la plus fine qui en
+   demande au plus MAX_CELLULES : chaque cellule est un intervalle
+   [préfixe, préfixe + '~') parcouru dans l'index ;
+3. latitude / longitude dans la boîte, puis distance exacte (haversine) en
+   SQL, annotée `distance` (km) pour le filtre et le tri.
+
+Les coordonnées manquantes sont déduites de la ville (table Localite,
+chefs-lieux du Burkina Faso chargés hors ligne), à l'enregistrement
+(Projet.save) ou par la commande geocoder_projets.
+"""
+import math
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from apps.projects import recherche
+
+RAYON_TERRE_KM = 6371.0
+KM_PAR_DEGRE = 111.32
+
+PRECISION = 8          # geohash stocké : cellule de 38 m × 19 m
+MAX_CELLULES = 32      # intervalles d'index par recherche
+
+RAYON_DEFAUT_KM = 20
+RAYON_MAX_KM = 300
+RAYONS_KM = (5, 10, 20, 50, 100)
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Noms des localités proposés par le catalogue (effacé à chaque modification de Localite)
+CLE_LOCALITES = 'geo:localites'
+DUREE_LOCALITES = 3600
+
+# Chefs-lieux de région et de province : (nom, région, latitude, longitude)
+# Coordonnées approchées du centre de la localité
+LOCALITES = (
+    ('Ouagadougou', 'Centre', 12.3714, -1.5197),
+    ('Saaba', 'Centre', 12.3833, -1.4167),
+    ('Bobo-Dioulasso', 'Hauts-Bassins', 11.1771, -4.2979),
+    ('Houndé', 'Hauts-Bassins', 11.5000, -3.5167),
+    ('Orodara', 'Hauts-Bassins', 11.0000, -4.9167),
+    ('Koudougou', 'Centre-Ouest', 12.2526, -2.3627),
+    ('Réo', 'Centre-Ouest', 12.3167, -2.4667),
+    ('Léo', 'Centre-Ouest', 11.1000, -2.1000),
+    ('Sapouy', 'Centre-Ouest', 11.5544, -1.7736),
+    ('Banfora', 'Cascades', 10.6333, -4.7667),
+    ('Sindou', 'Cascades', 10.6667, -5.1667),
+    ('Ouahigouya', 'Nord', 13.5828, -2.4216),
+    ('Yako', 'Nord', 12.9592, -2.2636),
+    ('Gourcy', 'Nord', 13.2083, -2.3603),
+    ('Titao', 'Nord', 13.7667, -2.0667),
+    ('Kaya', 'Centre-Nord', 13.0917, -1.0844),
+    ('Kongoussi', 'Centre-Nord', 13.3256, -1.5339),
+    ('Boulsa', 'Centre-Nord', 12.6667, -0.5667),
+    ('Tenkodogo', 'Centre-Est', 11.7800, -0.3697),
+    ('Koupéla', 'Centre-Est', 12.1794, -0.3517),
+    ('Pouytenga', 'Centre-Est', 12.2500, -0.4333),
+    ('Garango', 'Centre-Est', 11.8000, -0.5500),
+    ("Fada N'Gourma", 'Est', 12.0614, 0.3581),
+    ('Diapaga', 'Est', 12.0708, 1.7889),
+    ('Kantchari', 'Est', 12.4775, 1.5122),
+    ('Bogandé', 'Est', 12.9714, -0.1436),
+    ('Pama', 'Est', 11.2500, 0.7000),
+    ('Dédougou', 'Boucle du Mouhoun', 12.4634, -3.4608),
+    ('Nouna', 'Boucle du Mouhoun', 12.7329, -3.8637),
+    ('Tougan', 'Boucle du Mouhoun', 13.0667, -3.0667),
+    ('Boromo', 'Boucle du Mouhoun', 11.7500, -2.9333),
+    ('Solenzo', 'Boucle du Mouhoun', 12.1833, -4.0833),
+    ('Toma', 'Boucle du Mouhoun', 12.7667, -2.8833),
+    ('Gaoua', 'Sud-Ouest', 10.3250, -3.1750),
+    ('Diébougou', 'Sud-Ouest', 10.9617, -3.2500),
+    ('Dano', 'Sud-Ouest', 11.1500, -3.0667),
+    ('Batié', 'Sud-Ouest', 9.8833, -2.9167),
+    ('Dori', 'Sahel', 14.0354, -0.0345),
+    ('Djibo', 'Sahel', 14.1020, -1.6306),
+    ('Gorom-Gorom', 'Sahel', 14.4439, -0.2361),
+    ('Sebba', 'Sahel', 13.4364, 0.5300),
+    ('Manga', 'Centre-Sud', 11.6636, -1.0731),
+    ('Pô', 'Centre-Sud', 11.1667, -1.1500),
+    ('Kombissiri', 'Centre-Sud', 12.0650, -1.3375),
+    ('Ziniaré', 'Plateau-Central', 12.5822, -1.2983),
+    ('Zorgho', 'Plateau-Central', 12.2500, -0.6167),
+    ('Boussé', 'Plateau-Central', 12.6611, -1.8925),
+)
+
+
+def cle_localite(nom):
+    """Clé de recherche d'une localité : mêmes règles que la recherche plein texte"""
+    return ' '.join(recherche.normaliser(nom))
+
+
+# ========== GEOHASH ==========
+
+def geohash(latitude, longitude, precision=PRECISION):
+    """Geohash (base 32) du point"""
+    intervalles = [[-90.0, 90.0], [-180.0, 180.0]]
+    caracteres, bits, valeur, longitude_suivante = [], 0, 0, True
+    while len(caracteres) < precision:
+        intervalle, coordonnee = (intervalles[1], longitude) if longitude_suivante else (intervalles[0], latitude)
+        milieu = (intervalle[0] + intervalle[1]) / 2
+        valeur <<= 1
+        if coordonnee >= milieu:
+            valeur |= 1
+            intervalle[0] = milieu
+        else:
+            intervalle[1] = milieu
+        longitude_suivante = not longitude_suivante
+        bits += 1
+        if bits == 5:
+            caracteres.append(BASE32[valeur])
+            bits, valeur = 0, 0
+    return ''.join(caracteres)
+
+
+def taille_cellule(precision):
+    """(hauteur, largeur) en degrés d'une cellule geohash"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def boite(latitude, longitude, rayon_km):
+    """(sud, ouest, nord, est) du carré englobant le cercle"""
+    dlat = rayon_km / KM_PAR_DEGRE
+    dlon = rayon_km / (KM_PAR_DEGRE * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon
+
+
+def couverture(sud, ouest, nord, est):
+    """Cellules geohash couvrant la boîte, à la précision la plus fine qui en demande au plus MAX_CELLULES"""
+    for precision in range(PRECISION, 0, -1):
+        hauteur, largeur = taille_cellule(precision)
+        lignes = math.ceil((nord - sud) / hauteur) + 1
+        colonnes = math.ceil((est - ouest) / largeur) + 1
+        if lignes * colonnes <= MAX_CELLULES or precision == 1:
+            break
+
+    cellules = set()
+    latitude = sud
+    while True:
+        longitude = ouest
+        while True:
+            cellules.add(geohash(min(latitude, nord), min(longitude, est), precision))
+            if longitude >= est:
+                break
+            longitude += largeur
+        if latitude >= nord:
+            break
+        latitude += hauteur
+    return sorted(cellules)
+
+
+# ========== REQUÊTES ==========
+
+def distance_km(latitude, longitude):
+    """Distance haversine (km) entre le projet et le point, en SQL"""
+    dphi = Radians(F('latitude') - Value(latitude)) / 2
+    dlambda = Radians(F('longitude') - Value(longitude)) / 2
+    a = Power(Sin(dphi), 2) + Cos(Radians(F('latitude'))) * math.cos(math.radians(latitude)) * Power(Sin(dlambda), 2)
+    return Value(2 * RAYON_TERRE_KM) * ASin(Sqrt(a, output_field=FloatField()))
+
+
+def dans_rayon(projets, latitude, longitude, rayon_km):
+    """Projets à moins de `rayon_km` du point, annotés `distance` (km)"""
+    sud, ouest, nord, est = boite(latitude, longitude, rayon_km)
+    cellules = reduce(or_, (Q(geohash__gte=cellule, geohash__lt=cellule + '~') for cellule in couverture(sud, ouest, nord, est)))
+    return projets.filter(
+        cellules,
+        latitude__range=(sud, nord),
+        longitude__range=(ouest, est),
+    ).annotate(distance=distance_km(latitude, longitude)).filter(distance__lte=rayon_km)
+
+
+def lire_point(donnees):
+    """
+    Point et rayon d'une requête GET : `pres_de` (localité) ou `lat` / `lon`, et `rayon` (km)
+    Retourne {'latitude', 'longitude', 'rayon', 'localite'} ou None
+    """
+    from apps.projects.models import Localite
+
+    try:
+        rayon = min(max(float(donnees.get('rayon') or RAYON_DEFAUT_KM), 1), RAYON_MAX_KM)
+    except ValueError:
+        rayon = RAYON_DEFAUT_KM
+
+    nom = donnees.get('pres_de', '').strip()
+    if nom:
+        localite = Localite.objects.filter(cle=cle_localite(nom)).first()
+        if localite:
+            return {'latitude': localite.latitude, 'longitude': localite.longitude, 'rayon': rayon, 'localite': localite.nom}
+        return None
+
+    try:
+        latitude, longitude = float(donnees.get('lat', '')), float(donnees.get('lon', ''))
+    except ValueError:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return {'latitude': latitude, 'longitude': longitude, 'rayon': rayon, 'localite': ''}
+
+
+def noms_localites():
+    """Noms des localités, pour le choix « près de » du catalogue"""
+    from apps.projects.models import Localite
+
+    return cache.get_or_set(CLE_LOCALITES, lambda: list(Localite.objects.values_list('nom', flat=True)), DUREE_LOCALITES)
+
+
+def geocoder(ville):
+    """(latitude, longitude) de la localité `ville`, ou None"""
+    from apps.projects.models import Localite
+
+    cle = cle_localite(ville)
+    if not cle:
+        return None
+    return Localite.objects.filter(cle=cle).values_list('latitude', 'longitude').first()
+
+
+# ========== CHARGEMENT ==========
+
+def charger_localites(Localite, alias='default'):
+    """Crée les localités de LOCALITES absentes ; retourne le nombre créé"""
+    existantes = set(Localite.objects.using(alias).values_list('cle', flat=True))
+    nouvelles = [
+        Localite(nom=nom, cle=cle_localite(nom), region=region, latitude=latitude, longitude=longitude)
+        for nom, region, latitude, longitude in LOCALITES
+        if cle_localite(nom) not in existantes
+    ]
+    Localite.objects.using(alias).bulk_create(nouvelles)
+    cache.delete(CLE_LOCALITES)
+    return len(nouvelles)
+
+
+def localiser(projets, taille_lot=1000, alias='default'):
+    """
+    Coordonnées des projets qui n'en ont pas (d'après leur ville) et geohash de tous,
+    par lots ; retourne le nombre de projets modifiés
+    """
+    Localite = projets.model._meta.apps.get_model('projects', 'Localite')
+    coordonnees = {cle: (latitude, longitude) for cle, latitude, longitude in Localite.objects.using(alias).values_list('cle', 'latitude', 'longitude')}
+    total, dernier = 0, 0
+    while True:
+        lot = list(
+            projets.using(alias).filter(pk__gt=dernier).order_by('pk').only('pk', 'ville', 'latitude', 'longitude', 'geohash')[:taille_lot]
+        )
+        if not lot:
+            return total
+        modifies = []
+        for projet in lot:
+            avant = (projet.latitude, projet.longitude, projet.geohash)
+            if projet.latitude is None and projet.longitude is None:
+                projet.latitude, projet.longitude = coordonnees.get(cle_localite(projet.ville), (None, None))
+            if projet.latitude is not None and projet.longitude is not None:
+                projet.geohash = geohash(projet.latitude, projet.longitude)
+            else:
+                projet.geohash = ''
+            if (projet.latitude, projet.longitude, projet.geohash) != avant:
+                modifies.append(projet)
+        projets.model.objects.using(alias).bulk_update(modifies, ['latitude', 'longitude', 'geohash'])
+        total += len(modifies)
+        dernier = lot[-1].pk
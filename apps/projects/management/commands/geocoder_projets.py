@@ -0,0 +1,24 @@
+"""
+Géocodage hors ligne des projets (voir apps.projects.geo)
+Usage : python manage.py geocoder_projets [--lot 1000]
+(recharge les localités de geo.LOCALITES, puis complète les coordonnées d'après la ville et recalcule
+les geohash ; après un import de masse ou un ajout de localités ; Projet.save() le fait projet par projet)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.projects import geo
+from apps.projects.models import Localite, Projet
+
+
+class Command(BaseCommand):
+    help = "Complète les coordonnées des projets d'après leur ville et recalcule leur geohash, par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=1000, help="Projets modifiés par requête")
+
+    def handle(self, *args, **options):
+        localites = geo.charger_localites(Localite)
+        total = geo.localiser(Projet.objects.all(), taille_lot=options['lot'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{localites} localité(s) ajoutée(s), {total} projet(s) géolocalisé(s)"
+        ))
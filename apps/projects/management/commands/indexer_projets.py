@@ -0,0 +1,22 @@
+"""
+Reconstruit l'index de recherche des projets (voir apps.projects.recherche)
+Usage : python manage.py indexer_projets [--lot 1000]
+(après un import de masse ou un changement de RECHERCHE_BACKEND ; Projet.save() tient l'index à jour)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.projects import recherche
+from apps.projects.models import Projet
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des projets, par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=1000, help="Projets indexés par transaction")
+
+    def handle(self, *args, **options):
+        total = recherche.reconstruire(Projet.objects.all(), taille_lot=options['lot'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} projet(s) indexé(s) ({type(recherche.moteur()).__name__})"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0029_alter_projet_statut_alter_projet_statut_precedent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projet',
+            name='parts_reservees',
+            field=models.PositiveIntegerField(default=0, verbose_name='Parts réservées'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apps.projects import recherche
+
+TABLE = 'projects_projetrecherche'
+
+
+def creer_index(apps, schema_editor):
+    """Index plein texte propre à la base, puis indexation des projets existants"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f"CREATE FULLTEXT INDEX projet_recherche_titre_ft ON {TABLE} (titre)")
+        schema_editor.execute(f"CREATE FULLTEXT INDEX projet_recherche_contenu_ft ON {TABLE} (contenu)")
+        schema_editor.execute(f"CREATE FULLTEXT INDEX projet_recherche_ft ON {TABLE} (titre, contenu)")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"CREATE VIRTUAL TABLE {recherche.RechercheFTS5.TABLE} USING fts5(titre, contenu)")
+
+    Projet = apps.get_model('projects', 'Projet')
+    recherche.reconstruire(Projet.objects.all(), alias=schema_editor.connection.alias)
+
+
+def supprimer_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {recherche.RechercheFTS5.TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projet_parts_reservees'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjetRecherche',
+            fields=[
+                ('projet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recherche', serialize=False, to='projects.projet', verbose_name='Projet')),
+                ('titre', models.TextField(verbose_name='Titre et localisation normalisés')),
+                ('contenu', models.TextField(verbose_name='Description normalisée')),
+            ],
+            options={
+                'verbose_name': 'Index de recherche',
+                'verbose_name_plural': 'Index de recherche',
+            },
+        ),
+        # Les index FULLTEXT MySQL disparaissent avec la table
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
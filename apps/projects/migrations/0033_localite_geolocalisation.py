@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:09
+
+from django.db import migrations, models
+
+from apps.projects import geo
+
+
+def charger(apps, schema_editor):
+    """Localités du Burkina Faso, puis coordonnées et geohash des projets existants"""
+    alias = schema_editor.connection.alias
+    geo.charger_localites(apps.get_model('projects', 'Localite'), alias)
+    geo.localiser(apps.get_model('projects', 'Projet').objects.all(), alias=alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0032_projet_projet_catalogue_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Localite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100, verbose_name='Nom')),
+                ('cle', models.CharField(max_length=100, unique=True, verbose_name='Clé de recherche')),
+                ('region', models.CharField(max_length=100, verbose_name='Région')),
+                ('latitude', models.FloatField(verbose_name='Latitude')),
+                ('longitude', models.FloatField(verbose_name='Longitude')),
+            ],
+            options={
+                'verbose_name': 'Localité',
+                'verbose_name_plural': 'Localités',
+                'ordering': ['nom'],
+            },
+        ),
+        migrations.AddField(
+            model_name='projet',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, verbose_name='Geohash'),
+        ),
+        migrations.AddField(
+            model_name='projet',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='projet',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='projet',
+            index=models.Index(fields=['geohash', 'latitude', 'longitude', 'statut'], name='projet_geohash_idx'),
+        ),
+        migrations.RunPython(charger, migrations.RunPython.noop),
+    ]
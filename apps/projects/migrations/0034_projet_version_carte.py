@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0033_localite_geolocalisation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projet',
+            name='version_carte',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Version de la carte'),
+        ),
+    ]
@@ -4,13 +4,18 @@ Plateforme crowdBuilding - Burkina Faso
 """
 from .utils import get_administrateurs, envoyer_notification_aux_administrateurs
 from datetime import timedelta
-from django.db import models
+from django.db import models, transaction
+from django.core.cache import cache
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.accounts.models import Utilisateur
+from apps.core.sequences import SequenceReferences
+from apps.projects import catalogue, geo, recherche
 import os
 import uuid
 
+SEQUENCE_PROJETS = SequenceReferences('PROJ', 'projects.Projet')
+
 def projet_image_path(instance, filename):
     """Génère le chemin pour les images des projets"""
     ext = filename.split('.')[-1]
@@ -142,6 +147,14 @@ class Projet(models.Model):
     ville = models.CharField(max_length=100, default="Ouagadougou", verbose_name="Ville")
     region = models.CharField(max_length=100, default="Centre", verbose_name="Région")
     adresse_complete = models.TextField(verbose_name="Adresse complète", blank=True)
+    latitude = models.FloatField(null=True, blank=True, verbose_name="Latitude")
+    longitude = models.FloatField(null=True, blank=True, verbose_name="Longitude")
+    # Recherche par rayon (apps.projects.geo) : déduit de latitude / longitude à l'enregistrement
+    geohash = models.CharField(max_length=12, blank=True, editable=False, verbose_name="Geohash")
+
+    # Version du rendu des cartes (apps.projects.cartes) : incrémentée à chaque enregistrement,
+    # changement de financement ou d'image
+    version_carte = models.PositiveIntegerField(default=1, editable=False, verbose_name="Version de la carte")
     
     # Métadonnées
     promoteur = models.ForeignKey(
@@ -209,41 +222,87 @@ class Projet(models.Model):
         verbose_name = "Projet"
         verbose_name_plural = "Projets"
         ordering = ['-date_creation']
+        indexes = [
+            # Catalogue public : pagination par curseur sur (date_creation DESC, id DESC)
+            models.Index(fields=['-date_creation', '-id'], name='projet_catalogue_idx'),
+            # Recherche par rayon : intervalles de geohash, coordonnées lues dans l'index
+            models.Index(fields=['geohash', 'latitude', 'longitude', 'statut'], name='projet_geohash_idx'),
+        ]
     
     def __str__(self):
         return f"{self.reference} - {self.titre}"
     
+    # Texte indexé et filtres du catalogue tels qu'en base, pour ne réindexer
+    # ou ne recompter le catalogue qu'à leur modification
+    _texte_en_base = None
+    _filtres_en_base = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._texte_en_base = tuple(instance.__dict__.get(champ) for champ in recherche.CHAMPS_INDEXES)
+        instance._filtres_en_base = tuple(instance.__dict__.get(champ) for champ in catalogue.CHAMPS_FILTRES)
+        return instance
+
     def save(self, *args, **kwargs):
         """Override save pour générer automatiquement la référence"""
         if not self.reference:
             # Générer une référence unique : PROJ-YYYY-XXXX
-            year = timezone.now().year
-            last_project = Projet.objects.filter(
-                date_creation__year=year
-            ).order_by('-date_creation').first()
-            
-            if last_project and last_project.reference:
-                try:
-                    last_number = int(last_project.reference.split('-')[-1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            
-            self.reference = f'PROJ-{year}-{new_number:04d}'
+            self.reference = SEQUENCE_PROJETS.prochaine()
         
         # Mettre à jour le résumé si la description change
         if self.description and (not self.resume or self.resume == "Aucun résumé"):
             self.resume = self.description[:200] + ("..." if len(self.description) > 200 else "")
+
+        # Coordonnées absentes, ou déduites de l'ancienne ville : celles de la ville (table Localite)
+        ville_en_base = dict(zip(catalogue.CHAMPS_FILTRES, self._filtres_en_base or ())).get('ville')
+        if self.ville != ville_en_base and not kwargs.get('update_fields'):
+            coordonnees = (self.latitude, self.longitude)
+            if coordonnees == (None, None) or (ville_en_base and coordonnees == geo.geocoder(ville_en_base)):
+                self.latitude, self.longitude = geo.geocoder(self.ville) or (None, None)
+
+        geohash = geo.geohash(self.latitude, self.longitude) if self.latitude is not None and self.longitude is not None else ''
+        if geohash != self.geohash:
+            self.geohash = geohash
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'geohash'}
+
+        # Cartes déjà rendues périmées (incrément en base, sûr face aux enregistrements concurrents)
+        nouvelle_version = not self._state.adding
+        if nouvelle_version:
+            self.version_carte = models.F('version_carte') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version_carte'}
         
         super().save(*args, **kwargs)
+
+        if nouvelle_version:
+            self.refresh_from_db(fields=['version_carte'])
+
+        # Index de recherche, dans la même transaction que le projet
+        texte = tuple(getattr(self, champ) for champ in recherche.CHAMPS_INDEXES)
+        if texte != self._texte_en_base:
+            recherche.indexer([(self.pk, *texte)], kwargs.get('using') or 'default')
+            self._texte_en_base = texte
+
+        filtres = tuple(getattr(self, champ) for champ in catalogue.CHAMPS_FILTRES)
+        if filtres != self._filtres_en_base:
+            catalogue.invalider()
+            self._filtres_en_base = filtres
+
+    def delete(self, *args, **kwargs):
+        resultat = super().delete(*args, **kwargs)
+        catalogue.invalider()
+        return resultat
     
     @property
     def image_principale(self):
         """Retourne l'image principale du projet"""
         if self.image_garde:
             return self.image_garde
+        # Couverture chargée avec la page du catalogue (catalogue.preparer_cartes)
+        if 'images_couverture' in self.__dict__:
+            return self.images_couverture[0].image if self.images_couverture else None
         image = self.images.filter(est_principale=True).first()
         if not image:
             image = self.images.first()
@@ -272,6 +331,70 @@ class Projet(models.Model):
             self.statut = StatutProjet.FINANCE
             self.save()
 
+    @classmethod
+    def ajouter_financement(cls, projet_id, montant, parts, parts_reservees=0):
+        """
+        Ajoute un montant et des parts aux compteurs en un seul UPDATE atomique
+        et passe le projet en FINANCE si l'objectif est atteint
+
+        `parts_reservees` : parts déjà bloquées par des réservations, qui
+        passent de parts_reservees à parts_vendues. L'UPDATE ne s'applique que
+        si le total de parts n'est pas dépassé ; retourne 0 sinon.
+        """
+        montant_apres = models.F('montant_collecte') + montant
+        with transaction.atomic():
+            # Statut et collecte avant l'UPDATE, sous le verrou qu'il prend de toute façon :
+            # un passage en FINANCE périme les facettes du catalogue
+            avant = cls.objects.select_for_update().filter(pk=projet_id).values_list(
+                'statut', 'montant_collecte', 'montant_total'
+            ).first()
+            nombre = cls.objects.filter(
+                pk=projet_id,
+                nombre_total_parts__gte=(
+                    models.F('parts_vendues') + models.F('parts_reservees') + (parts - parts_reservees)
+                )
+            ).update(
+                # statut en premier : MySQL évalue les affectations de gauche à droite
+                statut=models.Case(
+                    models.When(montant_total__lte=montant_apres, then=models.Value(StatutProjet.FINANCE)),
+                    default=models.F('statut')
+                ),
+                montant_collecte=montant_apres,
+                parts_vendues=models.F('parts_vendues') + parts,
+                parts_reservees=models.F('parts_reservees') - parts_reservees,
+                version_carte=models.F('version_carte') + 1,
+            )
+            if nombre and avant[0] != StatutProjet.FINANCE and avant[2] <= avant[1] + montant:
+                catalogue.invalider()
+        return nombre
+
+    @classmethod
+    def nouvelle_version_carte(cls, projet_id):
+        """Périme les cartes rendues du projet (changement hors Projet.save)"""
+        cls.objects.filter(pk=projet_id).update(version_carte=models.F('version_carte') + 1)
+
+    @classmethod
+    def reserver_parts(cls, projet_id, parts):
+        """
+        Bloque des parts si elles sont encore disponibles (UPDATE conditionnel)
+        Retourne True si la réservation a pu être faite
+        """
+        return cls.objects.filter(
+            pk=projet_id,
+            nombre_total_parts__gte=models.F('parts_vendues') + models.F('parts_reservees') + parts
+        ).update(
+            parts_reservees=models.F('parts_reservees') + parts,
+            version_carte=models.F('version_carte') + 1,
+        ) == 1
+
+    @classmethod
+    def liberer_parts(cls, projet_id, parts):
+        """Rend des parts réservées disponibles"""
+        cls.objects.filter(pk=projet_id).update(
+            parts_reservees=models.F('parts_reservees') - parts,
+            version_carte=models.F('version_carte') + 1,
+        )
+
     
     @property
     def est_financeable(self):
@@ -422,6 +545,9 @@ class Projet(models.Model):
     @property
     def investisseurs_count(self):
         """Retourne le nombre d'investisseurs uniques"""
+        # Compté pour toute la page du catalogue (catalogue.preparer_cartes)
+        if 'nombre_investisseurs' in self.__dict__:
+            return self.nombre_investisseurs
         from apps.investments.models import Investissement  # Ajustez selon votre app
         return self.investissements.values('investisseur').distinct().count()
     
@@ -434,10 +560,16 @@ class Projet(models.Model):
         default=0,
         verbose_name="Parts vendues"
     )
+
+    # Parts bloquées par des réservations en cours (voir investments.ReservationParts)
+    parts_reservees = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Parts réservées"
+    )
         
     @property
     def parts_restantes(self):
-        return self.nombre_total_parts - self.parts_vendues
+        return self.nombre_total_parts - self.parts_vendues - self.parts_reservees
     
     
     # Champs pour la validation des documents (si vous voulez tracker l'état)
@@ -453,6 +585,55 @@ class Projet(models.Model):
     document_financier_rejete = models.BooleanField(default=False, verbose_name="Document financier rejeté")
     document_financier_motif_rejet = models.TextField(blank=True, verbose_name="Motif de rejet document financier")
 
+class Localite(models.Model):
+    """
+    Localité du Burkina Faso et ses coordonnées, pour le géocodage hors ligne
+    (ville d'un projet, point de départ d'une recherche par rayon)
+    Chargée depuis apps.projects.geo.LOCALITES
+    """
+    nom = models.CharField(max_length=100, verbose_name="Nom")
+    cle = models.CharField(max_length=100, unique=True, verbose_name="Clé de recherche")
+    region = models.CharField(max_length=100, verbose_name="Région")
+    latitude = models.FloatField(verbose_name="Latitude")
+    longitude = models.FloatField(verbose_name="Longitude")
+
+    class Meta:
+        verbose_name = "Localité"
+        verbose_name_plural = "Localités"
+        ordering = ['nom']
+
+    def __str__(self):
+        return f"{self.nom} ({self.region})"
+
+    def save(self, *args, **kwargs):
+        self.cle = geo.cle_localite(self.nom)
+        super().save(*args, **kwargs)
+        cache.delete(geo.CLE_LOCALITES)
+
+
+class ProjetRecherche(models.Model):
+    """
+    Texte normalisé d'un projet pour la recherche plein texte (apps.projects.recherche)
+    Tenu par Projet.save() ; reconstruit par la commande indexer_projets
+    """
+    projet = models.OneToOneField(
+        Projet,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recherche',
+        verbose_name="Projet"
+    )
+    titre = models.TextField(verbose_name="Titre et localisation normalisés")
+    contenu = models.TextField(verbose_name="Description normalisée")
+
+    class Meta:
+        verbose_name = "Index de recherche"
+        verbose_name_plural = "Index de recherche"
+
+    def __str__(self):
+        return f"Index de recherche - projet {self.projet_id}"
+
+
 class DocumentObligatoire(models.Model):
     """
     Documents obligatoires pour la soumission d'un projet
@@ -551,6 +732,12 @@ class ImageProjet(models.Model):
                 est_principale=True
             ).update(est_principale=False)
         super().save(*args, **kwargs)
+        Projet.nouvelle_version_carte(self.projet_id)
+
+    def delete(self, *args, **kwargs):
+        resultat = super().delete(*args, **kwargs)
+        Projet.nouvelle_version_carte(self.projet_id)
+        return resultat
 
 class DocumentProjet(models.Model):
     """Documents associés à un projet"""
@@ -623,6 +810,7 @@ class Etape(models.Model):
         self.terminee = True
         self.date_realisation = timezone.now()
         self.save()
+        self.envoyer_notification_terminee()
 
     def marquer_en_retard(self):
         """Marque l'étape comme en retard"""
@@ -687,6 +875,12 @@ class Etape(models.Model):
         self.terminee = True
         self.date_realisation = timezone.now()
         self.save()
+        self.envoyer_notification_terminee()
+
+    def envoyer_notification_terminee(self):
+        """Programme la notification des investisseurs du projet"""
+        from apps.notifications.models import Notification
+        Notification.creer_notification_etape_terminee(self)
     
     @property
     def peut_modifier(self):
@@ -840,6 +1034,7 @@ class CompteRendu(models.Model):
         self.motif_rejet = ""
         self.save()
         self.envoyer_notification_validation()
+        self.envoyer_notification_publication()
     
     def refuser(self, administrateur, motif):
         """Refuse le compte rendu avec un motif"""
@@ -882,6 +1077,11 @@ class CompteRendu(models.Model):
             print(f"Erreur notification validation: {e}")
 
     
+    def envoyer_notification_publication(self):
+        """Programme la notification des investisseurs du projet"""
+        from apps.notifications.models import Notification
+        Notification.creer_notification_compte_rendu(self)
+    
     def envoyer_notification_rejet(self):
         """Notification au promoteur pour rejet"""
         try:
@@ -0,0 +1,227 @@
+"""
+Recherche plein texte des projets
+Plateforme crowdBuilding - Burkina Faso
+
+Le texte d'un projet est normalisé une fois, à l'enregistrement (`normaliser` :
+minuscules sans accents, mots vides français retirés, pluriels ramenés au
+singulier), dans ProjetRecherche : titre + localisation d'un côté, description
+de l'autre. La requête passe par la même normalisation. Chaque mot est
+obligatoire, le dernier est un préfixe (recherche à la frappe), et le titre
+pèse POIDS_TITRE fois plus que la description.
+
+Moteur choisi par RECHERCHE_BACKEND (chemin pointé), sinon d'après la base :
+- MySQL  : index FULLTEXT, MATCH ... AGAINST en mode booléen
+           (innodb_ft_min_token_size = 3 ; les mots vides sont déjà retirés,
+           innodb_ft_enable_stopword peut être désactivé) ;
+- SQLite : table virtuelle FTS5, classement bm25 ;
+- autres : LIKE sur le texte normalisé, sans index.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, Q, Value, When
+from django.utils.module_loading import import_string
+
+# Champs de Projet indexés (un enregistrement qui ne les touche pas ne réindexe rien)
+CHAMPS_INDEXES = ('titre', 'description', 'localisation')
+
+POIDS_TITRE = 3
+
+MOTS_VIDES = frozenset("""
+    a au aux avec c ce ces cet cette d dans de des du elle elles en est et etc eux il ils
+    j je l la le les leur leurs lui m ma mais me mes moi mon n ne nos notre nous on ou
+    par pas pour qu que qui s sa se ses son sont sur t ta te tes toi ton tu un une vos
+    votre vous y
+""".split())
+
+MOT = re.compile(r'[a-z0-9]+')
+SEPARATEURS = re.compile(r'[\W_]+')
+
+LIGATURES = str.maketrans({'œ': 'oe', 'Œ': 'oe', 'æ': 'ae', 'Æ': 'ae'})
+
+
+def normaliser(texte):
+    """Mots d'un texte tels qu'indexés : sans accents ni mots vides, pluriels en -s / -x retirés"""
+    # Ponctuation remplacée avant de retirer les accents : « l’école » donne « l » et « ecole »
+    texte = unicodedata.normalize('NFKD', SEPARATEURS.sub(' ', (texte or '').translate(LIGATURES)))
+    mots = []
+    for mot in MOT.findall(texte.encode('ascii', 'ignore').decode().lower()):
+        if mot in MOTS_VIDES:
+            continue
+        if len(mot) > 3 and mot[-1] in 'sx' and not mot.isdigit():
+            mot = mot[:-1]
+        mots.append(mot)
+    return mots
+
+
+def _documents(lignes):
+    """(pk, titre, description, localisation) -> (pk, titre normalisé, contenu normalisé)"""
+    return [
+        (pk, ' '.join(normaliser(f'{titre} {localisation}')), ' '.join(normaliser(description)))
+        for pk, titre, description, localisation in lignes
+    ]
+
+
+# ========== MOTEURS ==========
+
+class RechercheSimple:
+    """LIKE sur le texte normalisé : toutes bases, parcours complet de ProjetRecherche"""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def indexer(self, documents):
+        from apps.projects.models import ProjetRecherche
+
+        ids = [pk for pk, _, _ in documents]
+        ProjetRecherche.objects.using(self.alias).filter(projet_id__in=ids).delete()
+        ProjetRecherche.objects.using(self.alias).bulk_create([
+            ProjetRecherche(projet_id=pk, titre=titre, contenu=contenu) for pk, titre, contenu in documents
+        ])
+
+    def vider(self):
+        from apps.projects.models import ProjetRecherche
+
+        ProjetRecherche.objects.using(self.alias).all().delete()
+
+    def rechercher(self, mots, limite):
+        from apps.projects.models import ProjetRecherche
+
+        lignes = ProjetRecherche.objects.using(self.alias)
+        for mot in mots:
+            lignes = lignes.filter(Q(titre__contains=mot) | Q(contenu__contains=mot))
+        score = sum(
+            (Case(When(titre__contains=mot, then=Value(POIDS_TITRE)), default=Value(1)) for mot in mots),
+            Value(0)
+        )
+        return list(lignes.annotate(score=score).order_by('-score', '-projet_id').values_list('projet_id', flat=True)[:limite])
+
+
+class RechercheMySQL(RechercheSimple):
+    """Index FULLTEXT (titre), (contenu) et (titre, contenu) de ProjetRecherche"""
+
+    TAILLE_MIN = 3  # innodb_ft_min_token_size
+
+    def rechercher(self, mots, limite):
+        from apps.projects.models import ProjetRecherche
+
+        # Mots trop courts pour l'index FULLTEXT : ils restent filtrés par LIKE
+        courts = [mot for mot in mots if len(mot) < self.TAILLE_MIN]
+        longs = [mot for mot in mots if len(mot) >= self.TAILLE_MIN]
+        if not longs:
+            return super().rechercher(mots, limite)
+
+        requete = ' '.join(f'+{mot}' for mot in longs) + ('*' if longs[-1] == mots[-1] else '')
+        table = ProjetRecherche._meta.db_table
+        sql = (
+            f"SELECT projet_id FROM {table} "
+            f"WHERE MATCH (titre, contenu) AGAINST (%s IN BOOLEAN MODE) "
+            + ''.join(" AND (titre LIKE %s OR contenu LIKE %s)" for _ in courts)
+            + f" ORDER BY {POIDS_TITRE} * MATCH (titre) AGAINST (%s IN BOOLEAN MODE)"
+            f" + MATCH (contenu) AGAINST (%s IN BOOLEAN MODE) DESC, projet_id DESC LIMIT %s"
+        )
+        parametres = [requete]
+        for mot in courts:
+            parametres += [f'%{mot}%', f'%{mot}%']
+        parametres += [requete, requete, limite]
+        with connections[self.alias].cursor() as curseur:
+            curseur.execute(sql, parametres)
+            return [pk for pk, in curseur.fetchall()]
+
+
+class RechercheFTS5(RechercheSimple):
+    """Table virtuelle FTS5 (rowid = id du projet), tenue à côté de ProjetRecherche"""
+
+    TABLE = 'projects_projetrecherche_fts'
+
+    def indexer(self, documents):
+        super().indexer(documents)
+        with connections[self.alias].cursor() as curseur:
+            curseur.executemany(f"DELETE FROM {self.TABLE} WHERE rowid = %s", [(pk,) for pk, _, _ in documents])
+            curseur.executemany(f"INSERT INTO {self.TABLE} (rowid, titre, contenu) VALUES (%s, %s, %s)", documents)
+
+    def vider(self):
+        super().vider()
+        with connections[self.alias].cursor() as curseur:
+            curseur.execute(f"DELETE FROM {self.TABLE}")
+
+    def rechercher(self, mots, limite):
+        requete = ' '.join(f'"{mot}"' for mot in mots) + '*'
+        with connections[self.alias].cursor() as curseur:
+            curseur.execute(
+                f"SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH %s "
+                f"ORDER BY bm25({self.TABLE}, {POIDS_TITRE}, 1.0), rowid DESC LIMIT %s",
+                [requete, limite]
+            )
+            return [pk for pk, in curseur.fetchall()]
+
+
+MOTEURS = {
+    'mysql': RechercheMySQL,
+    'sqlite': RechercheFTS5,
+}
+
+_moteurs = {}
+
+
+def moteur(alias='default'):
+    """Moteur de la base `alias` : RECHERCHE_BACKEND, sinon celui de son fournisseur"""
+    if alias not in _moteurs:
+        classe = settings.RECHERCHE_BACKEND
+        classe = import_string(classe) if classe else MOTEURS.get(connections[alias].vendor, RechercheSimple)
+        _moteurs[alias] = classe(alias)
+    return _moteurs[alias]
+
+
+# ========== API ==========
+
+def indexer(lignes, alias='default'):
+    """Indexe les projets (pk, titre, description, localisation), dans la transaction courante"""
+    documents = _documents(lignes)
+    if documents:
+        moteur(alias).indexer(documents)
+
+
+def reconstruire(projets, taille_lot=1000, alias='default'):
+    """Réindexe tout le queryset `projets` par lots ; retourne le nombre de projets indexés"""
+    moteur(alias).vider()
+    total, dernier = 0, 0
+    while True:
+        lignes = list(
+            projets.using(alias).filter(pk__gt=dernier).order_by('pk').values_list('pk', *CHAMPS_INDEXES)[:taille_lot]
+        )
+        if not lignes:
+            return total
+        with transaction.atomic(using=alias):
+            indexer(lignes, alias)
+        total += len(lignes)
+        dernier = lignes[-1][0]
+
+
+def rechercher(requete, limite=None):
+    """
+    Identifiants des projets correspondant à la requête, du plus pertinent au moins
+    pertinent (au plus RECHERCHE_RESULTATS_MAX), ou None si la requête n'a aucun mot utile
+    """
+    mots = normaliser(requete)
+    if not mots:
+        return None
+    return moteur().rechercher(mots, limite or settings.RECHERCHE_RESULTATS_MAX)
+
+
+def filtrer(projets, requete):
+    """
+    Identifiants des projets du queryset correspondant à la recherche, par pertinence
+    (au plus RECHERCHE_RESULTATS_MAX), ou None si la requête n'a aucun mot utile
+    """
+    ids = rechercher(requete)
+    return None if ids is None else restreindre(projets, ids)
+
+
+def restreindre(projets, ids):
+    """Identifiants `ids` présents dans le queryset, dans le même ordre"""
+    # Les lignes d'index orphelines (projet supprimé) disparaissent à la jointure
+    retenus = set(projets.filter(pk__in=ids).values_list('pk', flat=True))
+    return [pk for pk in ids if pk in retenus]
@@ -47,30 +47,24 @@ def get_administrateurs():
         )
 
 
-def envoyer_notification_aux_administrateurs(titre, contenu, type_notif, lien='#'):
+def envoyer_notification_aux_administrateurs(titre, contenu, type_notif, lien='#', projet=None):
     """
     Fonction utilitaire pour envoyer des notifications aux administrateurs
+    Programme une diffusion : les notifications sont créées par la commande
+    diffuser_notifications, hors de la requête
     """
     try:
-        from apps.notifications.models import Notification
+        from apps.notifications.models import CibleDiffusion, DiffusionNotification
         
-        administrateurs = get_administrateurs()
-        
-        notifications_creees = 0
-        for admin in administrateurs:
-            try:
-                Notification.objects.create(
-                    utilisateur=admin,
-                    titre=titre,
-                    contenu=contenu,
-                    type=type_notif,
-                    lien=lien
-                )
-                notifications_creees += 1
-            except Exception as e:
-                print(f"Erreur création notification pour {admin.email}: {e}")
-        
-        return notifications_creees > 0
+        DiffusionNotification.programmer(
+            cible=CibleDiffusion.ADMINISTRATEURS,
+            titre=titre,
+            contenu=contenu,
+            type=type_notif,
+            projet=projet,
+            lien_action='' if lien == '#' else lien
+        )
+        return True
         
     except ImportError:
         print("⚠️ Module notifications non disponible")
@@ -5,6 +5,7 @@ Plateforme crowdBuilding - Burkina Faso
 from datetime import timedelta
 import datetime
 import json
+from urllib.parse import urlencode
 from django.forms import ValidationError
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
@@ -21,6 +22,7 @@ from django.views.decorators.csrf import csrf_exempt
 from apps.accounts import models as accounts_models
 from .forms import CompteRenduForm, CompteRenduModificationForm, ImageCompteRenduFormSet, NouveauProjetForm
 from .models import CompteRendu, Projet, Etape, DocumentObligatoire, StatutProjet
+from . import cartes, catalogue, geo, recherche
 from .utils import add_months
 from apps.notifications.models import Notification
 from apps.documents.models import Document, StatutDocument
@@ -30,39 +32,66 @@ from apps.documents.models import Document, StatutDocument
 # =============================================
 
 def list_projects(request):
-    """Liste des projets publics"""
-    projects = Projet.objects.filter(
-        statut__in=[
-            StatutProjet.EN_CAMPAGNE,
-            StatutProjet.FINANCE,
-            StatutProjet.EN_COURS_EXECUTION,
-            StatutProjet.TERMINE
-        ]
-    ).select_related('promoteur').prefetch_related('images').order_by('-date_creation')
-    
-    # Appliquer les filtres
-    search_query = request.GET.get('search', '')
-    categorie_filter = request.GET.get('categorie', '')
-    statut_filter = request.GET.get('statut', '')
-    
-    if search_query:
-        projects = projects.filter(
-            Q(titre__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(localisation__icontains=search_query)
-        )
-    
-    if categorie_filter:
-        projects = projects.filter(categorie=categorie_filter)
-    
-    if statut_filter:
-        projects = projects.filter(statut=statut_filter)
-    
+    """Catalogue public des projets, page par page"""
+    # Filtres (valeurs inconnues ignorées)
+    search_query = request.GET.get('search', '').strip()
+    filtres = catalogue.lire_filtres(request.GET)
+    point = geo.lire_point(request.GET)
+    tri_distance = point is not None and request.GET.get('tri') == 'distance'
+    curseur = request.GET.get('curseur')
+
+    visibles = catalogue.projets()
+    if point:
+        # 📍 Rayon autour d'une localité ou d'un point : cellules geohash, puis distance exacte
+        visibles = geo.dans_rayon(visibles, point['latitude'], point['longitude'], point['rayon'])
+    projects = visibles.filter(**{champ: valeur for champ, valeur in filtres.items() if valeur})
+    resultats = recherche.filtrer(visibles, search_query) if search_query else None
+
+    if resultats is not None:
+        # 🔍 Index plein texte : facettes sur tous les résultats, puis les filtres actifs
+        facettes = catalogue.facettes(filtres, parmi=visibles.filter(pk__in=resultats))
+        if any(filtres.values()):
+            resultats = recherche.restreindre(projects, resultats)
+    elif point:
+        facettes = catalogue.facettes(filtres, parmi=visibles)
+        if tri_distance:
+            resultats = list(projects.order_by('distance', 'pk').values_list('pk', flat=True))
+
+    if resultats is not None:
+        # Résultats classés (pertinence ou distance), le curseur est le rang
+        position = int(curseur) if curseur and curseur.isdigit() else 0
+        projets_page, curseur_suivant = catalogue.page_par_rang(projects, resultats, position)
+    else:
+        # 📄 Pagination par curseur (date_creation, id), facettes et nombre de projets en cache
+        projets_page, curseur_suivant = catalogue.page(projects, curseur)
+        if not point:
+            facettes = catalogue.facettes(filtres)
+
+    geographie = {}
+    if point:
+        geographie = {'pres_de': point['localite']} if point['localite'] else {'lat': point['latitude'], 'lon': point['longitude']}
+        geographie['rayon'] = f"{point['rayon']:g}"
+        if tri_distance:
+            geographie['tri'] = 'distance'
+
     context = {
-        'projects': projects,
+        'projects': projets_page,
+        'total_count': facettes['total'],
+        'facettes': facettes,
+        'curseur': curseur,
+        'curseur_suivant': curseur_suivant,
+        'parametres': urlencode([
+            (nom, valeur) for nom, valeur in (('search', search_query), *filtres.items(), *geographie.items()) if valeur
+        ]),
         'search_query': search_query,
-        'categorie_filter': categorie_filter,
-        'statut_filter': statut_filter,
+        'categorie_filter': filtres['categorie'],
+        'statut_filter': filtres['statut'],
+        'ville_filter': filtres['ville'],
+        'region_filter': filtres['region'],
+        'point': point,
+        'tri_distance': tri_distance,
+        'localites': geo.noms_localites(),
+        'rayons': geo.RAYONS_KM,
         'est_investisseur': request.user.is_authenticated and request.user.est_investisseur(),
     }
     
@@ -270,7 +299,8 @@ def mes_projets_promoteur(request):
         )
     
     context = {
-        'projets': projets,
+        # 🃏 Cartes pré-rendues, rendues seulement si le projet a changé
+        'projets': cartes.rendre(projets, 'promoteur/carte_projet.html', preparer=catalogue.preparer_cartes),
         'statuts': StatutProjet.choices,
     }
     
@@ -656,8 +686,9 @@ def envoyer_notification_administration(projet):
     succes = envoyer_notification_aux_administrateurs(
         titre="🚀 Nouveau projet soumis",
         contenu=f"Le promoteur {projet.promoteur.nom_complet} a soumis un nouveau projet : '{projet.titre}'.",
-        type_notif='NOUVEAU_PROJET',
-        lien=projet.get_absolute_url() if hasattr(projet, 'get_absolute_url') else '#'
+        type_notif='NOUVEAU_PROJET_A_VALIDER',
+        lien=projet.get_absolute_url() if hasattr(projet, 'get_absolute_url') else '#',
+        projet=projet
     )
     
     if not succes:
@@ -13,4 +13,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crowdBuilding.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importés après l'initialisation de Django
+from django.urls import reverse  # noqa: E402
+
+from apps.notifications.temps_reel import FluxNotifications  # noqa: E402
+
+# Flux SSE des notifications : connexions longues servies hors de la pile Django
+# (pas de middleware synchrone ni de thread par connexion)
+CHEMIN_FLUX_NOTIFICATIONS = reverse('notifications:flux')
+flux_notifications = FluxNotifications()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == CHEMIN_FLUX_NOTIFICATIONS:
+        return await flux_notifications(scope, receive, send)
+    return await django_application(scope, receive, send)
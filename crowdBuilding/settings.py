@@ -153,11 +153,16 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'crowdBuilding <noreply@crowdbuilding.bf>')
 
 #  AJOUTER CE BLOC CONDITIONNEL (optionnel mais recommandé)
+# Transport réel, utilisé par le worker de la boîte d'envoi (manage.py envoyer_emails)
 if DEBUG:
-    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    EMAILS_BACKEND_ENVOI = 'django.core.mail.backends.console.EmailBackend'
     print("⚠️  Mode développement : Les emails sont affichés dans la console")
 else:
-    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAILS_BACKEND_ENVOI = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Boîte d'envoi : send_mail & co. écrivent dans la table EmailSortant, dans la
+# transaction de l'appelant ; le worker envoie ensuite via EMAILS_BACKEND_ENVOI
+EMAIL_BACKEND = 'apps.notifications.backends.BoiteEnvoiBackend'
 
 # AJOUTER CES CONFIGURATIONS PASSWORD RESET
 LOGIN_URL = '/accounts/login/'
@@ -189,6 +194,85 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 
+# Références métier (PROJ-/INV-/TXN-) : numéros réservés par bloc et par processus
+SEQUENCE_TAILLE_BLOC = int(os.getenv('SEQUENCE_TAILLE_BLOC', '20'))
+
+# Durée de blocage des parts en attente de paiement (minutes)
+RESERVATION_PARTS_TTL_MINUTES = int(os.getenv('RESERVATION_PARTS_TTL_MINUTES', '30'))
+
+# Lignes sur lesquelles sont réparties les totaux globaux de SoldeFinancement
+SOLDE_GLOBAL_TRANCHES = int(os.getenv('SOLDE_GLOBAL_TRANCHES', '16'))
+
+# Relevés de règlement téléversés dans l'admin : importés dans la requête jusqu'à
+# cette taille, mis en file au-delà (python manage.py traiter_releves)
+RELEVES_IMPORT_DIRECT_MAX_OCTETS = int(os.getenv('RELEVES_IMPORT_DIRECT_MAX_OCTETS', '1048576'))
+
+# Cache partagé entre les processus (Redis si REDIS_URL est défini, mémoire locale sinon)
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            # Défaut de 300 entrées : moins qu'une page de cartes pré-rendues
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_LOCAL_MAX_ENTREES', '10000'))},
+        }
+    }
+
+# Compteurs du sidebar admin : recomptés en base au plus tard après ce délai (secondes)
+COMPTEURS_ADMIN_TTL = int(os.getenv('COMPTEURS_ADMIN_TTL', '3600'))
+
+# Compteurs de notifications non lues par utilisateur : recomptés au plus tard après ce délai (secondes)
+NOTIFICATIONS_NON_LUES_TTL = int(os.getenv('NOTIFICATIONS_NON_LUES_TTL', '86400'))
+
+# Rétention des notifications (commande purger_notifications), en jours :
+# lues -> archivées après RETENTION_LUES, toutes après RETENTION, archives supprimées après CONSERVATION
+NOTIFICATIONS_RETENTION_LUES_JOURS = int(os.getenv('NOTIFICATIONS_RETENTION_LUES_JOURS', '90'))
+NOTIFICATIONS_RETENTION_JOURS = int(os.getenv('NOTIFICATIONS_RETENTION_JOURS', '365'))
+NOTIFICATIONS_ARCHIVES_CONSERVATION_JOURS = int(os.getenv('NOTIFICATIONS_ARCHIVES_CONSERVATION_JOURS', '730'))
+
+# Notifications en direct (SSE sur l'application ASGI) : relais entre processus
+# (hote:port de `manage.py relais_notifications`, vide = processus unique)
+# et intervalle des commentaires de maintien de connexion (secondes)
+NOTIFICATIONS_FLUX_RELAIS = os.getenv('NOTIFICATIONS_FLUX_RELAIS', '')
+NOTIFICATIONS_FLUX_PING = int(os.getenv('NOTIFICATIONS_FLUX_PING', '25'))
+
+# Regroupement des notifications répétées (intentions d'investissement, projets à valider) :
+# une notification non lue est mise à jour au lieu d'être dupliquée pendant ce délai (minutes)
+NOTIFICATIONS_REGROUPEMENT_MINUTES = int(os.getenv('NOTIFICATIONS_REGROUPEMENT_MINUTES', '60'))
+
+# Worker de la boîte d'envoi : réessais (backoff exponentiel, secondes), bail d'un lot
+# réservé, limites d'envoi par domaine destinataire et par minute ("gmail.com=60,yahoo.fr=30")
+EMAILS_TENTATIVES_MAX = int(os.getenv('EMAILS_TENTATIVES_MAX', '8'))
+EMAILS_BACKOFF_BASE = int(os.getenv('EMAILS_BACKOFF_BASE', '60'))
+EMAILS_BACKOFF_MAX = int(os.getenv('EMAILS_BACKOFF_MAX', '21600'))
+EMAILS_BAIL = int(os.getenv('EMAILS_BAIL', '300'))
+EMAILS_LIMITE_PAR_DOMAINE = int(os.getenv('EMAILS_LIMITE_PAR_DOMAINE', '120'))
+EMAILS_LIMITES_DOMAINES = {
+    domaine.strip(): int(limite)
+    for domaine, _, limite in (
+        regle.partition('=') for regle in os.getenv('EMAILS_LIMITES_DOMAINES', '').split(',') if regle.strip()
+    )
+}
+
+# Recherche de projets (apps.projects.recherche) : moteur (chemin pointé, vide = selon la base :
+# FULLTEXT sur MySQL, FTS5 sur SQLite) et nombre maximal de résultats classés
+RECHERCHE_BACKEND = os.getenv('RECHERCHE_BACKEND', '')
+RECHERCHE_RESULTATS_MAX = int(os.getenv('RECHERCHE_RESULTATS_MAX', '500'))
+
+# Catalogue public des projets : durée de vie (secondes) du nombre de projets mis en cache
+# par combinaison de filtres (renouvelé de toute façon à chaque changement du catalogue)
+CATALOGUE_COMPTE_TTL = int(os.getenv('CATALOGUE_COMPTE_TTL', '300'))
+
+# Cartes de projets pré-rendues (apps.projects.cartes) : durée de vie (secondes) d'une carte en cache
+# (la clé change de toute façon avec la version du projet et le jour)
+CARTES_CACHE_TTL = int(os.getenv('CARTES_CACHE_TTL', '86400'))
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
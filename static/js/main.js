@@ -334,6 +334,71 @@ CROWDBUILDING.notifications = {
     }
 };
 
+// Notifications en direct (flux SSE servi par l'application ASGI)
+CROWDBUILDING.notifications.flux = {
+    source: null,
+    url: null,
+    dernierId: 0,
+
+    init: function() {
+        const lien = document.getElementById('notificationsDropdown');
+        if (!lien || !lien.dataset.flux || !window.EventSource) return;
+
+        this.url = lien.dataset.flux;
+        this.connecter();
+    },
+
+    connecter: function() {
+        // Après une resynchronisation, le serveur renvoie les notifications manquées
+        const url = this.dernierId ? `${this.url}?depuis=${this.dernierId}` : this.url;
+        this.source = new EventSource(url);
+
+        this.source.addEventListener('compteur', (event) => {
+            const donnees = JSON.parse(event.data);
+            this.afficherCompteur('non_lues' in donnees ? donnees.non_lues : this.compteur() + donnees.delta);
+        });
+
+        this.source.addEventListener('notification', (event) => {
+            const donnees = JSON.parse(event.data);
+            // Une notification regroupée réutilise l'id d'une notification déjà reçue
+            if (donnees.id && !donnees.regroupee) {
+                if (donnees.id <= this.dernierId) return;
+                this.dernierId = donnees.id;
+            }
+            // Les notifications renvoyées ou regroupées sont déjà comptées
+            if (donnees.non_lue && !donnees.rejeu && !donnees.regroupee) {
+                this.afficherCompteur(this.compteur() + 1);
+            }
+            CROWDBUILDING.notifications.info(`<strong>${this.echapper(donnees.titre)}</strong><br>${this.echapper(donnees.contenu)}`);
+        });
+
+        this.source.addEventListener('resynchroniser', () => {
+            this.source.close();
+            this.connecter();
+        });
+    },
+
+    compteur: function() {
+        const badge = document.getElementById('notificationsBadge');
+        return badge ? parseInt(badge.textContent, 10) || 0 : 0;
+    },
+
+    afficherCompteur: function(nombre) {
+        const badge = document.getElementById('notificationsBadge');
+        if (!badge) return;
+
+        nombre = Math.max(0, nombre);
+        badge.textContent = nombre;
+        badge.classList.toggle('d-none', nombre === 0);
+    },
+
+    echapper: function(texte) {
+        const element = document.createElement('div');
+        element.textContent = texte || '';
+        return element.innerHTML;
+    }
+};
+
 // Fonctions de validation de formulaire
 CROWDBUILDING.forms = {
     // Validation en temps réel
@@ -483,6 +548,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialiser les uploads
     CROWDBUILDING.upload.initDropZones();
+
+    // Notifications en direct
+    CROWDBUILDING.notifications.flux.init();
     
     // Animation d'apparition des éléments
     const animatedElements = document.querySelectorAll('.fade-in-up');